@@ -0,0 +1,9 @@
+"""Offline load tests for Ron.
+
+``python -m bench`` imports the real bot from ``ron_bot.py`` and exercises it
+without connecting to Discord.  Gateway events are injected straight into
+discord.py's event parsers, and every REST call goes to an in-process stand-in
+that records it and answers with a minimal payload.  Each scenario runs in its
+own process against a scratch data directory.  The results are written as
+JSON so two versions can be compared (``--compare``).
+"""
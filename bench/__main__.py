@@ -0,0 +1,191 @@
+"""Command line for the offline load tests.
+
+    python -m bench                              # every scenario
+    python -m bench roll_storm remind_bulk       # some of them
+    python -m bench --count 20000 --rate 5000 roll_storm
+    python -m bench --compare bench/results/v2.5.0.json
+
+Results go to ``bench/results/<git describe>.json`` unless ``--output`` is
+given.  ``--compare BASELINE`` prints the change for each metric against an
+earlier results file and exits 1 if anything regressed by more than
+``--threshold`` percent.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+RESULTS_DIR = ROOT / "bench" / "results"
+
+# metric -> (True if bigger is better, smallest absolute change worth flagging)
+COMPARED = {
+    "throughput": (True, 0),
+    "p50_ms": (False, 1.0),
+    "p99_ms": (False, 2.0),
+    "peak_rss_mb": (False, 5.0),
+    "startup_s": (False, 0.5),
+}
+
+
+def peak_rss_mb():
+    try:
+        import resource
+    except ImportError:  # Windows
+        import psutil
+        return round(psutil.Process().memory_info().peak_wset / 1048576, 1)
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+def run_worker(name, args):
+    """Run one scenario in this process and write its results to args.result_file."""
+    from bench.scenarios import SCENARIOS
+
+    spec = SCENARIOS[name]
+    args.count = args.count or spec["count"]
+    args.rate = args.rate or spec["rate"]
+    data_dir = Path(os.environ["RON_DATA_DIR"])
+    if spec["seed"] is not None:
+        spec["seed"](data_dir, args)
+
+    async def main():
+        # imported here so that building the bot's state counts as startup
+        started = time.perf_counter()
+        sys.path.insert(0, str(ROOT))
+        import ron_bot
+        from bench.harness import Harness
+
+        harness = Harness(ron_bot, rest_latency=args.rest_latency / 1000)
+        await harness.start()
+        startup = time.perf_counter() - started
+        result = await spec["run"](harness, args)
+        result["startup_s"] = round(startup, 2)
+        result["peak_rss_mb"] = peak_rss_mb()
+        result["rest_calls"] = dict(harness.fake.calls.most_common())
+        result["loop_stalls"] = len(ron_bot.bot.stall_watchdog.stalls)
+        return result
+
+    result = asyncio.run(main())
+    Path(args.result_file).write_text(json.dumps(result))
+
+
+def run_scenario(name, args):
+    with tempfile.TemporaryDirectory(prefix=f"ron-bench-{name}-") as data_dir:
+        result_file = Path(data_dir) / "result.json"
+        env = dict(
+            os.environ, RON_DATA_DIR=data_dir, DISCORD_TOKEN="bench", METRICS_PORT="0",
+            SHARD_COUNT="", SHARD_IDS="", RON_CLUSTER_ID="", DEV_GUILD_ID="",
+        )
+        command = [
+            sys.executable, "-m", "bench", "--worker", name, "--result-file", str(result_file),
+            "--rest-latency", str(args.rest_latency), "--users", str(args.users),
+        ]
+        if args.count:
+            command += ["--count", str(args.count)]
+        if args.rate:
+            command += ["--rate", str(args.rate)]
+        log = Path(data_dir) / "worker.log"
+        with open(log, "w") as output:
+            code = subprocess.call(command, cwd=ROOT, env=env, stdout=output, stderr=subprocess.STDOUT)
+        if code != 0 or not result_file.exists():
+            sys.stderr.write(log.read_text()[-4000:])
+            return {"error": f"worker exited with code {code}"}
+        return json.loads(result_file.read_text())
+
+
+def version():
+    try:
+        return subprocess.check_output(
+            ["git", "describe", "--tags", "--always", "--dirty"], cwd=ROOT, text=True, stderr=subprocess.DEVNULL,
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def print_results(results):
+    for name, result in results["scenarios"].items():
+        if "error" in result:
+            print(f"{name:18} ERROR: {result['error']}")
+            continue
+        p50, p99 = (result.get(key) for key in ("p50_ms", "p99_ms"))
+        print(
+            f"{name:18} {result.get('completed', 0):>7}/{result.get('events', 0):<7} "
+            f"{result.get('throughput', 0):>9.1f}/s  p50 {'-' if p50 is None else f'{p50:.2f}':>8} ms  "
+            f"p99 {'-' if p99 is None else f'{p99:.2f}':>8} ms  rss {result.get('peak_rss_mb', 0):>7.1f} MB  "
+            f"startup {result.get('startup_s', 0):.2f}s"
+        )
+
+
+def compare(baseline, current, threshold):
+    """Print metric changes; returns True if any metric regressed past `threshold` percent."""
+    regressed = False
+    print(f"\nCompared with {baseline.get('version')} ({baseline.get('timestamp')}):")
+    for name, result in current["scenarios"].items():
+        old = baseline.get("scenarios", {}).get(name)
+        if old is None or "error" in old or "error" in result:
+            continue
+        for metric, (higher_is_better, noise) in COMPARED.items():
+            before, after = old.get(metric), result.get(metric)
+            if not before or after is None:
+                continue
+            change = (after - before) / before * 100
+            worse = -change if higher_is_better else change
+            flag = "REGRESSION" if worse > threshold and abs(after - before) > noise else ""
+            regressed = regressed or bool(flag)
+            print(f"  {name:18} {metric:12} {before:>10} -> {after:<10} {change:+7.1f}%  {flag}")
+    return regressed
+
+
+def main(argv=None):
+    from bench.scenarios import SCENARIOS
+
+    parser = argparse.ArgumentParser(prog="python -m bench", description="Offline load tests for Ron.")
+    parser.add_argument("scenarios", nargs="*", help=f"scenarios to run (default: all of {', '.join(SCENARIOS)})")
+    parser.add_argument("--count", type=int, help="events per scenario (default: per scenario)")
+    parser.add_argument("--rate", type=float, help="events per second (default: per scenario)")
+    parser.add_argument("--users", type=int, default=1_000_000, help="board size for leaderboard_1m")
+    parser.add_argument("--rest-latency", type=float, default=0.0, help="simulated REST round trip in ms")
+    parser.add_argument("--output", help="results file (default: bench/results/<version>.json)")
+    parser.add_argument("--compare", metavar="BASELINE", help="results file to compare against")
+    parser.add_argument("--threshold", type=float, default=10.0, help="regression threshold in percent")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    parser.add_argument("--result-file", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.worker:
+        run_worker(args.worker, args)
+        return 0
+    unknown = [name for name in args.scenarios if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"unknown scenario(s): {', '.join(unknown)}")
+
+    results = {
+        "version": version(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "discord.py": __import__("discord").__version__,
+        "scenarios": {},
+    }
+    for name in args.scenarios or SCENARIOS:
+        print(f"Running {name}...", flush=True)
+        results["scenarios"][name] = run_scenario(name, args)
+    print_results(results)
+
+    output = Path(args.output) if args.output else RESULTS_DIR / f"{results['version']}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(results, indent=2))
+    print(f"Results written to {output}")
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text())
+        return 1 if compare(baseline, results, args.threshold) else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
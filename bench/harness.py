@@ -0,0 +1,249 @@
+"""Fake gateway and REST layer around the real `bot` object.
+
+`FakeDiscord` replaces `bot.http.request` and the webhook adapter that
+interaction responses use.  It records every outbound call by route template
+and returns just enough JSON for discord.py to build its models.  It also
+matches each reply to the event that caused it: interaction responses by
+interaction ID, and channel messages by channel, first in first out.
+
+`Harness` builds the connection state a READY and GUILD_CREATE would have
+produced, dispatches ``ready``, and injects MESSAGE_CREATE /
+INTERACTION_CREATE payloads at a fixed rate through the same parser
+functions the gateway uses.  Those are discord.py internals (2.x), so this
+module may need touching when discord.py is upgraded.
+"""
+import asyncio
+import itertools
+import statistics
+import time
+from collections import Counter, defaultdict, deque
+from datetime import datetime, timezone
+
+import discord
+from discord.user import ClientUser
+from discord.webhook.async_ import AsyncWebhookAdapter
+
+BOT_ID = 900000000000000001
+OWNER_ID = 900000000000000002
+GUILD_ID = 900000000000000003
+FIRST_CHANNEL_ID = 900000000000100000
+FIRST_USER_ID = 900000000001000000
+
+_NOW = datetime.now(timezone.utc).isoformat()
+
+
+def user_payload(user_id, bot=False):
+    return {
+        "id": str(user_id), "username": f"user{user_id % 1000000}", "discriminator": "0",
+        "global_name": None, "avatar": None, "bot": bot,
+    }
+
+
+def member_payload(user_id):
+    return {"user": user_payload(user_id), "roles": [], "joined_at": _NOW, "deaf": False, "mute": False, "flags": 0}
+
+
+def guild_payload(channels, members):
+    return {
+        "id": str(GUILD_ID), "name": "Bench", "owner_id": str(OWNER_ID), "unavailable": False,
+        "roles": [{
+            "id": str(GUILD_ID), "name": "@everyone", "permissions": "0", "position": 0, "color": 0,
+            "hoist": False, "managed": False, "mentionable": False, "flags": 0,
+        }],
+        "channels": [
+            {"id": str(FIRST_CHANNEL_ID + i), "type": 0, "name": f"bench-{i}", "position": i,
+             "permission_overwrites": [], "nsfw": False}
+            for i in range(channels)
+        ],
+        "members": [member_payload(FIRST_USER_ID + i) for i in range(members)],
+        "member_count": members, "emojis": [], "stickers": [], "features": [],
+        "premium_tier": 0, "verification_level": 0, "explicit_content_filter": 0,
+        "default_message_notifications": 0, "mfa_level": 0, "nsfw_level": 0,
+        "preferred_locale": "en-US", "system_channel_flags": 0,
+    }
+
+
+def percentile(values, q):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class FakeDiscord:
+    """Records outbound REST calls and matches replies to injected events."""
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.calls = Counter()  # "METHOD /route/{template}" -> count
+        self.pending = defaultdict(deque)  # channel or interaction ID -> injection times
+        self.latencies = []
+        self.first_reply = None
+        self.last_reply = None
+        self._ids = itertools.count(discord.utils.time_snowflake(datetime.now(timezone.utc)))
+
+    def expect(self, key):
+        self.pending[key].append(time.perf_counter())
+
+    def _reply(self, key):
+        waiting = self.pending.get(key)
+        if waiting:
+            now = time.perf_counter()
+            self.latencies.append(now - waiting.popleft())
+            self.first_reply = self.first_reply or now
+            self.last_reply = now
+
+    def _message(self, channel_id, payload):
+        payload = payload or {}
+        return {
+            "id": str(next(self._ids)), "channel_id": str(channel_id), "author": user_payload(BOT_ID, bot=True),
+            "content": payload.get("content") or "", "timestamp": _NOW, "edited_timestamp": None,
+            "tts": False, "mention_everyone": False, "mentions": [], "mention_roles": [],
+            "attachments": [], "embeds": payload.get("embeds") or [], "pinned": False, "type": 0,
+        }
+
+    async def request(self, route, **kwargs):
+        """Replacement for `discord.http.HTTPClient.request`."""
+        self.calls[f"{route.method} {route.path}"] += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if route.channel_id is not None:
+            self._reply(int(route.channel_id))
+        if route.path == "/users/@me/channels":
+            recipient = kwargs.get("json", {}).get("recipient_id")
+            return {"id": str(next(self._ids)), "type": 1, "recipients": [user_payload(int(recipient or 0))]}
+        if route.method == "POST" and route.path == "/channels/{channel_id}/messages":
+            return self._message(route.channel_id, kwargs.get("json"))
+        if route.method == "PATCH" and route.path == "/guilds/{guild_id}/members/{user_id}":
+            return member_payload(int(route.url.rsplit("/", 1)[1]))
+        if route.method == "PUT" and route.path.endswith("/commands"):
+            return [
+                dict(command, id=str(next(self._ids)), application_id=str(BOT_ID), version=str(next(self._ids)))
+                for command in kwargs.get("json") or []
+            ]
+        if route.method == "GET":
+            return []
+        return None
+
+    async def webhook_request(self, adapter, route, session, *, payload=None, multipart=None, **kwargs):
+        """Replacement for `AsyncWebhookAdapter.request` (interaction responses)."""
+        self.calls[f"{route.method} {route.path}"] += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if route.path.endswith("/callback"):
+            self._reply(int(route.webhook_id))
+            return {"interaction": {"id": str(route.webhook_id), "type": 2}}
+        return self._message(0, payload)
+
+    def summary(self, injected, started):
+        done = len(self.latencies)
+        elapsed = (self.last_reply or time.perf_counter()) - started
+        return {
+            "events": injected,
+            "completed": done,
+            "throughput": round(done / elapsed, 1) if elapsed > 0 and done else 0.0,
+            "p50_ms": _ms(percentile(self.latencies, 0.50)),
+            "p99_ms": _ms(percentile(self.latencies, 0.99)),
+            "mean_ms": _ms(statistics.fmean(self.latencies) if self.latencies else None),
+        }
+
+
+def _ms(seconds):
+    return None if seconds is None else round(seconds * 1000, 2)
+
+
+class Harness:
+    """Drives the imported `ron_bot` module through fake Discord I/O."""
+
+    def __init__(self, ron_bot, channels=500, members=1000, rest_latency=0.0):
+        self.ron_bot = ron_bot
+        self.bot = ron_bot.bot
+        self.channels = channels
+        self.members = members
+        self.fake = FakeDiscord(rest_latency)
+        # scenarios measure the commands, not the throttle in front of them
+        # (command_spam puts the limits back)
+        self.bot.throttle.set_limits({})
+        self._ids = itertools.count(discord.utils.time_snowflake(datetime.now(timezone.utc)))
+
+    async def start(self, ready_timeout=30):
+        bot = self.bot
+        # what Client.login would do, minus the network
+        await bot._async_setup_hook()
+        bot.http.request = self.fake.request
+        fake = self.fake
+
+        async def webhook_request(adapter, route, session, **kwargs):
+            return await fake.webhook_request(adapter, route, session, **kwargs)
+
+        AsyncWebhookAdapter.request = webhook_request
+        bot.owner_id = OWNER_ID
+        await bot.setup_hook()
+
+        # what READY and GUILD_CREATE would have left in the cache
+        state = bot._connection
+        state.user = ClientUser(state=state, data=user_payload(BOT_ID, bot=True))
+        state._users[BOT_ID] = state.user
+        state.application_id = BOT_ID
+        state._add_guild_from_data(guild_payload(self.channels, self.members))
+        bot._ready.set()
+        bot.dispatch("ready")
+        deadline = time.monotonic() + ready_timeout
+        while not getattr(bot, "startup_reported", True) and time.monotonic() < deadline:
+            await asyncio.sleep(0.01)
+
+    # -- events ------------------------------------------------------------
+
+    def message(self, content, index=0):
+        """Inject a MESSAGE_CREATE from member `index` in channel `index`."""
+        channel_id = FIRST_CHANNEL_ID + index % self.channels
+        user_id = FIRST_USER_ID + index % self.members
+        data = {
+            "id": str(next(self._ids)), "channel_id": str(channel_id), "guild_id": str(GUILD_ID),
+            "author": user_payload(user_id), "member": {k: v for k, v in member_payload(user_id).items() if k != "user"},
+            "content": content, "timestamp": _NOW, "edited_timestamp": None, "tts": False,
+            "mention_everyone": False, "mentions": [], "mention_roles": [], "attachments": [],
+            "embeds": [], "pinned": False, "type": 0,
+        }
+        self.fake.expect(channel_id)
+        self.bot._connection.parse_message_create(data)
+
+    def slash(self, name, options=(), index=0):
+        """Inject an INTERACTION_CREATE for slash command `name`."""
+        # created now, as far as the interaction's age is concerned (auto-defer
+        # and the ack timings are measured from the snowflake's timestamp)
+        interaction_id = discord.utils.time_snowflake(datetime.now(timezone.utc)) | (next(self._ids) & 0x3FFFFF)
+        channel_id = FIRST_CHANNEL_ID + index % self.channels
+        user_id = FIRST_USER_ID + index % self.members
+        data = {
+            "id": str(interaction_id), "application_id": str(BOT_ID), "type": 2, "token": f"bench{interaction_id}",
+            "version": 1, "guild_id": str(GUILD_ID), "channel_id": str(channel_id),
+            "channel": {"id": str(channel_id), "type": 0}, "member": dict(member_payload(user_id), permissions="0"),
+            "app_permissions": "0", "locale": "en-US", "guild_locale": "en-US", "entitlements": [],
+            "attachment_size_limit": 8 * 1024 * 1024,
+            "data": {
+                "id": str(next(self._ids)), "name": name, "type": 1,
+                "options": [{"name": key, "type": 3 if isinstance(value, str) else 4, "value": value}
+                            for key, value in options],
+            },
+        }
+        self.fake.expect(interaction_id)
+        self.bot._connection.parse_interaction_create(data)
+
+    async def inject(self, make_event, count, rate, timeout=120):
+        """Call `make_event(i)` `count` times at `rate` per second, then wait for replies.
+
+        Returns the latency/throughput summary.
+        """
+        loop = asyncio.get_running_loop()
+        started = time.perf_counter()
+        begin = loop.time()
+        for i in range(count):
+            delay = begin + i / rate - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            make_event(i)
+        deadline = time.monotonic() + timeout
+        while len(self.fake.latencies) < count and time.monotonic() < deadline:
+            await asyncio.sleep(0.01)
+        return self.fake.summary(count, started)
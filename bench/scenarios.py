@@ -0,0 +1,159 @@
+"""Benchmark scenarios.
+
+Each scenario has an optional `seed(data_dir, args)` that prepares the
+scratch data directory before `ron_bot` is imported, so loading that state
+counts as startup.  Its `run(harness, args)` coroutine returns a dict of
+results.  `count` and `rate` override the scenario's defaults.
+"""
+import asyncio
+import json
+import time
+
+from ron.fanout import RateLimiter
+from ron.storage import Store
+from ron.throttle import DEFAULT_LIMITS
+
+SCENARIOS = {}
+
+
+def scenario(name, count, rate, seed=None):
+    def register(run):
+        SCENARIOS[name] = {"run": run, "seed": seed, "count": count, "rate": rate, "doc": run.__doc__}
+        return run
+    return register
+
+
+@scenario("roll_storm", count=5000, rate=1000)
+async def roll_storm(h, args):
+    """Prefix `!roll 4d6kh3+2` from many users and channels."""
+    return await h.inject(lambda i: h.message("!roll 4d6kh3+2", i), args.count, args.rate)
+
+
+@scenario("slash_roll_storm", count=5000, rate=1000)
+async def slash_roll_storm(h, args):
+    """`/roll dice:4d6kh3+2` interactions."""
+    return await h.inject(lambda i: h.slash("roll", [("dice", "4d6kh3+2")], i), args.count, args.rate)
+
+
+@scenario("remind_bulk", count=10000, rate=2000)
+async def remind_bulk(h, args):
+    """Register reminders with `!remind 60 ...`."""
+    result = await h.inject(lambda i: h.message(f"!remind 60 bench reminder {i}", i), args.count, args.rate)
+    result["scheduled"] = len(h.bot.reminder_scheduler)
+    return result
+
+
+def seed_water(data_dir, args):
+    store = Store(data_dir / "ron.db").open()
+    for i in range(args.count):
+        store.put("water", str(900000000010000000 + i), {"subscribed": True, "slot": i % 60})
+    store.close()
+
+
+@scenario("water_fanout", count=50000, rate=None, seed=seed_water)
+async def water_fanout(h, args):
+    """One full hour of water reminders to `count` subscribers, with pacing off.
+
+    The DM rate limiters are lifted so the result is the bot's own cost per
+    DM rather than Discord's rate limit.
+    """
+    fanout = h.bot.water_fanout
+    fanout._global = RateLimiter(1e9)
+    fanout._dm_open = RateLimiter(1e9)
+    started = time.perf_counter()
+    await asyncio.gather(*(h.ron_bot.send_water_slot(h.bot, minute) for minute in range(60)))
+    elapsed = time.perf_counter() - started
+    sent = h.fake.calls["POST /channels/{channel_id}/messages"]
+    return {
+        "events": args.count, "completed": sent, "throughput": round(sent / elapsed, 1), "seconds": round(elapsed, 2),
+        "registry_bytes_per_subscriber": round(h.bot.water_subscriptions.bytes_per_subscriber(), 1),
+    }
+
+
+def seed_streaks(data_dir, args):
+    store = Store(data_dir / "ron.db").open()
+    for i in range(args.users):
+        store.put("streaks", str(900000000010000000 + i),
+                  {"streak": i % 365, "best": i % 365, "last_day": None, "guilds": []})
+    store.close()
+
+
+@scenario("leaderboard_1m", count=2000, rate=500, seed=seed_streaks)
+async def leaderboard(h, args):
+    """`!leaderboard` pages over a board of `--users` (default 1M) streaks."""
+    pages = h.bot.streaks.board.pages()
+    result = await h.inject(lambda i: h.message(f"!leaderboard {1 + (i * 7919) % pages}", i), args.count, args.rate)
+    result["board_size"] = len(h.bot.streaks.board)
+    return result
+
+
+def seed_automod(data_dir, args):
+    from bench.harness import FIRST_CHANNEL_ID, GUILD_ID
+    config = {"automod": True, "automod_action": "timeout", "mod_log_channel": FIRST_CHANNEL_ID}
+    (data_dir / "configs.json").write_text(json.dumps({str(GUILD_ID): config}))
+
+
+@scenario("automod_raid", count=20000, rate=5000, seed=seed_automod)
+async def automod_raid(h, args):
+    """A raid: every member posts the same invite link in every channel, with automod on.
+
+    Reports how many messages automod caught and how few API calls it made
+    to deal with them.
+    """
+    started = time.perf_counter()
+    loop = asyncio.get_running_loop()
+    begin = loop.time()
+    for i in range(args.count):
+        delay = begin + i / args.rate - loop.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        h.message(f"free nitro at https://example.invalid/raid {i % 3}", i)
+    elapsed = time.perf_counter() - started
+    # let the last batch of actions go out
+    await asyncio.sleep(h.bot.automod_actions.interval * 2)
+    caught = h.bot.metrics["ron_automod_violations_total"].total()
+    return {
+        "events": args.count, "completed": caught, "throughput": round(args.count / elapsed, 1),
+        "api_calls": dict(h.bot.automod_actions.calls), "tracked": len(h.bot.automod),
+    }
+
+
+def seed_quotes(data_dir, args):
+    from bench.harness import GUILD_ID
+    pack = data_dir / "packs" / str(GUILD_ID) / "quote.txt"
+    pack.parent.mkdir(parents=True)
+    with open(pack, "w", encoding="utf-8") as f:
+        f.writelines(f"Bench quote number {i}. - Ron\n" for i in range(1_000_000))
+
+
+@scenario("quote_storm", count=5000, rate=1000, seed=seed_quotes)
+async def quote_storm(h, args):
+    """`!quote` from a server whose quote pack has a million entries."""
+    from bench.harness import GUILD_ID
+    result = await h.inject(lambda i: h.message("!quote", i), args.count, args.rate)
+    result["pack_entries"] = len(h.bot.content.selection("quote", guild_id=GUILD_ID))
+    return result
+
+
+@scenario("command_spam", count=5000, rate=1000)
+async def command_spam(h, args):
+    """Ten members spam `!roll 100d100`, each in their own channel, with the default throttle limits.
+
+    Reports how many calls got through and how many replies were sent.
+    """
+    h.bot.throttle.set_limits(DEFAULT_LIMITS)
+    started = time.perf_counter()
+    loop = asyncio.get_running_loop()
+    begin = loop.time()
+    for i in range(args.count):
+        delay = begin + i / args.rate - loop.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        h.message("!roll 100d100", i % 10)
+    elapsed = time.perf_counter() - started
+    await asyncio.sleep(0.5)
+    replies = h.fake.calls["POST /channels/{channel_id}/messages"]
+    return {
+        "events": args.count, "completed": args.count - h.bot.throttle.rejected,
+        "throughput": round(args.count / elapsed, 1), "replies": replies, "buckets": len(h.bot.throttle),
+    }
@@ -0,0 +1,6 @@
+"""Support modules for Ron Bot.
+
+`ron_bot.py` stays the entrypoint and owns the Discord commands; the
+modules in this package hold the longer-lived machinery (scheduling,
+storage, ...) that the commands are built on.
+"""
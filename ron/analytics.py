@@ -0,0 +1,118 @@
+"""Engagement analytics: hydration check-ins, aggregated in memory.
+
+Every "I drank" click on a water reminder is counted here rather than
+written to the store on its own.  A user's record is a short list,
+``[day, total, today, yesterday, ..., 6 days ago]``, with `day` as a date
+ordinal.  The daily counts are a 7-day window that shifts when a later day
+is recorded.  A guild's record is ``[day, today, total]``, summed over the
+members who have joined its leaderboard.
+
+Changed records are written to the store every `flush_interval` seconds as
+one batch, so a burst of clicks costs one write per user and guild.
+`user_stats` and `guild_stats` only read counters that are already in
+memory.
+"""
+import asyncio
+import logging
+from datetime import datetime, timezone
+
+log = logging.getLogger("ron.analytics")
+
+CHECKINS_NS = "checkins"
+GUILD_CHECKINS_NS = "guild_checkins"
+WINDOW = 7
+
+
+def today_ordinal():
+    return datetime.now(timezone.utc).date().toordinal()
+
+
+class EngagementAggregator:
+    """Per-user daily check-in counters and per-guild totals, flushed in batches."""
+
+    def __init__(self, store, flush_interval=30.0):
+        self.store = store
+        self.flush_interval = flush_interval
+        self._users = {int(key): record for key, record in store.load(CHECKINS_NS).items()}
+        self._guilds = {int(key): record for key, record in store.load(GUILD_CHECKINS_NS).items()}
+        self._dirty_users = set()
+        self._dirty_guilds = set()
+        self.recorded = 0
+
+    def __len__(self):
+        return len(self._users)
+
+    def record(self, user_id, guild_ids=(), day=None):
+        """Count one check-in by `user_id` (and for each of `guild_ids`); returns their count for the day."""
+        day = day or today_ordinal()
+        record = self._users.get(user_id)
+        if record is None:
+            record = self._users[user_id] = [day, 0] + [0] * WINDOW
+        elif record[0] < day:
+            shift = min(day - record[0], WINDOW)
+            record[2:] = [0] * shift + record[2:2 + WINDOW - shift]
+            record[0] = day
+        record[1] += 1
+        record[2] += 1
+        self._dirty_users.add(user_id)
+        for guild_id in guild_ids:
+            totals = self._guilds.get(guild_id)
+            if totals is None:
+                totals = self._guilds[guild_id] = [day, 0, 0]
+            elif totals[0] < day:
+                totals[0], totals[1] = day, 0
+            totals[1] += 1
+            totals[2] += 1
+            self._dirty_guilds.add(guild_id)
+        self.recorded += 1
+        return record[2]
+
+    def user_stats(self, user_id, day=None):
+        """(today, last 7 days, all time) check-ins for `user_id`."""
+        record = self._users.get(user_id)
+        if record is None:
+            return 0, 0, 0
+        age = (day or today_ordinal()) - record[0]
+        if age >= WINDOW:
+            return 0, 0, record[1]
+        counts = record[2:2 + WINDOW - age]
+        return (counts[0] if age == 0 else 0), sum(counts), record[1]
+
+    def guild_stats(self, guild_id, day=None):
+        """(today, all time) check-ins by `guild_id`'s members."""
+        totals = self._guilds.get(guild_id)
+        if totals is None:
+            return 0, 0
+        return (totals[1] if totals[0] == (day or today_ordinal()) else 0), totals[2]
+
+    def flush(self):
+        """Hand every changed record to the store; returns how many."""
+        for user_id in self._dirty_users:
+            self.store.put(CHECKINS_NS, user_id, self._users[user_id])
+        for guild_id in self._dirty_guilds:
+            self.store.put(GUILD_CHECKINS_NS, guild_id, self._guilds[guild_id])
+        written = len(self._dirty_users) + len(self._dirty_guilds)
+        self._dirty_users, self._dirty_guilds = set(), set()
+        return written
+
+    async def run(self):
+        """Flush every `flush_interval` seconds (run as a background task)."""
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                written = self.flush()
+                if written:
+                    log.debug("Flushed %d check-in record(s)", written)
+            except Exception:
+                log.exception("Check-in flush failed")
+
+    def apply_remote(self, ns, key, record):
+        """Adopt a record written by another cluster process (None = deleted)."""
+        table, dirty = (self._users, self._dirty_users) if ns == CHECKINS_NS else (self._guilds, self._dirty_guilds)
+        key = int(key)
+        if key in dirty:
+            return  # ours is newer and will be written at the next flush
+        if record is None:
+            table.pop(key, None)
+        else:
+            table[key] = record
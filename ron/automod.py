@@ -0,0 +1,374 @@
+"""Automatic moderation of incoming messages.
+
+`Automod.check` runs for every guild message before command processing and
+costs O(1) per message.  State is kept per (guild, user) and per channel:
+
+- message and link rates are approximate sliding windows made from two
+  fixed buckets (a count for the current window and one for the previous
+  window, weighted by how much of it still overlaps);
+- duplicate content is tracked as a small ring of recent content hashes
+  with their timestamps, per user and per channel (the channel ring catches
+  the same text posted by many accounts in a raid);
+- mention spam is checked per message.
+
+Both tables are LRU-ordered dicts, bounded in size and evicted once idle for
+longer than the longest window, so memory does not grow with the number of
+people who have ever spoken.
+
+Violations are not acted on inline.  `AutomodActions` collects them and
+flushes once per interval: deletions become bulk deletes of up to 100 per
+channel, each member is timed out at most once while their timeout lasts
+(and forgotten when it ends), and each guild gets one mod-log message per
+flush.  A raid of thousands of messages therefore costs
+a bounded number of API calls.
+"""
+import asyncio
+import heapq
+import logging
+import re
+import time
+from array import array
+from collections import Counter, OrderedDict, defaultdict
+from datetime import timedelta
+
+import discord
+
+log = logging.getLogger("ron.automod")
+
+# Per-guild settings (see ron.config.SETTINGS) and their defaults
+DEFAULT_RATE = (8, 10)          # messages per user / seconds
+DEFAULT_DUPLICATES = (3, 30)    # identical messages / seconds
+DEFAULT_LINKS = (5, 30)         # links per user / seconds
+DEFAULT_MENTIONS = 6            # user and role mentions in one message
+DEFAULT_TIMEOUT_MINUTES = 10
+ACTIONS = ("delete", "timeout", "log")
+
+RING_SIZE = 8
+# Channel-wide duplicate detection ignores short messages ("gm", "lol", ...)
+CHANNEL_DUPLICATE_MIN_LENGTH = 8
+LINK_RE = re.compile(r"https?://", re.IGNORECASE)
+BULK_SIZE = 100
+
+
+def parse_limit(text):
+    """``"8/10"`` -> ``(8, 10)`` (count per seconds); raises ValueError."""
+    count, _, seconds = str(text).partition("/")
+    try:
+        count, seconds = int(count), int(seconds)
+    except ValueError:
+        raise ValueError("Use count/seconds, e.g. `8/10`.") from None
+    if not (1 <= count <= 1000 and 1 <= seconds <= 3600):
+        raise ValueError("Count must be 1-1000 and seconds 1-3600.")
+    return count, seconds
+
+
+class Rules:
+    """One guild's automod settings, parsed once per config change."""
+
+    __slots__ = ("enabled", "rate", "duplicates", "links", "mentions", "action", "timeout", "log_channel")
+
+    def __init__(self, config, guild_id):
+        get = config.get
+        self.enabled = bool(get(guild_id, "automod"))
+        self.rate = parse_limit(get(guild_id, "automod_rate", "%d/%d" % DEFAULT_RATE))
+        self.duplicates = parse_limit(get(guild_id, "automod_duplicates", "%d/%d" % DEFAULT_DUPLICATES))
+        self.links = parse_limit(get(guild_id, "automod_links", "%d/%d" % DEFAULT_LINKS))
+        self.mentions = int(get(guild_id, "automod_mentions", DEFAULT_MENTIONS))
+        self.action = get(guild_id, "automod_action", "delete")
+        self.timeout = int(get(guild_id, "automod_timeout", DEFAULT_TIMEOUT_MINUTES))
+        self.log_channel = get(guild_id, "mod_log_channel")
+
+    @property
+    def horizon(self):
+        """Seconds of history any rule looks at."""
+        return max(self.rate[1], self.duplicates[1], self.links[1])
+
+
+class Window:
+    """Approximate sliding-window counter in three numbers."""
+
+    __slots__ = ("start", "current", "previous")
+
+    def __init__(self, now):
+        self.start = now
+        self.current = 0
+        self.previous = 0
+
+    def add(self, now, span, n=1):
+        """Count `n` events at `now`; returns the estimated count over the last `span` seconds."""
+        elapsed = now - self.start
+        if elapsed >= span:
+            if elapsed < 2 * span:
+                self.previous, self.start = self.current, self.start + span
+            else:
+                self.previous, self.start = 0, now
+            self.current = 0
+            elapsed = now - self.start
+        self.current += n
+        return self.previous * (1 - elapsed / span) + self.current
+
+
+class Ring:
+    """The last RING_SIZE content hashes and when they were seen."""
+
+    __slots__ = ("hashes", "times", "next")
+
+    def __init__(self):
+        self.hashes = array("q", bytes(8 * RING_SIZE))
+        self.times = array("d", bytes(8 * RING_SIZE))
+        self.next = 0
+
+    def add(self, digest, now, span):
+        """Record `digest`; returns how many times it was seen in the last `span` seconds, this one included."""
+        since = now - span
+        seen = 1 + sum(1 for h, t in zip(self.hashes, self.times) if h == digest and t >= since)
+        self.hashes[self.next] = digest
+        self.times[self.next] = now
+        self.next = (self.next + 1) % RING_SIZE
+        return seen
+
+
+class _UserState:
+    __slots__ = ("seen", "messages", "links", "ring")
+
+    def __init__(self, now):
+        self.seen = now
+        self.messages = Window(now)
+        self.links = Window(now)
+        self.ring = Ring()
+
+
+class _ChannelState:
+    __slots__ = ("seen", "ring")
+
+    def __init__(self, now):
+        self.seen = now
+        self.ring = Ring()
+
+
+class Violation:
+    """A message that broke a rule, and what to do about it."""
+
+    __slots__ = ("rule", "detail", "rules")
+
+    def __init__(self, rule, detail, rules):
+        self.rule = rule
+        self.detail = detail
+        self.rules = rules
+
+    def __repr__(self):
+        return f"<Violation {self.rule}: {self.detail}>"
+
+
+class Automod:
+    """Per-user and per-channel spam state for every guild."""
+
+    def __init__(self, config, max_users=100_000, max_channels=20_000):
+        self.config = config
+        self.max_users = max_users
+        self.max_channels = max_channels
+        self._rules = {}  # guild ID -> (config version, Rules)
+        self._idle = 0    # longest window of any guild's rules; older state is dropped
+        self._users = OrderedDict()     # (guild ID, user ID) -> _UserState, least recently active first
+        self._channels = OrderedDict()  # channel ID -> _ChannelState
+
+    def __len__(self):
+        return len(self._users) + len(self._channels)
+
+    def rules(self, guild_id):
+        cached = self._rules.get(guild_id)
+        if cached is not None and cached[0] == self.config.version:
+            return cached[1]
+        try:
+            rules = Rules(self.config, guild_id)
+        except (TypeError, ValueError):
+            # a hand-edited configs.json with a bad value: leave automod off there
+            log.warning("Invalid automod settings for guild %s; automod is off there", guild_id)
+            rules = None
+        self._rules[guild_id] = (self.config.version, rules)
+        if rules is not None and rules.enabled:
+            self._idle = max(self._idle, rules.horizon)
+        return rules
+
+    def enabled(self, guild_id):
+        rules = self.rules(guild_id)
+        return rules is not None and rules.enabled
+
+    @staticmethod
+    def _touch(table, key, now, make):
+        state = table.get(key)
+        if state is None:
+            state = table[key] = make(now)
+        else:
+            table.move_to_end(key)
+        state.seen = now
+        return state
+
+    @staticmethod
+    def _evict(table, now, idle, limit):
+        while table:
+            key, state = next(iter(table.items()))
+            if len(table) <= limit and now - state.seen <= idle:
+                break
+            del table[key]
+
+    def check(self, guild_id, channel_id, user_id, content, mentions=0, now=None):
+        """Record one message; returns a Violation, or None if it is fine.
+
+        Cheap enough to call for every message: a few dict lookups and two
+        constant-size ring scans.
+        """
+        rules = self.rules(guild_id)
+        if rules is None or not rules.enabled:
+            return None
+        now = time.monotonic() if now is None else now
+        self._evict(self._users, now, self._idle, self.max_users)
+        self._evict(self._channels, now, self._idle, self.max_channels)
+        user = self._touch(self._users, (guild_id, user_id), now, _UserState)
+
+        violation = None
+        count, span = rules.rate
+        rate = user.messages.add(now, span)
+        if rate > count:
+            violation = Violation("rate", f"{rate:.0f} messages in {span}s", rules)
+        if mentions > rules.mentions and violation is None:
+            violation = Violation("mentions", f"{mentions} mentions in one message", rules)
+        links = len(LINK_RE.findall(content)) if "://" in content else 0
+        if links:
+            count, span = rules.links
+            seen = user.links.add(now, span, links)
+            if seen > count and violation is None:
+                violation = Violation("links", f"{seen:.0f} links in {span}s", rules)
+        text = content.strip().casefold()
+        if text:
+            digest = hash(text)
+            count, span = rules.duplicates
+            repeats = user.ring.add(digest, now, span)
+            if repeats > count and violation is None:
+                violation = Violation("duplicates", f"same message {repeats} times in {span}s", rules)
+            if len(text) >= CHANNEL_DUPLICATE_MIN_LENGTH:
+                channel = self._touch(self._channels, channel_id, now, _ChannelState)
+                repeats = channel.ring.add(digest, now, span)
+                if repeats > count and violation is None:
+                    violation = Violation("flood", f"same message {repeats} times in this channel in {span}s", rules)
+        return violation
+
+
+class AutomodActions:
+    """Batches automod deletions, timeouts and mod-log reports.
+
+    `add` only records what to do; `run` (a background task) flushes every
+    `interval` seconds.  `outbound` is the shared `OutboundQueue` used for the
+    mod-log messages.
+    """
+
+    def __init__(self, outbound, interval=1.0, max_timeouts=25):
+        self.outbound = outbound
+        self.interval = interval
+        self.max_timeouts = max_timeouts
+        self.calls = Counter()  # API calls made, by kind
+        self._deletes = defaultdict(list)   # channel -> messages
+        self._timeouts = {}                 # (guild ID, user ID) -> (member, minutes, reason)
+        self._reports = defaultdict(Counter)  # guild ID -> Counter of (user ID, rule)
+        self._deleted = Counter()           # guild ID -> messages queued for deletion
+        self._log_channels = {}             # guild ID -> mod-log channel ID
+        self._timed_out = {}                # (guild ID, user ID) -> monotonic time the timeout ends
+        self._timeout_ends = []             # heap of (end, key), to drop expired entries
+        self._pending = asyncio.Event()
+
+    def add(self, message, violation):
+        rules = violation.rules
+        guild_id, user_id = message.guild.id, message.author.id
+        if rules.action in ("delete", "timeout"):
+            self._deletes[message.channel].append(message)
+            self._deleted[guild_id] += 1
+        if rules.action == "timeout" and self._timed_out.get((guild_id, user_id), 0) < time.monotonic():
+            self._timeouts[guild_id, user_id] = (message.author, rules.timeout, f"Automod: {violation.detail}")
+        if rules.log_channel:
+            self._reports[guild_id][user_id, violation.rule] += 1
+            self._log_channels[guild_id] = rules.log_channel
+        self._pending.set()
+
+    async def run(self):
+        while True:
+            if self._timeout_ends:
+                # also wake up when the next timeout ends, to forget it
+                try:
+                    await asyncio.wait_for(self._pending.wait(), max(self._timeout_ends[0][0] - time.monotonic(), 0))
+                except asyncio.TimeoutError:
+                    self._expire(time.monotonic())
+                    continue
+            else:
+                await self._pending.wait()
+            await asyncio.sleep(self.interval)
+            self._pending.clear()
+            try:
+                await self.flush()
+            except Exception:
+                log.exception("Automod flush failed")
+
+    def _expire(self, now):
+        ends = self._timeout_ends
+        while ends and ends[0][0] <= now:
+            end, key = heapq.heappop(ends)
+            if self._timed_out.get(key) == end:  # not timed out again since
+                del self._timed_out[key]
+
+    async def flush(self):
+        self._expire(time.monotonic())
+        deletes, self._deletes = self._deletes, defaultdict(list)
+        # members beyond max_timeouts wait for the next round
+        pending = list(self._timeouts.items())
+        timeouts, self._timeouts = dict(pending[:self.max_timeouts]), dict(pending[self.max_timeouts:])
+        reports, self._reports = self._reports, defaultdict(Counter)
+        deleted, self._deleted = self._deleted, Counter()
+        if self._timeouts:
+            self._pending.set()
+        results = await asyncio.gather(
+            *(self._delete(channel, messages) for channel, messages in deletes.items()),
+            *(self._timeout(key, *args) for key, args in timeouts.items()),
+            return_exceptions=True,
+        )
+        for error in results:
+            if isinstance(error, Exception):
+                log.error("Automod action failed", exc_info=error)
+        for guild_id, counts in reports.items():
+            timed_out = {user_id for guild, user_id in timeouts if guild == guild_id}
+            self.outbound.send(self._log_channels[guild_id], embed=self._report(counts, deleted[guild_id], timed_out))
+            self.calls["log"] += 1
+
+    async def _delete(self, channel, messages):
+        for start in range(0, len(messages), BULK_SIZE):
+            chunk = messages[start:start + BULK_SIZE]
+            self.calls["delete"] += 1
+            try:
+                if len(chunk) == 1:
+                    await chunk[0].delete()
+                else:
+                    await channel.delete_messages(chunk, reason="Automod")
+            except discord.NotFound:
+                pass
+            except discord.HTTPException as exc:
+                log.warning("Automod could not delete %d message(s) in channel %s: %s", len(chunk), channel.id, exc)
+                return
+
+    async def _timeout(self, key, member, minutes, reason):
+        self.calls["timeout"] += 1
+        end = self._timed_out[key] = time.monotonic() + minutes * 60
+        heapq.heappush(self._timeout_ends, (end, key))
+        try:
+            await member.timeout(timedelta(minutes=minutes), reason=reason[:512])
+        except discord.HTTPException as exc:
+            log.warning("Automod could not time out %s in guild %s: %s", member.id, key[0], exc)
+
+    @staticmethod
+    def _report(counts, deleted, timed_out, max_lines=15):
+        lines = [
+            f"<@{user_id}>: {rule} ×{n}" + (" (timed out)" if user_id in timed_out else "")
+            for (user_id, rule), n in counts.most_common()
+        ]
+        if len(lines) > max_lines:
+            lines[max_lines:] = [f"...and {len(lines) - max_lines} more"]
+        embed = discord.Embed(title="🛡️ Automod", description="\n".join(lines), color=discord.Color.orange())
+        embed.set_footer(text=f"{sum(counts.values())} violation(s), {deleted} message(s) deleted")
+        return embed
@@ -0,0 +1,28 @@
+"""Permission checks shared by the command cogs.
+
+Reloaded along with the cogs (see `ron.reloader`), so it must not hold any
+state of its own.
+"""
+import discord
+
+# The one user allowed to use `dm`, `sync` and `config reload`
+ALLOWED_DM_USER_ID = 821102915325526046
+
+
+def is_mod_member(member, guild_config):
+    """Admins, Manage Server holders and the guild's configured mod role."""
+    perms = member.guild_permissions
+    if perms.administrator or perms.manage_guild:
+        return True
+    mod_role = guild_config.get(member.guild.id, "mod_role")
+    return mod_role is not None and member.get_role(mod_role) is not None
+
+
+def is_mod(ctx):
+    return ctx.guild is not None and is_mod_member(ctx.author, ctx.bot.guild_config)
+
+
+def is_mod_interaction(interaction: discord.Interaction):
+    if not interaction.guild or not isinstance(interaction.user, discord.Member):
+        return False
+    return is_mod_member(interaction.user, interaction.client.guild_config)
@@ -0,0 +1,293 @@
+"""Multi-process cluster launcher and shard ownership helpers.
+
+Run ``python -m ron.cluster --workers 4 --shards 16`` to start four worker
+processes of ``ron_bot.py``, each connecting an `AutoShardedBot` for its own
+contiguous range of shards (passed as ``SHARD_COUNT``/``SHARD_IDS``/
+``RON_CLUSTER_ID`` in the environment).  The supervisor restarts workers
+that crash, with exponential backoff, and stops them all on SIGTERM/SIGINT.
+
+Workers share ``ron.db``; `Ownership` decides which process acts on a given
+user or guild so that reminders and subscriptions never fire twice, and
+`Forwarder` hands work for a user to the process that owns them.
+
+``--command`` replaces the worker command line, which makes the supervisor
+testable locally without a gateway connection, e.g.::
+
+    python -m ron.cluster --workers 2 --shards 4 \\
+        --command "python -c 'import os; print(os.environ[\\"SHARD_IDS\\"])'"
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import logging
+import os
+import shlex
+import signal
+import subprocess
+import sys
+import time
+import urllib.request
+from collections import OrderedDict
+from pathlib import Path
+
+from ron import logs
+
+log = logging.getLogger("ron.cluster")
+
+ROOT = Path(__file__).resolve().parent.parent
+
+FORWARD_NS = "forwarded"
+
+
+def shard_for(snowflake, shard_count):
+    """Discord's shard formula, applied to any snowflake."""
+    return (snowflake >> 22) % shard_count
+
+
+def shard_ranges(shard_count, workers):
+    """Split shards 0..shard_count-1 into `workers` contiguous, balanced ranges."""
+    workers = max(1, min(workers, shard_count))
+    base, extra = divmod(shard_count, workers)
+    ranges, start = [], 0
+    for i in range(workers):
+        size = base + (1 if i < extra else 0)
+        ranges.append(list(range(start, start + size)))
+        start += size
+    return ranges
+
+
+class Ownership:
+    """Which users and guilds this process is responsible for.
+
+    Outside cluster mode (no shard count, or every shard in one process)
+    the process owns everything.  Users are partitioned with the same formula
+    as guilds, so DM work is spread evenly across workers.
+    """
+
+    def __init__(self, shard_count=None, shard_ids=None):
+        self.shard_count = shard_count
+        self.shard_ids = frozenset(shard_ids) if shard_ids else None
+
+    @property
+    def everything(self):
+        return not self.shard_count or self.shard_ids is None or len(self.shard_ids) >= self.shard_count
+
+    @property
+    def primary(self):
+        """True for the one process that does cluster-wide chores (shard 0)."""
+        return self.everything or 0 in self.shard_ids
+
+    def owns(self, snowflake):
+        if self.everything:
+            return True
+        return shard_for(int(snowflake), self.shard_count) in self.shard_ids
+
+    def __repr__(self):
+        if self.everything:
+            return "Ownership(all)"
+        return f"Ownership(shards={sorted(self.shard_ids)} of {self.shard_count})"
+
+
+class Forwarder:
+    """Passes requests about a user to the worker that owns them, through the store.
+
+    `forward` writes the request to the ``forwarded`` namespace and flushes
+    it at once; the owning worker gets it from the change feed, deletes it
+    and runs ``handlers[kind](request)``.  Requests still in the store when
+    a worker starts (it crashed first, or was not running) are picked up by
+    `resume`.
+    """
+
+    def __init__(self, store, ownership):
+        self.store = store
+        self.ownership = ownership
+        self.handlers = {}  # kind -> async def handler(request)
+        self._ids = itertools.count(1)
+        self._tasks = set()
+        # keys already taken: `resume` and the feed can both see a request
+        self._taken = OrderedDict()
+        self.forwarded = 0
+        self.handled = 0
+        store.follow(FORWARD_NS, self._received)
+
+    def forward(self, kind, user_id, request):
+        """Queue `request` (a JSON-serialisable dict) for the worker that owns `user_id`."""
+        key = f"{self.store.origin}:{time.time_ns()}:{next(self._ids)}"
+        self.store.put(FORWARD_NS, key, dict(request, kind=kind, user_id=user_id))
+        self.forwarded += 1
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return  # not started yet; the store's writer sends it once it is
+        # don't wait for the store's flush interval
+        self._spawn(self._flush())
+
+    async def _flush(self):
+        try:
+            await self.store.flush()
+        except Exception:
+            pass  # logged by the store, and retried by its writer
+
+    def _spawn(self, coro):
+        task = asyncio.get_running_loop().create_task(coro, name="ron: forwarded request")
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def _received(self, key, request):
+        if request is None or key in self._taken or not self.ownership.owns(request["user_id"]):
+            return
+        handler = self.handlers.get(request["kind"])
+        if handler is None:
+            # left in the store for the next start (its cog is mid-reload)
+            log.warning("No handler for forwarded %s request %s", request["kind"], key)
+            return
+        self.store.delete(FORWARD_NS, key)
+        self._taken[key] = None
+        if len(self._taken) > 10000:
+            self._taken.popitem(last=False)
+        self._spawn(self._handle(handler, request))
+
+    async def _handle(self, handler, request):
+        try:
+            await handler(request)
+        except Exception:
+            log.exception("Forwarded %s request for user %s failed", request["kind"], request["user_id"])
+        self.handled += 1
+
+    def resume(self):
+        """Handle the requests for this worker's users that are waiting in the store."""
+        for key, request in self.store.load(FORWARD_NS).items():
+            self._received(key, request)
+
+
+def recommended_shards(token):
+    """Ask Discord how many shards this bot should run."""
+    request = urllib.request.Request(
+        "https://discord.com/api/v10/gateway/bot",
+        headers={"Authorization": f"Bot {token}", "User-Agent": "RonBot (cluster launcher)"},
+    )
+    with urllib.request.urlopen(request, timeout=10) as response:
+        return int(json.load(response)["shards"])
+
+
+class Worker:
+    def __init__(self, cluster_id, shard_ids):
+        self.cluster_id = cluster_id
+        self.shard_ids = shard_ids
+        self.proc = None
+        self.started = 0.0
+        self.failures = 0
+        self.restart_at = 0.0
+
+
+class Supervisor:
+    """Spawns one process per shard range and restarts the ones that crash."""
+
+    def __init__(self, shard_count, workers, command, stable_after=60, max_backoff=300):
+        self.shard_count = shard_count
+        self.command = command
+        self.stable_after = stable_after
+        self.max_backoff = max_backoff
+        self.workers = [Worker(i, ids) for i, ids in enumerate(shard_ranges(shard_count, workers))]
+        self._stopping = False
+
+    def _spawn(self, worker):
+        env = dict(
+            os.environ,
+            SHARD_COUNT=str(self.shard_count),
+            SHARD_IDS=",".join(map(str, worker.shard_ids)),
+            RON_CLUSTER_ID=str(worker.cluster_id),
+        )
+        worker.proc = subprocess.Popen(self.command, env=env)
+        worker.started = time.monotonic()
+        log.info("Started worker %d (pid %d) for shards %s", worker.cluster_id, worker.proc.pid, worker.shard_ids)
+
+    def _check(self, worker):
+        """Handle a worker that has exited; returns False once it is finished for good."""
+        if worker.proc is None:
+            if time.monotonic() >= worker.restart_at and not self._stopping:
+                self._spawn(worker)
+            return True
+        code = worker.proc.poll()
+        if code is None:
+            return True
+        worker.proc = None
+        if code == 0 or self._stopping:
+            log.info("Worker %d exited (code %d)", worker.cluster_id, code)
+            return False
+        if time.monotonic() - worker.started >= self.stable_after:
+            worker.failures = 0
+        delay = min(2 ** worker.failures, self.max_backoff)
+        worker.failures += 1
+        worker.restart_at = time.monotonic() + delay
+        log.warning("Worker %d crashed (code %d); restarting in %ds", worker.cluster_id, code, delay)
+        return True
+
+    def stop(self, *_):
+        self._stopping = True
+        for worker in self.workers:
+            if worker.proc is not None and worker.proc.poll() is None:
+                worker.proc.terminate()
+
+    def reload(self, *_):
+        """Forward SIGHUP so every live worker reloads its cogs."""
+        for worker in self.workers:
+            if worker.proc is not None and worker.proc.poll() is None:
+                worker.proc.send_signal(signal.SIGHUP)
+
+    def run(self, poll_interval=1.0):
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        if hasattr(signal, "SIGHUP"):
+            signal.signal(signal.SIGHUP, self.reload)
+        for worker in self.workers:
+            self._spawn(worker)
+        live = list(self.workers)
+        while live:
+            live = [worker for worker in live if self._check(worker)]
+            if self._stopping:
+                break
+            time.sleep(poll_interval)
+        deadline = time.monotonic() + 10
+        for worker in self.workers:
+            if worker.proc is None:
+                continue
+            try:
+                worker.proc.wait(max(0, deadline - time.monotonic()))
+            except subprocess.TimeoutExpired:
+                log.warning("Worker %d did not stop in time; killing it", worker.cluster_id)
+                worker.proc.kill()
+                worker.proc.wait()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m ron.cluster", description="Run Ron Bot as a cluster of shard workers.")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="worker processes (default: CPU count)")
+    parser.add_argument("--shards", default="auto", help="total shard count, or 'auto' to ask Discord (default)")
+    parser.add_argument("--command", help="worker command line (default: this Python running ron_bot.py)")
+    parser.add_argument("--dry-run", action="store_true", help="print the shard plan and exit")
+    args = parser.parse_args(argv)
+    logs.setup()
+
+    if args.shards == "auto":
+        token = os.getenv("DISCORD_TOKEN")
+        if not token:
+            parser.error("--shards auto needs DISCORD_TOKEN in the environment")
+        shard_count = recommended_shards(token)
+        log.info("Discord recommends %d shard(s)", shard_count)
+    else:
+        shard_count = int(args.shards)
+    command = shlex.split(args.command) if args.command else [sys.executable, str(ROOT / "ron_bot.py")]
+
+    supervisor = Supervisor(shard_count, args.workers, command)
+    if args.dry_run:
+        for worker in supervisor.workers:
+            print(f"worker {worker.cluster_id}: shards {worker.shard_ids}")
+        return 0
+    supervisor.run()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
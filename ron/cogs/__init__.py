@@ -0,0 +1,7 @@
+"""Ron's commands, one discord.py extension per area.
+
+Every module here that does not start with an underscore is loaded at
+startup and can be reloaded in place (`reload` command or SIGHUP).  Cogs
+keep no state of their own: stores, schedulers, caches and queues are
+created once in ``ron_bot.py`` and reached through ``self.bot``.
+"""
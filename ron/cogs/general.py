@@ -0,0 +1,231 @@
+"""Everyday commands: ping, dice, quotes, motivation and help.
+
+Quotes, affirmations, workouts and tips come from the content packs in
+``bot.content`` (see ron/content.py).  Each server, and each user in DMs,
+goes through a pack without repeats.
+"""
+import asyncio
+
+import discord
+from discord import app_commands
+from discord.ext import commands
+
+from ron.dice import (
+    DETAIL_LIMIT as DICE_DETAIL_LIMIT, DiceError, distribution as dice_distribution, format_distribution,
+    format_roll, parse as parse_dice, roll as roll_dice,
+)
+
+async def run_dice(text):
+    """Roll a dice expression, or with a leading "stats" describe its distribution.
+
+    Returns the reply text; raises DiceError for bad input.  Big pools and
+    distributions are computed on a worker thread.
+    """
+    words = text.split(None, 1)
+    if words and words[0].lower() == "stats":
+        expression = parse_dice(words[1] if len(words) > 1 else "1d6")
+        lo, values = await asyncio.to_thread(dice_distribution, expression)
+        return format_distribution(expression, lo, values)
+    expression = parse_dice(text)
+    if expression.dice_count > DICE_DETAIL_LIMIT:
+        return format_roll(await asyncio.to_thread(roll_dice, expression))
+    return format_roll(roll_dice(expression))
+
+
+class General(commands.Cog):
+    def __init__(self, bot):
+        self.bot = bot
+
+    def draw(self, kind, variant=None, guild=None, user=None):
+        """Next entry of a content pack for this server (or this user, in DMs)."""
+        guild_id = guild.id if guild is not None else None
+        return self.bot.content.draw(kind, variant, guild_id, key=guild_id or user.id, default="…")
+
+    @commands.command()
+    async def ping(self, ctx):
+        """Responds with pong and latency."""
+        latency = round(self.bot.latency * 1000)
+        await ctx.send(f"Pong! {latency}ms")
+
+    @app_commands.command(name="ping")
+    async def slash_ping(self, interaction: discord.Interaction):
+        """Slash version of ping."""
+        latency = round(self.bot.latency * 1000)
+        await interaction.response.send_message(f"Pong! {latency}ms")
+
+    @commands.command()
+    async def roll(self, ctx, *, dice: str = "1d6"):
+        """Roll dice, e.g. 2d6, d20+5, 4d6kh3, 6d10!, 8d6r1. Usage: !roll <dice> or !roll stats <dice>"""
+        try:
+            reply = await run_dice(dice)
+        except DiceError as e:
+            await ctx.send(f"{e}\nUsage: !roll <dice> (e.g. 2d6, d20+5, 4d6kh3, 6d10!) or !roll stats <dice>")
+            return
+        await ctx.send(reply)
+
+    @app_commands.command(name="roll")
+    @app_commands.describe(
+        dice="Dice to roll, e.g. 2d6, d20+5, 4d6kh3 (keep highest 3), 6d10! (exploding), 8d6r1 (reroll 1s)",
+        stats="Show the exact probability distribution instead of rolling",
+    )
+    async def slash_roll(self, interaction: discord.Interaction, dice: str = "1d6", stats: bool = False):
+        try:
+            reply = await run_dice(f"stats {dice}" if stats else dice)
+        except DiceError as e:
+            await interaction.response.send_message(f"{e}\nUsage: /roll 2d6 (also d20+5, 4d6kh3, 6d10!)", ephemeral=True)
+            return
+        await interaction.response.send_message(reply)
+
+    @commands.command()
+    async def quote(self, ctx):
+        """Send a random motivational quote."""
+        await ctx.send(self.draw("quote", guild=ctx.guild, user=ctx.author))
+
+    @app_commands.command(name="quote")
+    async def slash_quote(self, interaction: discord.Interaction):
+        await interaction.response.send_message(self.draw("quote", guild=interaction.guild, user=interaction.user))
+
+    @commands.command()
+    async def about(self, ctx):
+        """Show information about Ron Bot."""
+        embed = discord.Embed(
+            title="🤖 Ron Bot",
+            description="The friendly wellness and moderation companion!",
+            color=discord.Color.blue()
+        )
+        embed.add_field(
+            name="Features",
+            value="💧 Hydration Reminders • 💪 Wellness • 🎯 Motivation • 🧹 Moderation",
+            inline=False
+        )
+        embed.add_field(
+            name="Commands",
+            value="`!quote` • `!roll NdM` • `!ping` • `!remind` • `!reminders` • `!waterreminder` • `!purge` • `!announce` • `!stats` • `!leaderboard` • `!health`",
+            inline=False
+        )
+        embed.add_field(
+            name="QOL Features",
+            value="`!help` • `!motivate` • `!workout` • `!breathing` • `!tip` • `!about`",
+            inline=False
+        )
+        embed.set_footer(text="Stay hydrated, stay healthy! 💚")
+        await ctx.send(embed=embed)
+
+    @app_commands.command(name="about")
+    async def slash_about(self, interaction: discord.Interaction):
+        """Show information about Ron Bot."""
+        embed = discord.Embed(
+            title="🤖 Ron Bot",
+            description="The friendly wellness and moderation companion!",
+            color=discord.Color.blue()
+        )
+        embed.add_field(
+            name="Features",
+            value="💧 Hydration Reminders • 💪 Wellness • 🎯 Motivation • 🧹 Moderation",
+            inline=False
+        )
+        embed.add_field(
+            name="Commands",
+            value="`/quote` • `/roll` • `/ping` • `/remind` • `/reminders` • `/waterreminder` • `/purge` • `/announce` • `/stats` • `/leaderboard` • `/health`",
+            inline=False
+        )
+        embed.add_field(
+            name="QOL Features",
+            value="`/help` • `/motivate` • `/workout` • `/breathing` • `/tip` • `/about`",
+            inline=False
+        )
+        embed.set_footer(text="Stay hydrated, stay healthy! 💚")
+        await interaction.response.send_message(embed=embed)
+
+    @app_commands.command(name="help")
+    async def slash_help(self, interaction: discord.Interaction):
+        """Show all available Ron Bot commands."""
+        embed = discord.Embed(
+            title="📚 Ron Bot Commands",
+            color=discord.Color.green()
+        )
+
+        embed.add_field(
+            name="🧹 **Moderation**",
+            value="`/purge <count>` - Delete messages, with optional filters (mods only)\n`/announce <message> [channel] [category] [delay]` - Post or schedule an announcement",
+            inline=False
+        )
+
+        embed.add_field(
+            name="🎯 **Fun & Motivation**",
+            value="`/ping` - Check bot latency\n"
+                  "`/quote` - Random motivational quote\n"
+                  "`/motivate` - Quick motivation boost\n"
+                  "`/roll <dice>` - Roll dice (e.g., 2d6, d20+5, 4d6kh3)",
+            inline=False
+        )
+
+        embed.add_field(
+            name="💚 **Wellness**",
+            value="`/waterreminder` - Subscribe to hourly water reminders\n"
+                  "`/watersettings` - Set your time zone and quiet hours\n"
+                  "`/workout` - Get a quick workout suggestion\n"
+                  "`/breathing` - Guided breathing exercises\n"
+                  "`/tip` - Daily wellness tip",
+            inline=False
+        )
+
+        embed.add_field(
+            name="⏰ **Reminders**",
+            value="`/remind <when> <message>` - Set a personal reminder (e.g. `in 2h`, `tomorrow 9am`, `every weekday at 17:00`)\n"
+                  "`/reminders` - List, cancel or snooze your reminders",
+            inline=False
+        )
+
+        embed.add_field(
+            name="ℹ️ **Info**",
+            value="`/about` - About Ron Bot\n"
+                  "`/packs` - Content packs in use here\n"
+                  "`/help` - This message",
+            inline=False
+        )
+        embed.add_field(
+            name="📊 **Stats & Health**",
+            value="`/stats` - View your reminder stats\n"
+                  "`/leaderboard` - See top streaks\n"
+                  "`/health` - Bot status (owner only)",
+            inline=False
+        )
+
+        embed.set_footer(text="Both prefix (!) and slash (/) commands work!")
+        await interaction.response.send_message(embed=embed)
+
+    @commands.command()
+    async def motivate(self, ctx):
+        """Get a quick motivational boost."""
+        await ctx.send(f"💪 {self.draw('affirmation', guild=ctx.guild, user=ctx.author)}")
+
+    @app_commands.command(name="motivate")
+    async def slash_motivate(self, interaction: discord.Interaction):
+        """Get a quick motivational boost."""
+        await interaction.response.send_message(f"💪 {self.draw('affirmation', guild=interaction.guild, user=interaction.user)}")
+
+    @commands.command()
+    async def workout(self, ctx, difficulty: str = None):
+        """Get a workout suggestion. Usage: !workout [difficulty]"""
+        guild_id = ctx.guild.id if ctx.guild else None
+        if difficulty and difficulty.lower() in self.bot.content.variants("workout", guild_id):
+            suggestion = self.draw("workout", difficulty.lower(), ctx.guild, ctx.author)
+            await ctx.send(f"💪 {difficulty.capitalize()} workout: {suggestion}")
+        else:
+            suggestion = self.draw("workout", guild=ctx.guild, user=ctx.author)
+            await ctx.send(f"💪 Random workout: {suggestion}")
+
+    @commands.command()
+    async def tip(self, ctx, theme: str = None):
+        """Get a wellness tip. Usage: !tip [theme]"""
+        guild_id = ctx.guild.id if ctx.guild else None
+        if theme and theme.lower() in self.bot.content.variants("tip", guild_id):
+            suggestion = self.draw("tip", theme.lower(), ctx.guild, ctx.author)
+            await ctx.send(f"🌟 {theme.capitalize()} tip: {suggestion}")
+        else:
+            suggestion = self.draw("tip", guild=ctx.guild, user=ctx.author)
+            await ctx.send(f"🌟 Random tip: {suggestion}")
+
+async def setup(bot):
+    await bot.add_cog(General(bot))
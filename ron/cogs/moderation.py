@@ -0,0 +1,440 @@
+"""Moderation: purges, announcements and per-server settings (including automod's).
+
+Purge jobs and the outbound message queue are created once in
+``ron_bot.py`` (``bot.purges``, ``bot.outbound``) so running jobs and queued
+messages survive a reload of this cog.
+"""
+import re
+from datetime import timedelta
+
+import discord
+from discord import app_commands
+from discord.ext import commands
+
+from ron.automod import ACTIONS as AUTOMOD_ACTIONS, parse_limit
+from ron.checks import ALLOWED_DM_USER_ID, is_mod, is_mod_interaction
+from ron.config import SETTINGS as CONFIG_SETTINGS
+from ron.purge import (
+    PurgeBusy, make_filter as make_purge_filter, parse_age, parse_filters as parse_purge_filters,
+    parse_point as parse_purge_point,
+)
+from ron.throttle import format_limits, parse_limits
+
+# Purges run as background jobs (see ron/purge.py): any number of messages,
+# optional filters, bulk deletes for recent messages and paced single
+# deletes for older ones.  One job per server at a time.
+PURGE_MAX = 10000
+# Filtered purges stop after reading this many messages of history
+PURGE_SCAN_LIMIT = 50000
+
+# Announcements, immediate or scheduled, are sent through the shared
+# outbound queue (see ron/outbound.py): per-channel buckets drained
+# concurrently, retries with backoff, and a delivery summary at the end.
+ANNOUNCE_CHANNEL_RE = re.compile(r"<#(\d+)>")
+ANNOUNCE_MAX_DELAY = timedelta(days=28)
+
+
+def find_category(guild, text):
+    """A category of `guild` by ID or (case-insensitive) name, or None."""
+    if text.isdigit():
+        category = guild.get_channel(int(text))
+        return category if isinstance(category, discord.CategoryChannel) else None
+    return discord.utils.find(lambda c: c.name.lower() == text.lower(), guild.categories)
+
+
+def parse_announce(guild, text):
+    """Split ``[in:<delay>] [targets...] <message>`` into its parts.
+
+    Targets are channel mentions, ``category:<name|id>`` and ``to:all``.
+    Returns (channel IDs, categories, everywhere, delay, message); raises
+    ValueError for an unknown category or a bad delay.
+    """
+    channel_ids, categories, everywhere, delay = [], [], False, None
+    rest = text.strip()
+    while rest:
+        token, *remainder = rest.split(None, 1)
+        lowered = token.lower()
+        mention = ANNOUNCE_CHANNEL_RE.fullmatch(token)
+        if mention:
+            channel_ids.append(int(mention[1]))
+        elif lowered == "to:all":
+            everywhere = True
+        elif lowered.startswith("category:"):
+            category = find_category(guild, token[len("category:"):])
+            if category is None:
+                raise ValueError(f"No category called {token[len('category:'):]!r} in this server.")
+            categories.append(category)
+        elif lowered.startswith("in:"):
+            delay = parse_age(token[len("in:"):])
+        else:
+            break
+        rest = remainder[0] if remainder else ""
+    return channel_ids, categories, everywhere, delay, rest
+
+
+def announcement_embed(message, author_name):
+    embed = discord.Embed(title="📢 Announcement", description=message, color=discord.Color.gold())
+    embed.set_footer(text=f"Posted by {author_name}")
+    return embed
+
+
+def delivery_report(delivery):
+    return ("⚠️ " if delivery.failed else "✅ ") + delivery.summary()
+
+
+def check_announce_delay(delay):
+    if delay is not None and delay > ANNOUNCE_MAX_DELAY:
+        raise ValueError(f"Announcements can be scheduled at most {ANNOUNCE_MAX_DELAY.days} days ahead.")
+
+
+def parse_config_value(guild, key, raw):
+    """Turn user input into a stored config value; raises ValueError if invalid."""
+    if raw is None or raw.lower() in ("reset", "none", "off"):
+        return None
+    if key == "prefix":
+        if len(raw) > 5 or any(c.isspace() for c in raw):
+            raise ValueError("Prefixes must be 1-5 characters with no spaces.")
+        return raw
+    if key == "automod":
+        if raw.lower() not in ("on", "true", "yes"):
+            raise ValueError("Use `on` or `off`.")
+        return True
+    if key == "automod_action":
+        if raw.lower() not in AUTOMOD_ACTIONS:
+            raise ValueError(f"Choose one of: {', '.join(AUTOMOD_ACTIONS)}.")
+        return raw.lower()
+    if key in ("automod_rate", "automod_duplicates", "automod_links"):
+        count, seconds = parse_limit(raw)
+        return f"{count}/{seconds}"
+    if key == "throttle":
+        return format_limits(parse_limits(raw))
+    if key in ("automod_mentions", "automod_timeout"):
+        # Discord caps timeouts at 28 days
+        limit = 100 if key == "automod_mentions" else 40320
+        if not raw.isdigit() or not 1 <= int(raw) <= limit:
+            raise ValueError(f"`{key}` must be a number from 1 to {limit}.")
+        return int(raw)
+    digits = "".join(c for c in raw if c.isdigit())
+    if not digits:
+        raise ValueError(f"`{key}` needs a mention or ID.")
+    value = int(digits)
+    if key == "mod_role" and guild.get_role(value) is None:
+        raise ValueError("That role does not exist in this server.")
+    if key != "mod_role" and guild.get_channel(value) is None:
+        raise ValueError("That channel does not exist in this server.")
+    return value
+
+
+class Moderation(commands.Cog):
+    def __init__(self, bot):
+        self.bot = bot
+
+    async def cog_load(self):
+        # scheduled announcements are stored on the reminder scheduler
+        self.bot.scheduled_handlers["announcement"] = self.deliver_announcement
+
+    async def cog_unload(self):
+        self.bot.scheduled_handlers.pop("announcement", None)
+
+    def start_purge(self, channel, requested_by, count, purge_filter, on_progress, anchor=None):
+        """Start a purge job; returns (job, None) or (None, error message)."""
+        if not 1 <= count <= PURGE_MAX:
+            return None, f"Please specify a count between 1 and {PURGE_MAX}."
+        scan_limit = count if purge_filter.empty else max(count, PURGE_SCAN_LIMIT)
+        try:
+            job = self.bot.purges.start(channel, requested_by, count, purge_filter, on_progress,
+                                        scan_limit=scan_limit, anchor=anchor)
+        except PurgeBusy:
+            running = ", ".join(f"#{job.id}" for job in self.bot.purges.for_guild(channel.guild.id))
+            return None, f"A purge is already running in this server ({running}). Cancel it with `purge cancel`."
+        return job, None
+
+    def cancel_purges(self, guild_id, job_id=None):
+        """Cancel this guild's purge `job_id` (or all of them); returns the jobs cancelled."""
+        jobs = [job for job in self.bot.purges.for_guild(guild_id) if job_id is None or job.id == job_id]
+        for job in jobs:
+            job.cancel()
+        return jobs
+
+    @commands.group(invoke_without_command=True)
+    async def purge(self, ctx, count: int = 10, *filters: str):
+        """Moderator command: delete `count` messages from this channel, optionally filtered.
+
+        Usage: !purge <count> [user:<member>] [match:<text>] [bots] [attachments]
+        [after:<message id|age>] [before:<message id|age>]
+        """
+        if not is_mod(ctx):
+            await ctx.send("❌ You don't have permission to use this command.")
+            return
+
+        # member lookups may need the network in lean member-cache mode, so
+        # resolve the user: filters up front
+        user_ids = {}
+        for token in filters:
+            key, _, value = token.partition(":")
+            if key.lower() == "user" and value:
+                member = await self.bot.member_index.resolve(ctx.guild, value)
+                user_ids[value] = member.id if member is not None else int(value) if value.isdigit() else None
+
+        try:
+            purge_filter = parse_purge_filters(filters, user_ids.get)
+        except ValueError as e:
+            await ctx.send(str(e))
+            return
+        # the job edits this message as it goes; it is posted after the command
+        # message, which is where the job starts reading history
+        progress = await ctx.send("⏳ Starting purge...")
+
+        async def on_progress(job, final):
+            await progress.edit(content=job.summary(), delete_after=15 if final else None)
+
+        job, error = self.start_purge(ctx.channel, ctx.author.id, count, purge_filter, on_progress, anchor=ctx.message)
+        if error:
+            await progress.edit(content=error)
+            return
+        try:
+            await ctx.message.delete()
+        except discord.HTTPException as e:
+            self.bot.errors("purge.delete_invocation", e)
+
+    @purge.command(name="cancel")
+    async def purge_cancel(self, ctx, job_id: int = None):
+        """Cancel this server's running purge. Usage: !purge cancel [job]"""
+        if not is_mod(ctx):
+            await ctx.send("❌ You don't have permission to use this command.")
+            return
+        cancelled = self.cancel_purges(ctx.guild.id, job_id)
+        await ctx.send(f"Cancelling purge {', '.join(f'#{job.id}' for job in cancelled)}." if cancelled else "No purge to cancel.")
+
+    @purge.command(name="status")
+    async def purge_status(self, ctx):
+        """Show this server's running purges. Usage: !purge status"""
+        if not is_mod(ctx):
+            await ctx.send("❌ You don't have permission to use this command.")
+            return
+        jobs = self.bot.purges.for_guild(ctx.guild.id)
+        await ctx.send("\n".join(job.summary() for job in jobs) if jobs else "No purge is running.")
+
+    @app_commands.command(name="purge")
+    @app_commands.describe(
+        count=f"Number of messages to delete (1-{PURGE_MAX})",
+        user="Only delete messages from this member",
+        match="Only delete messages containing this text (case-insensitive, * matches anything)",
+        bots="Only delete messages from bots",
+        attachments="Only delete messages with attachments",
+        after="Only messages after this message ID or age (e.g. 2h)",
+        before="Only messages before this message ID or age (e.g. 30m)",
+    )
+    async def slash_purge(self, interaction: discord.Interaction, count: int = 10, user: discord.Member = None,
+                          match: str = None, bots: bool = False, attachments: bool = False,
+                          after: str = None, before: str = None):
+        if not is_mod_interaction(interaction):
+            await interaction.response.send_message("❌ You don't have permission to use this command.", ephemeral=True)
+            return
+        try:
+            purge_filter = make_purge_filter(
+                author_ids=[user.id] if user else (), pattern=match, bots_only=bots, attachments_only=attachments,
+                after=parse_purge_point(after) if after else None, before=parse_purge_point(before) if before else None,
+            )
+        except ValueError as e:
+            await interaction.response.send_message(str(e), ephemeral=True)
+            return
+
+        async def on_progress(job, final):
+            # the interaction token expires after 15 minutes; later updates are dropped
+            await interaction.edit_original_response(content=job.summary())
+
+        # acknowledge first: the job reports back by editing this response
+        await interaction.response.defer(ephemeral=True, thinking=True)
+        job, error = self.start_purge(interaction.channel, interaction.user.id, count, purge_filter, on_progress)
+        await interaction.edit_original_response(content=error or job.summary())
+
+    @app_commands.command(name="purgecancel")
+    @app_commands.describe(job="Purge job number (default: all running purges in this server)")
+    async def slash_purgecancel(self, interaction: discord.Interaction, job: int = None):
+        if not is_mod_interaction(interaction):
+            await interaction.response.send_message("❌ You don't have permission to use this command.", ephemeral=True)
+            return
+        cancelled = self.cancel_purges(interaction.guild.id, job)
+        await interaction.response.send_message(
+            f"Cancelling purge {', '.join(f'#{j.id}' for j in cancelled)}." if cancelled else "No purge to cancel.",
+            ephemeral=True,
+        )
+
+    async def announcement_targets(self, guild, user, channel_ids=(), categories=(), everywhere=False):
+        """Resolve the target channel IDs for an announcement; raises ValueError."""
+        targets = []
+        for channel_id in channel_ids:
+            if not isinstance(guild.get_channel(channel_id), discord.TextChannel):
+                raise ValueError(f"<#{channel_id}> is not a text channel in this server.")
+            targets.append(channel_id)
+        for category in categories:
+            targets += [channel.id for channel in category.text_channels]
+        if everywhere:
+            if not await self.bot.is_owner(user):
+                raise ValueError("Only the bot owner can announce to every server.")
+            targets += self.bot.guild_config.each("announce_channel").values()
+        if not targets and not channel_ids and not categories:
+            configured = self.bot.guild_config.get(guild.id, "announce_channel")
+            if configured is None:
+                raise ValueError(
+                    "Name a channel or category, or set this server's announcement channel with "
+                    "`config announce_channel #channel`."
+                )
+            targets.append(configured)
+        if not targets:
+            raise ValueError("There are no text channels to announce to.")
+        return list(dict.fromkeys(targets))
+
+    def schedule_announcement(self, guild, channel, user, targets, message, delay):
+        """Schedule an announcement; returns a confirmation for the requester."""
+        job = self.bot.reminder_scheduler.schedule(
+            user.id, message, delay.total_seconds(), guild_id=guild.id, channel_id=channel.id,
+            kind="announcement", payload={"targets": targets, "author": user.display_name},
+        )
+        return f"🗓️ Announcement #{job.id} to {len(targets)} channel(s) scheduled for <t:{int(job.due)}:f>."
+
+    async def deliver_announcement(self, job):
+        """Send a scheduled announcement and post its delivery summary where it was requested."""
+        delivery = self.bot.outbound.broadcast(
+            job.payload["targets"], embed=announcement_embed(job.content, job.payload["author"]),
+        )
+        await delivery.wait()
+        if job.channel_id:
+            self.bot.outbound.send(job.channel_id, f"<@{job.user_id}> Scheduled announcement #{job.id}: {delivery_report(delivery)}")
+
+    @commands.command()
+    async def announce(self, ctx, *, text: str):
+        """Moderator command: send a highlighted announcement to one or more channels.
+
+        Usage: !announce [in:<delay>] [#channel ...] [category:<name|id>] [to:all] <message>
+        With no target it goes to this server's configured announcement channel.
+        """
+        if not is_mod(ctx):
+            await ctx.send("❌ You don't have permission to use this command.")
+            return
+        try:
+            channel_ids, categories, everywhere, delay, message = parse_announce(ctx.guild, text)
+            if not message:
+                raise ValueError("Please include the announcement message.")
+            check_announce_delay(delay)
+            targets = await self.announcement_targets(ctx.guild, ctx.author, channel_ids, categories, everywhere)
+        except ValueError as e:
+            await ctx.send(str(e))
+            return
+        if delay:
+            await ctx.send(self.schedule_announcement(ctx.guild, ctx.channel, ctx.author, targets, message, delay))
+            return
+        progress = await ctx.send(f"📤 Sending announcement to {len(targets)} channel(s)...")
+        delivery = self.bot.outbound.broadcast(targets, embed=announcement_embed(message, ctx.author.display_name))
+        await delivery.wait()
+        await progress.edit(content=delivery_report(delivery))
+
+    @app_commands.command(name="announce")
+    @app_commands.describe(
+        message="Announcement message",
+        channel="Target channel (default: this server's announcement channel)",
+        channels="More target channels, as #mentions",
+        category="Send to every text channel in this category",
+        everywhere="Bot owner only: every server's configured announcement channel",
+        delay="Send later instead, e.g. 30m, 2h or 1d",
+    )
+    async def slash_announce(self, interaction: discord.Interaction, message: str, channel: discord.TextChannel = None,
+                             channels: str = None, category: discord.CategoryChannel = None,
+                             everywhere: bool = False, delay: str = None):
+        if not is_mod_interaction(interaction):
+            await interaction.response.send_message("❌ You don't have permission to use this command.", ephemeral=True)
+            return
+        channel_ids = [channel.id] if channel else []
+        if channels:
+            mentions = ANNOUNCE_CHANNEL_RE.findall(channels)
+            if not mentions or ANNOUNCE_CHANNEL_RE.sub("", channels).strip(" ,"):
+                await interaction.response.send_message("`channels` should be a list of #channel mentions.", ephemeral=True)
+                return
+            channel_ids += [int(channel_id) for channel_id in mentions]
+        try:
+            wait = parse_age(delay) if delay else None
+            check_announce_delay(wait)
+            targets = await self.announcement_targets(
+                interaction.guild, interaction.user, channel_ids, [category] if category else [], everywhere,
+            )
+        except ValueError as e:
+            await interaction.response.send_message(str(e), ephemeral=True)
+            return
+        if wait:
+            await interaction.response.send_message(
+                self.schedule_announcement(interaction.guild, interaction.channel, interaction.user, targets, message, wait),
+                ephemeral=True,
+            )
+            return
+        # acknowledge first: a large broadcast can take longer than the 3s response window
+        await interaction.response.defer(ephemeral=True, thinking=True)
+        delivery = self.bot.outbound.broadcast(targets, embed=announcement_embed(message, interaction.user.display_name))
+        await delivery.wait()
+        await interaction.edit_original_response(content=delivery_report(delivery))
+
+    def format_guild_config(self, guild):
+        cfg = self.bot.guild_config.all(guild.id)
+        lines = [f"⚙️ **Settings for {guild.name}:**"]
+        for key, description in CONFIG_SETTINGS.items():
+            value = cfg.get(key)
+            if value is None:
+                shown = f"`{self.bot.guild_config.default_prefix}`" if key == "prefix" else "not set"
+            elif value is True:
+                shown = "`on`"
+            elif key == "mod_role":
+                shown = f"<@&{value}>"
+            elif key.endswith("_channel"):
+                shown = f"<#{value}>"
+            else:
+                shown = f"`{value}`"
+            lines.append(f"- `{key}`: {shown} ({description})")
+        return "\n".join(lines)
+
+    @commands.command()
+    async def config(self, ctx, key: str = None, *, value: str = None):
+        """Moderator command: view or change server settings. Usage: !config [key] [value|reset]"""
+        if key == "reload":
+            if ctx.author.id != ALLOWED_DM_USER_ID:
+                await ctx.send("❌ You don't have permission to use this command.")
+                return
+            self.bot.guild_config.load()
+            await ctx.send("✅ Reloaded configs.json.")
+            return
+        if not is_mod(ctx):
+            await ctx.send("❌ You don't have permission to use this command.")
+            return
+        if key is None:
+            await ctx.send(self.format_guild_config(ctx.guild), allowed_mentions=discord.AllowedMentions.none())
+            return
+        if key not in CONFIG_SETTINGS:
+            await ctx.send(f"Unknown setting `{key}`. Options: {', '.join(CONFIG_SETTINGS)}")
+            return
+        try:
+            self.bot.guild_config.set(ctx.guild.id, key, parse_config_value(ctx.guild, key, value))
+        except ValueError as e:
+            await ctx.send(str(e))
+            return
+        await ctx.send(f"✅ Updated `{key}`.")
+
+    @app_commands.command(name="config")
+    @app_commands.describe(key="Setting to change", value="New value (mention, ID or text); leave empty to reset")
+    @app_commands.choices(key=[app_commands.Choice(name=k, value=k) for k in CONFIG_SETTINGS])
+    async def slash_config(self, interaction: discord.Interaction, key: str = None, value: str = None):
+        """View or change server settings (mods only)."""
+        if not is_mod_interaction(interaction):
+            await interaction.response.send_message("❌ You don't have permission to use this command.", ephemeral=True)
+            return
+        if key is None:
+            await interaction.response.send_message(self.format_guild_config(interaction.guild), ephemeral=True)
+            return
+        try:
+            self.bot.guild_config.set(interaction.guild_id, key, parse_config_value(interaction.guild, key, value))
+        except ValueError as e:
+            await interaction.response.send_message(str(e), ephemeral=True)
+            return
+        await interaction.response.send_message(f"✅ Updated `{key}`.", ephemeral=True)
+
+
+async def setup(bot):
+    await bot.add_cog(Moderation(bot))
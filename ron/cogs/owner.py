@@ -0,0 +1,273 @@
+"""Owner tools: DMs, slash sync, health, profiling and code reloads."""
+import asyncio
+import io
+import re
+import threading
+from datetime import datetime
+
+import discord
+from discord import app_commands
+from discord.ext import commands
+
+from ron.checks import ALLOWED_DM_USER_ID
+from ron.profiling import sample_profile
+
+# Image links in a DM message are sent as an embed
+IMAGE_URL_RE = re.compile(r"(https?://\S+\.(?:png|jpg|jpeg|gif|webp))", re.IGNORECASE)
+PROFILE_MAX_SECONDS = 60
+
+
+class Owner(commands.Cog):
+    def __init__(self, bot):
+        self.bot = bot
+
+    @commands.command(name="dm")
+    async def dm(self, ctx, member: discord.Member, *, message: str):
+        """Send a DM to another member (restricted to invoker user ID 821102915325526046)."""
+        # Restrict to invoker user ID
+        if getattr(ctx.author, 'id', None) != ALLOWED_DM_USER_ID:
+            await ctx.send("You are not allowed to use this command.")
+            return
+        # delete the invoking command message so only the invoker sees the result
+        try:
+            await ctx.message.delete()
+        except Exception as e:
+            self.bot.errors("dm.delete_invocation", e)
+
+        # Check for an attachment on the invoking message
+        attachment = None
+        try:
+            if ctx.message.attachments:
+                attachment = ctx.message.attachments[0]
+        except Exception as e:
+            self.bot.errors("dm.attachment", e)
+            attachment = None
+
+        try:
+            if attachment:
+                file = await attachment.to_file()
+                await member.send(content=message or None, file=file)
+            else:
+                # look for image URL in message
+                m = IMAGE_URL_RE.search(message or "")
+                if m:
+                    url = m.group(1)
+                    embed = discord.Embed()
+                    embed.set_image(url=url)
+                    await member.send(content=(message or None), embed=embed)
+                else:
+                    await member.send(message or None)
+            try:
+                await ctx.author.send(f"Sent DM to {member.display_name}.")
+            except Exception as e:
+                self.bot.errors("dm.confirm", e)
+        except Exception as e:
+            self.bot.errors("dm.send", e)
+            try:
+                await ctx.author.send(f"Failed to send DM to {member.display_name}: {e}")
+            except Exception:
+                # last resort public error
+                await ctx.send(f"Failed to send DM: {e}")
+
+    @app_commands.command(name="dm")
+    @app_commands.describe(target="Member identifier (ID, mention, username#discrim, or name)", message="Message content")
+    async def slash_dm(self, interaction: discord.Interaction, target: str, message: str, image: discord.Attachment = None):
+        # Ensure allowed user
+        if getattr(interaction.user, 'id', None) != ALLOWED_DM_USER_ID:
+            await interaction.response.send_message("You are not allowed to use this command.", ephemeral=True)
+            return
+        if not message:
+            await interaction.response.send_message("Missing message content.", ephemeral=True)
+            return
+        guild = interaction.guild
+        if guild is None:
+            await interaction.response.send_message("This command must be used in a server.", ephemeral=True)
+            return
+        # resolving a name can mean chunking the guild in lean member-cache mode
+        await interaction.response.defer(ephemeral=True)
+        resolved = await self.bot.member_index.resolve(guild, target)
+        if resolved is None:
+            await interaction.followup.send(f"Could not resolve target member: {target}. Use a mention, ID, or username#discrim.", ephemeral=True)
+            return
+        try:
+            if image:
+                file = await image.to_file()
+                await resolved.send(content=message or None, file=file)
+            else:
+                m = IMAGE_URL_RE.search(message or "")
+                if m:
+                    url = m.group(1)
+                    embed = discord.Embed()
+                    embed.set_image(url=url)
+                    await resolved.send(content=(message or None), embed=embed)
+                else:
+                    await resolved.send(message or None)
+            await interaction.followup.send(f"Sent DM to {resolved.display_name}.", ephemeral=True)
+        except Exception as e:
+            self.bot.errors("dm.send", e)
+            await interaction.followup.send(f"Failed to send DM: {e}", ephemeral=True)
+
+    @slash_dm.autocomplete("target")
+    async def dm_target_autocomplete(self, interaction: discord.Interaction, current: str):
+        if interaction.guild is None or getattr(interaction.user, 'id', None) != ALLOWED_DM_USER_ID:
+            return []
+        choices = []
+        try:
+            # a lean-mode chunk can outlast the autocomplete deadline; it
+            # carries on in the background and later keystrokes wait on it
+            index = await asyncio.wait_for(self.bot.member_index.ensure(interaction.guild), 2.5)
+        except asyncio.TimeoutError:
+            return []
+        for name, member_id in index.suggest(current):
+            # no fetches here: autocomplete has to answer within 3 seconds
+            member = self.bot.member_index.cached(interaction.guild, member_id)
+            label = name if member is None or name == member.name.lower() else f"{name} ({member.name})"
+            choices.append(app_commands.Choice(name=label[:100], value=str(member_id)))
+        return choices
+
+    @commands.command()
+    async def sync(self, ctx, mode: str = None):
+        """Sync slash commands with Discord if they changed. Owner only. Usage: !sync [force]"""
+        if ctx.author.id != ALLOWED_DM_USER_ID:
+            await ctx.send("❌ You don't have permission to use this command.")
+            return
+        try:
+            results = await self.bot.tree_syncer.sync(force=(mode == "force"))
+        except Exception as e:
+            await ctx.send(f"❌ Failed to sync commands: {e}")
+            return
+        lines = [
+            f"✅ Synced {n} slash commands ({scope})" if n is not None
+            else f"⏭️ Slash commands unchanged ({scope}); use `!sync force` to sync anyway"
+            for scope, n in results.items()
+        ]
+        await ctx.send("\n".join(lines))
+
+    def health_embed(self):
+        """Build the health embed from the same counters the metrics endpoint serves."""
+        uptime = datetime.now() - self.bot.launch_time
+        latency = self.bot.latency * 1000 if self.bot.latency == self.bot.latency else 0
+        process = self.bot.process
+        with process.oneshot():
+            rss_mb = process.memory_info().rss / 1024 / 1024
+            cpu = process.cpu_percent(None)
+            fds = process.num_fds() if hasattr(process, "num_fds") else process.num_handles()
+        metrics = self.bot.metrics
+        command_latency, command_errors = metrics["ron_command_latency_seconds"], metrics["ron_command_errors_total"]
+        dm_sent = metrics["ron_dms_sent_total"]
+        p99 = command_latency.quantile(0.99)
+        ack_p99 = metrics["ron_interaction_ack_seconds"].quantile(0.99)
+
+        embed = discord.Embed(title="Bot Health Check", color=0x00ff00)
+        embed.add_field(name="Uptime", value=str(uptime).split('.')[0], inline=True)
+        embed.add_field(name="Gateway Latency", value=f"{latency:.0f} ms", inline=True)
+        embed.add_field(name="Event Loop Lag", value=f"{metrics['ron_event_loop_lag_seconds'].value() * 1000:.1f} ms", inline=True)
+        subscribers = self.bot.water_subscriptions
+        embed.add_field(
+            name="Water Subscribers",
+            value=f"{len(subscribers)} ({subscribers.bytes_per_subscriber():.1f} B each)",
+            inline=True,
+        )
+        embed.add_field(name="Pending Reminders", value=str(len(self.bot.reminder_scheduler)), inline=True)
+        embed.add_field(name="Asyncio Tasks", value=str(len(asyncio.all_tasks())), inline=True)
+        embed.add_field(name="Memory (RSS)", value=f"{rss_mb:.1f} MB", inline=True)
+        embed.add_field(name="CPU", value=f"{cpu:.1f}%", inline=True)
+        embed.add_field(name="Open Files", value=str(fds), inline=True)
+        embed.add_field(
+            name="Commands",
+            value=f"{command_latency.total()} run, {command_errors.total()} errors, p99 ≤ {p99 * 1000:.0f} ms; "
+                  f"{metrics['ron_ignored_errors_total'].total()} ignored errors logged; "
+                  f"slash first response p99 ≤ {ack_p99 * 1000:.0f} ms, {self.bot.deferrer.auto_deferred} auto-deferred",
+            inline=False,
+        )
+        embed.add_field(
+            name="DMs Sent",
+            value=f"{dm_sent.value('water', 'delivered')} water, {dm_sent.value('reminder', 'delivered')} reminders, "
+                  f"{dm_sent.value('water', 'failed') + dm_sent.value('reminder', 'failed')} failed",
+            inline=False,
+        )
+        if self.bot.water_fanout_stats is not None:
+            embed.add_field(name="Last Water Batch", value=str(self.bot.water_fanout_stats), inline=False)
+        if self.bot.stall_watchdog.stalls:
+            last = self.bot.stall_watchdog.stalls[-1]
+            took = "ongoing" if last.duration is None else f"{last.duration * 1000:.0f} ms"
+            embed.add_field(
+                name="Loop Stalls",
+                value=f"{len(self.bot.stall_watchdog.stalls)} recent; last {took} in {last.label} (see `stalls`)",
+                inline=False,
+            )
+        return embed
+
+    @commands.command()
+    @commands.is_owner()
+    async def health(self, ctx):
+        """Check the bot's health and status. Usage: !health"""
+        await ctx.send(embed=self.health_embed())
+
+    @app_commands.command(name="health")
+    async def slash_health(self, interaction: discord.Interaction):
+        """Bot status and resource usage (owner only)."""
+        if not await self.bot.is_owner(interaction.user):
+            await interaction.response.send_message("❌ You don't have permission to use this command.", ephemeral=True)
+            return
+        await interaction.response.send_message(embed=self.health_embed(), ephemeral=True)
+
+    async def run_profile(self, seconds):
+        """Sample the event loop for `seconds`; returns a discord.File of collapsed stacks."""
+        async with self.bot.profile_lock:
+            folded, samples = await asyncio.to_thread(sample_profile, threading.get_ident(), seconds)
+        name = f"ron-profile-{datetime.now():%Y%m%d-%H%M%S}.folded"
+        return discord.File(io.BytesIO(folded.encode()), filename=name), samples
+
+    @commands.command()
+    @commands.is_owner()
+    async def profile(self, ctx, seconds: int = 10):
+        """Profile the running bot (owner only). Usage: !profile [seconds]"""
+        if not 1 <= seconds <= PROFILE_MAX_SECONDS:
+            await ctx.send(f"Profile length must be between 1 and {PROFILE_MAX_SECONDS} seconds.")
+            return
+        if self.bot.profile_lock.locked():
+            await ctx.send("A profile is already running.")
+            return
+        await ctx.send(f"Sampling the event loop for {seconds}s...")
+        file, samples = await self.run_profile(seconds)
+        await ctx.send(f"{samples} samples, in collapsed-stack format (flamegraph.pl, speedscope).", file=file)
+
+    @app_commands.command(name="profile")
+    @app_commands.describe(seconds=f"How long to sample (1-{PROFILE_MAX_SECONDS}s)")
+    async def slash_profile(self, interaction: discord.Interaction, seconds: app_commands.Range[int, 1, PROFILE_MAX_SECONDS] = 10):
+        """Profile the running bot (owner only)."""
+        if not await self.bot.is_owner(interaction.user):
+            await interaction.response.send_message("❌ You don't have permission to use this command.", ephemeral=True)
+            return
+        if self.bot.profile_lock.locked():
+            await interaction.response.send_message("A profile is already running.", ephemeral=True)
+            return
+        await interaction.response.defer(ephemeral=True, thinking=True)
+        file, samples = await self.run_profile(seconds)
+        await interaction.followup.send(
+            f"{samples} samples, in collapsed-stack format (flamegraph.pl, speedscope).", file=file, ephemeral=True)
+
+    @commands.command()
+    @commands.is_owner()
+    async def stalls(self, ctx):
+        """Show recent event-loop stalls and what blocked the loop (owner only). Usage: !stalls"""
+        report = self.bot.stall_watchdog.report()
+        if not report:
+            await ctx.send("No event-loop stalls recorded.")
+            return
+        await ctx.send(
+            f"{len(self.bot.stall_watchdog.stalls)} recent stall(s), most recent first:",
+            file=discord.File(io.BytesIO(report.encode()), filename="ron-stalls.txt"),
+        )
+
+    @commands.command()
+    @commands.is_owner()
+    async def reload(self, ctx, mode: str = None):
+        """Reload changed command modules without reconnecting (owner only). Usage: !reload [all]"""
+        result = await self.bot.reloader.reload(everything=(mode == "all"))
+        await ctx.send(f"{'⚠️' if result.failed else '✅'} {result}")
+
+
+async def setup(bot):
+    await bot.add_cog(Owner(bot))
@@ -0,0 +1,119 @@
+"""Content packs: list them, and let moderators upload their server's own.
+
+The packs themselves are loaded and indexed by ``bot.content`` (see
+ron/content.py); this cog only moves files in and out of the server's pack
+directory and asks for a rescan.
+"""
+import asyncio
+import os
+
+import discord
+from discord import app_commands
+from discord.ext import commands
+
+from ron.checks import ALLOWED_DM_USER_ID, is_mod
+from ron.content import parse_name
+
+# Uploaded packs are indexed, not loaded into memory, but keep them sane
+PACK_MAX_BYTES = 8 * 1024 * 1024
+PACK_MAX_PER_GUILD = 20
+
+
+def _write(path, data):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+
+
+class Packs(commands.Cog):
+    def __init__(self, bot):
+        self.bot = bot
+
+    def format_packs(self, guild_id):
+        content = self.bot.content
+        lines = ["**Content packs**"]
+        for kind, count in content.kinds(guild_id).items():
+            packs = content.packs(kind, guild_id)
+            variants = content.variants(kind, guild_id)
+            line = f"- `{kind}`: {count} entries ({content.source(packs[0])})"
+            if variants:
+                line += f"; {', '.join(f'`{variant}`' for variant in variants)}"
+            lines.append(line)
+        if len(lines) == 1:
+            lines.append("No packs loaded.")
+        return "\n".join(lines)
+
+    @commands.group(invoke_without_command=True)
+    async def packs(self, ctx):
+        """List the content packs in use here. Usage: !packs [upload|remove|reload]"""
+        await ctx.send(self.format_packs(ctx.guild.id if ctx.guild else None))
+
+    @packs.command(name="upload")
+    async def packs_upload(self, ctx, name: str):
+        """Moderator command: replace a pack for this server with an attached .txt file.
+
+        Usage: !packs upload <kind>[.<variant>] (e.g. quote, tip.hydration), one entry per line
+        """
+        if not is_mod(ctx):
+            await ctx.send("❌ You don't have permission to use this command.")
+            return
+        filename = name.lower().removesuffix(".txt") + ".txt"
+        if parse_name(filename) is None:
+            await ctx.send("Pack names look like `quote` or `workout.easy` (letters, digits and underscores).")
+            return
+        if not ctx.message.attachments:
+            await ctx.send("Attach a .txt file with one entry per line.")
+            return
+        attachment = ctx.message.attachments[0]
+        if attachment.size > PACK_MAX_BYTES:
+            await ctx.send(f"Packs can be at most {PACK_MAX_BYTES // (1024 * 1024)} MB.")
+            return
+        directory = self.bot.content.guild_dir(ctx.guild.id)
+        existing = {path.name for path in directory.glob("*.txt")} if directory.is_dir() else set()
+        if filename not in existing and len(existing) >= PACK_MAX_PER_GUILD:
+            await ctx.send(f"This server already has {PACK_MAX_PER_GUILD} packs; remove one first.")
+            return
+        data = await attachment.read()
+        try:
+            data.decode("utf-8")
+        except UnicodeDecodeError:
+            await ctx.send("Packs must be UTF-8 text.")
+            return
+        await asyncio.to_thread(_write, directory / filename, data)
+        await self.bot.content.rescan()
+        kind, variant = parse_name(filename)
+        count = len(self.bot.content.selection(kind, variant, ctx.guild.id))
+        await ctx.send(f"✅ `{filename[:-4]}` now has {count} entries for this server.")
+
+    @packs.command(name="remove")
+    async def packs_remove(self, ctx, name: str):
+        """Moderator command: remove one of this server's packs. Usage: !packs remove <kind>[.<variant>]"""
+        if not is_mod(ctx):
+            await ctx.send("❌ You don't have permission to use this command.")
+            return
+        path = self.bot.content.guild_dir(ctx.guild.id) / (name.lower().removesuffix(".txt") + ".txt")
+        if parse_name(path.name) is None or not path.is_file():
+            await ctx.send(f"This server has no `{name}` pack.")
+            return
+        path.unlink()
+        await self.bot.content.rescan()
+        await ctx.send(f"✅ Removed `{path.stem}`; the default pack is used again.")
+
+    @packs.command(name="reload")
+    async def packs_reload(self, ctx):
+        """Rescan every pack directory now (bot owner only). Usage: !packs reload"""
+        if ctx.author.id != ALLOWED_DM_USER_ID:
+            await ctx.send("❌ You don't have permission to use this command.")
+            return
+        loaded, removed = await self.bot.content.rescan()
+        await ctx.send(f"✅ Content packs rescanned: {loaded} loaded, {removed} removed.")
+
+    @app_commands.command(name="packs")
+    async def slash_packs(self, interaction: discord.Interaction):
+        """List the content packs in use here."""
+        await interaction.response.send_message(self.format_packs(interaction.guild_id), ephemeral=True)
+
+
+async def setup(bot):
+    await bot.add_cog(Packs(bot))
@@ -0,0 +1,263 @@
+"""Personal reminders: one-off or recurring, listed, cancelled and snoozed per user.
+
+Reminders are delivered by the scheduler in ``ron_bot.py``
+(``bot.reminder_scheduler``); times are parsed by ron/recurrence.py in the
+user's time zone.
+
+In cluster mode a user's reminders are held by the worker that owns the
+user.  A command that reaches another worker is forwarded to that one
+(``bot.forwarder``), which answers it: in the channel for prefix commands,
+or by following up the deferred interaction for slash commands.
+"""
+import discord
+from discord import app_commands
+from discord.ext import commands
+
+from ron.hydration import is_valid_timezone
+from ron.recurrence import MAX_DELAY, WhenError, describe as describe_repeat, parse_duration, parse_when
+
+MAX_REMINDERS_PER_USER = 50
+LIST_LIMIT = 15
+DEFAULT_SNOOZE = 10 * 60
+
+REMIND_USAGE = (
+    "Usage: `remind <when> <message>`, e.g. `remind in 2h30m stretch`, `remind tomorrow 9am call the bank`, "
+    "`remind every weekday at 17:00 stand up` or `remind cron 0 9 * * 1-5 standup`."
+)
+
+
+def format_when(due):
+    return f"<t:{int(due)}:R> (<t:{int(due)}:f>)"
+
+
+def only_mentions(user_id):
+    # replies quote reminder text, so nothing but the user may ping
+    return discord.AllowedMentions(everyone=False, roles=False, users=[discord.Object(user_id)])
+
+
+class Reminders(commands.Cog):
+    def __init__(self, bot):
+        self.bot = bot
+        self.ops = {
+            "remind": self.create_reminder,
+            "list": self.list_reminders,
+            "cancel": self.cancel_reminder,
+            "snooze": self.snooze_reminder,
+        }
+
+    async def cog_load(self):
+        self.bot.forwarder.handlers["reminders"] = self.run_forwarded
+
+    async def cog_unload(self):
+        self.bot.forwarder.handlers.pop("reminders", None)
+
+    # -- routing -------------------------------------------------------------
+
+    async def respond(self, target, op, *args):
+        """Run `op` for the invoking user and reply, here or on the worker holding their reminders."""
+        interaction = target if isinstance(target, discord.Interaction) else None
+        user_id = interaction.user.id if interaction else target.author.id
+        mentions = only_mentions(user_id)
+        if self.bot.ownership.owns(user_id):
+            text = self.ops[op](user_id, *args)
+            if interaction:
+                await interaction.response.send_message(text, ephemeral=True, allowed_mentions=mentions)
+            else:
+                await target.send(text, allowed_mentions=mentions)
+            return
+        if interaction:
+            await interaction.response.defer(ephemeral=True, thinking=True)
+            reply = {"application_id": interaction.application_id, "token": interaction.token}
+        else:
+            reply = {"channel_id": target.channel.id}
+        self.bot.forwarder.forward("reminders", user_id, {"op": op, "args": list(args), "reply": reply})
+
+    async def run_forwarded(self, request):
+        """Forwarder handler: a reminder command from another worker."""
+        user_id = request["user_id"]
+        text = self.ops[request["op"]](user_id, *request["args"])
+        reply = request["reply"]
+        mentions = only_mentions(user_id)
+        try:
+            if "token" in reply:
+                followup = discord.Webhook.from_state(
+                    {"id": reply["application_id"], "type": 3, "token": reply["token"]}, self.bot._connection)
+                await followup.send(text, ephemeral=True, allowed_mentions=mentions)
+            else:
+                await self.bot.get_partial_messageable(reply["channel_id"]).send(text, allowed_mentions=mentions)
+        except discord.HTTPException as e:
+            # e.g. the interaction token expired while the request waited
+            self.bot.errors("reminders.forwarded_reply", e)
+
+    # -- operations ----------------------------------------------------------
+
+    def user_timezone(self, user_id):
+        """The user's reminder time zone, else their water reminder one, else UTC."""
+        tz = self.bot.user_timezones.get(str(user_id))
+        if tz is None:
+            tz = self.bot.water_subscriptions.timezone(user_id)
+        return tz or "UTC"
+
+    def create_reminder(self, user_id, guild_id, text, message=None):
+        """Parse and schedule a reminder; returns the reply text.
+
+        With `message` None, `text` holds both the time and the message (the
+        prefix command); otherwise `text` must be only the time.
+        """
+        scheduler = self.bot.reminder_scheduler
+        if scheduler.count_for(user_id) >= MAX_REMINDERS_PER_USER:
+            return f"You already have {MAX_REMINDERS_PER_USER} reminders; cancel some with `reminders cancel <id>`."
+        tz = self.user_timezone(user_id)
+        try:
+            when, rest = parse_when(text, tz)
+        except WhenError as e:
+            return f"{e}\n{REMIND_USAGE}"
+        if message is None:
+            message = rest
+        elif rest:
+            return f"I didn't understand `{rest}` as part of the time.\n{REMIND_USAGE}"
+        if not message.strip():
+            return f"What should I remind you about?\n{REMIND_USAGE}"
+        reminder = scheduler.schedule(
+            user_id, message[:1500], when.due - discord.utils.utcnow().timestamp(), guild_id=guild_id,
+            repeat=when.repeat,
+        )
+        reply = f"Okay <@{user_id}>, I'll remind you {format_when(reminder.due)}"
+        if when.repeat is not None:
+            reply += f" and then {describe_repeat(when.repeat)} ({tz})"
+        return reply + f". Reminder `#{reminder.id}`."
+
+    def list_reminders(self, user_id):
+        reminders = self.bot.reminder_scheduler.for_user(user_id)
+        if not reminders:
+            return "You have no pending reminders. Set one with `remind in 1h stretch`."
+        lines = [f"⏰ **Your reminders** ({len(reminders)}, times in your local time):"]
+        for reminder in reminders[:LIST_LIMIT]:
+            content = reminder.content if len(reminder.content) <= 60 else reminder.content[:57] + "..."
+            line = f"`#{reminder.id}` {format_when(reminder.due)}: {content}"
+            if reminder.repeat is not None:
+                line += f" 🔁 {describe_repeat(reminder.repeat)}"
+            lines.append(line)
+        if len(reminders) > LIST_LIMIT:
+            lines.append(f"...and {len(reminders) - LIST_LIMIT} more.")
+        return "\n".join(lines)
+
+    def own_reminder(self, user_id, reminder_id, include_fired=False):
+        scheduler = self.bot.reminder_scheduler
+        reminder = scheduler.get(reminder_id)
+        if reminder is None and include_fired:
+            reminder = scheduler.recently_fired(reminder_id)
+        if reminder is None or reminder.user_id != user_id or reminder.kind is not None:
+            return None
+        return reminder
+
+    def cancel_reminder(self, user_id, reminder_id):
+        if self.own_reminder(user_id, reminder_id) is None:
+            return f"You have no pending reminder `#{reminder_id}`."
+        self.bot.reminder_scheduler.cancel(reminder_id)
+        return f"🗑️ Cancelled reminder `#{reminder_id}`."
+
+    def snooze_reminder(self, user_id, reminder_id, duration=None):
+        if self.own_reminder(user_id, reminder_id, include_fired=True) is None:
+            return f"You have no reminder `#{reminder_id}` to snooze."
+        delay = DEFAULT_SNOOZE
+        tokens = (duration or "").lower().split()
+        if tokens:
+            delay, end = parse_duration(tokens, 1 if tokens[0] == "for" else 0)
+            if delay is None or end != len(tokens) or not 60 <= delay <= MAX_DELAY:
+                return "Snooze for a duration from a minute up to a year, e.g. `10m`, `2h` or `1d`."
+        reminder = self.bot.reminder_scheduler.snooze(reminder_id, delay)
+        return f"😴 Snoozed `#{reminder_id}` until {format_when(reminder.due)}."
+
+    def set_timezone(self, user_id, tz):
+        if tz is None:
+            return f"Your reminder time zone is `{self.user_timezone(user_id)}`. Change it with `reminders timezone <zone>`."
+        if not is_valid_timezone(tz):
+            return f"Unknown time zone `{tz}`. Try something like `Europe/Berlin` or `America/New_York`."
+        self.bot.user_timezones[str(user_id)] = tz
+        self.bot.store.put("user_tz", str(user_id), tz)
+        return f"🌍 Reminder times are now in `{tz}`. Reminders you already set keep their times."
+
+    # -- prefix commands -----------------------------------------------------
+
+    @commands.command()
+    async def remind(self, ctx, *, text: str = ""):
+        """Set a reminder: !remind in 2h30m stretch, !remind every weekday at 17:00 stand up"""
+        await self.respond(ctx, "remind", ctx.guild.id if ctx.guild else None, text)
+
+    @commands.group(invoke_without_command=True)
+    async def reminders(self, ctx):
+        """List your reminders. Usage: !reminders [list|cancel <id>|snooze <id> [duration]|timezone [zone]]"""
+        await self.respond(ctx, "list")
+
+    @reminders.command(name="list")
+    async def reminders_list(self, ctx):
+        """List your pending reminders."""
+        await self.respond(ctx, "list")
+
+    @reminders.command(name="cancel")
+    async def reminders_cancel(self, ctx, reminder_id: int):
+        """Cancel one of your reminders. Usage: !reminders cancel <id>"""
+        await self.respond(ctx, "cancel", reminder_id)
+
+    @reminders.command(name="snooze")
+    async def reminders_snooze(self, ctx, reminder_id: int, *, duration: str = None):
+        """Postpone a reminder, or repeat one that just fired. Usage: !reminders snooze <id> [10m]"""
+        await self.respond(ctx, "snooze", reminder_id, duration)
+
+    @reminders.command(name="timezone", aliases=["tz"])
+    async def reminders_timezone(self, ctx, tz: str = None):
+        """Show or set the time zone for reminder times. Usage: !reminders timezone [zone]"""
+        await ctx.send(self.set_timezone(ctx.author.id, tz))
+
+    # -- slash commands ------------------------------------------------------
+
+    @app_commands.command(name="remind")
+    @app_commands.describe(
+        when="e.g. in 2h30m, tomorrow 9am, friday at noon, every weekday at 17:00, cron 0 9 * * 1-5",
+        message="Reminder message",
+    )
+    async def slash_remind(self, interaction: discord.Interaction, when: str, message: str):
+        await self.respond(interaction, "remind", interaction.guild_id, when, message)
+
+    slash_reminders = app_commands.Group(name="reminders", description="List, cancel or snooze your reminders")
+
+    @slash_reminders.command(name="list")
+    async def slash_reminders_list(self, interaction: discord.Interaction):
+        """List your pending reminders."""
+        await self.respond(interaction, "list")
+
+    @slash_reminders.command(name="cancel")
+    @app_commands.describe(reminder="Reminder number, as shown by /reminders list")
+    async def slash_reminders_cancel(self, interaction: discord.Interaction, reminder: int):
+        """Cancel one of your reminders."""
+        await self.respond(interaction, "cancel", reminder)
+
+    @slash_reminders.command(name="snooze")
+    @app_commands.describe(reminder="Reminder number", duration="How long, e.g. 10m, 2h or 1d (default 10m)")
+    async def slash_reminders_snooze(self, interaction: discord.Interaction, reminder: int, duration: str = None):
+        """Postpone a reminder, or repeat one that just fired."""
+        await self.respond(interaction, "snooze", reminder, duration)
+
+    @slash_reminders.command(name="timezone")
+    @app_commands.describe(timezone="Your time zone, e.g. Europe/Berlin (leave empty to see the current one)")
+    async def slash_reminders_timezone(self, interaction: discord.Interaction, timezone: str = None):
+        """Show or set the time zone for reminder times."""
+        await interaction.response.send_message(self.set_timezone(interaction.user.id, timezone), ephemeral=True)
+
+    @slash_reminders_cancel.autocomplete("reminder")
+    @slash_reminders_snooze.autocomplete("reminder")
+    async def reminder_autocomplete(self, interaction: discord.Interaction, current: str):
+        # suggestions must be answered here and now, so another worker's
+        # reminders are not offered (typing the number still works)
+        if not self.bot.ownership.owns(interaction.user.id):
+            return []
+        reminders = self.bot.reminder_scheduler.for_user(interaction.user.id)
+        return [
+            app_commands.Choice(name=f"#{reminder.id}: {reminder.content}"[:100], value=reminder.id)
+            for reminder in reminders if current in str(reminder.id)
+        ][:25]
+
+
+async def setup(bot):
+    await bot.add_cog(Reminders(bot))
@@ -0,0 +1,282 @@
+"""Hydration reminder subscriptions, check-ins, settings, stats and leaderboards.
+
+The subscriber registry (ron/hydration.py), streak engine and check-in
+aggregator (ron/analytics.py) live on the bot (see ``ron_bot.py``, which
+also runs the hourly fan-out); these commands only read and update them.
+
+Every water DM carries "I drank" and "Snooze" buttons with fixed custom
+IDs.  They are answered by one persistent view registered at load, so
+nothing is kept per message and buttons on DMs sent before a restart keep
+working.
+"""
+import logging
+import time
+
+import discord
+from discord import app_commands
+from discord.ext import commands
+from pytz import all_timezones
+
+from ron.hydration import is_valid_timezone
+
+log = logging.getLogger("ron.cogs.water")
+
+CHECKIN_ID = "ron:water:drank"
+SNOOZE_ID = "ron:water:snooze"
+SNOOZE_KIND = "water_snooze"
+SNOOZE_SECONDS = 15 * 60
+
+
+def format_water_settings(data):
+    quiet = data.get("quiet")
+    quiet_text = f"{quiet[0]:02d}:00-{quiet[1]:02d}:00" if quiet else "off"
+    return (
+        f"💧 Reminders at :{data['slot']:02d} past each hour\n"
+        f"- Time zone: {data.get('tz', 'UTC')}\n"
+        f"- Quiet hours: {quiet_text}"
+    )
+
+
+class CheckinView(discord.ui.View):
+    """The buttons under a water reminder."""
+
+    def __init__(self, cog):
+        super().__init__(timeout=None)
+        self.cog = cog
+
+    @discord.ui.button(label="I drank", emoji="💧", style=discord.ButtonStyle.success, custom_id=CHECKIN_ID)
+    async def drank(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self.cog.check_in(interaction)
+
+    @discord.ui.button(label="Snooze 15 min", emoji="⏰", style=discord.ButtonStyle.secondary, custom_id=SNOOZE_ID)
+    async def snooze(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self.cog.snooze(interaction)
+
+
+class Water(commands.Cog):
+    def __init__(self, bot):
+        self.bot = bot
+        self.view = CheckinView(self)
+
+    async def cog_load(self):
+        # one view answers the buttons on every water DM...
+        self.bot.add_view(self.view)
+        # ...and DMs are sent with a stopped copy, which discord.py does not
+        # store per message
+        dm_view = CheckinView(self)
+        dm_view.stop()
+        self.bot.water_dm_view = dm_view
+        self.bot.scheduled_handlers[SNOOZE_KIND] = self.deliver_snoozed
+
+    async def cog_unload(self):
+        self.view.stop()
+        self.bot.water_dm_view = None
+        self.bot.scheduled_handlers.pop(SNOOZE_KIND, None)
+
+    # -- check-ins -----------------------------------------------------------
+
+    async def check_in(self, interaction):
+        user_id = interaction.user.id
+        today = self.bot.analytics.record(user_id, self.bot.streaks.get(user_id)["guilds"])
+        streak = self.bot.streaks.mark_active(user_id)
+        self.bot.metrics["ron_water_checkins_total"].inc("drank")
+        glasses = "1 glass" if today == 1 else f"{today} glasses"
+        await self.close_buttons(interaction, f"✅ Logged! {glasses} today, {streak}-day streak. 💪")
+
+    async def snooze(self, interaction):
+        user_id = interaction.user.id
+        if user_id not in self.bot.water_subscriptions:
+            await self.close_buttons(interaction, "You're no longer subscribed to water reminders.")
+            return
+        scheduler = self.bot.reminder_scheduler
+        pending = scheduler.for_user(user_id, kind=SNOOZE_KIND)
+        if pending:
+            job = scheduler.reschedule(pending[0].id, time.time() + SNOOZE_SECONDS)
+        else:
+            job = scheduler.schedule(user_id, "", SNOOZE_SECONDS, kind=SNOOZE_KIND)
+        self.bot.metrics["ron_water_checkins_total"].inc("snooze")
+        await self.close_buttons(interaction, f"⏰ I'll remind you again <t:{int(job.due)}:R>.")
+
+    async def close_buttons(self, interaction, note):
+        # the buttons go away once used, so a reminder counts at most once
+        content = interaction.message.content if interaction.message else ""
+        await interaction.response.edit_message(content=f"{content}\n-# {note}", view=None)
+
+    async def deliver_snoozed(self, job):
+        """Scheduler handler: the reminder a user snoozed."""
+        if job.user_id not in self.bot.water_subscriptions:
+            return
+        delivered = await self.bot.water_fanout.send(
+            job.user_id, self.bot.content.draw("water", key=job.user_id), view=self.bot.water_dm_view)
+        self.bot.metrics["ron_dms_sent_total"].inc("water", "delivered" if delivered else "failed")
+
+    # -- subscriptions -------------------------------------------------------
+
+    async def handle_waterreminder(self, user_id, interaction=None, ctx=None, guild_id=None):
+        """Shared handler for water reminder commands."""
+        self.bot.streaks.join_guild(user_id, guild_id)
+        subscribers = self.bot.water_subscriptions
+        if subscribers.discard(user_id):
+            self.bot.store.delete("water", user_id)
+            message = "💧 You've unsubscribed from water reminders."
+            log.info("User %s unsubscribed from water reminders.", user_id)
+        else:
+            slot = subscribers.least_loaded()
+            data = {"subscribed": True, "slot": slot, "tz": "UTC"}
+            subscribers.set(user_id, data)
+            self.bot.store.put("water", user_id, data)
+            message = (
+                f"💧 You've subscribed to hourly water reminders at :{slot:02d} past each hour! Stay hydrated! 💪\n"
+                "Use `watersettings` to set your time zone and quiet hours."
+            )
+            log.info("User %s subscribed to water reminders.", user_id)
+
+        if interaction:
+            await interaction.response.send_message(message)
+        elif ctx:
+            await ctx.send(message)
+
+    @commands.command()
+    async def waterreminder(self, ctx):
+        """Subscribe to hourly water reminders. Usage: !waterreminder"""
+        await self.handle_waterreminder(ctx.author.id, ctx=ctx, guild_id=ctx.guild.id if ctx.guild else None)
+
+    @app_commands.command(name="waterreminder")
+    async def slash_waterreminder(self, interaction: discord.Interaction):
+        """Subscribe to hourly water reminders."""
+        await self.handle_waterreminder(interaction.user.id, interaction=interaction, guild_id=interaction.guild_id)
+
+    def update_water_settings(self, user_id, tz=None, quiet_start=None, quiet_end=None, quiet_off=False):
+        """Apply time zone / quiet hour changes; returns (ok, message)."""
+        data = self.bot.water_subscriptions.get(user_id)
+        if data is None:
+            return False, "You're not subscribed to water reminders. Use `waterreminder` first."
+        if tz is not None:
+            if not is_valid_timezone(tz):
+                return False, f"Unknown time zone `{tz}`. Try something like `Europe/Berlin` or `America/New_York`."
+            data["tz"] = tz
+        if quiet_off:
+            data.pop("quiet", None)
+        elif quiet_start is not None or quiet_end is not None:
+            if quiet_start is None or quiet_end is None or not (0 <= quiet_start <= 23 and 0 <= quiet_end <= 23):
+                return False, "Quiet hours need a start and end hour between 0 and 23, e.g. `22 7`."
+            data["quiet"] = [quiet_start, quiet_end]
+        self.bot.water_subscriptions.set(user_id, data)
+        self.bot.store.put("water", user_id, data)
+        return True, format_water_settings(data)
+
+    @commands.command()
+    async def watersettings(self, ctx, setting: str = None, *values: str):
+        """Water reminder settings. Usage: !watersettings [tz <zone> | quiet <start> <end> | quiet off]"""
+        try:
+            if setting is None:
+                ok, message = self.update_water_settings(ctx.author.id)
+            elif setting.lower() == "tz" and len(values) == 1:
+                ok, message = self.update_water_settings(ctx.author.id, tz=values[0])
+            elif setting.lower() == "quiet" and values == ("off",):
+                ok, message = self.update_water_settings(ctx.author.id, quiet_off=True)
+            elif setting.lower() == "quiet" and len(values) == 2:
+                ok, message = self.update_water_settings(ctx.author.id, quiet_start=int(values[0]), quiet_end=int(values[1]))
+            else:
+                raise ValueError
+        except ValueError:
+            await ctx.send("Usage: !watersettings [tz <zone> | quiet <start> <end> | quiet off]")
+            return
+        await ctx.send(message)
+
+    @app_commands.command(name="watersettings")
+    @app_commands.describe(
+        timezone="Your time zone, e.g. Europe/Berlin",
+        quiet_start="Hour (0-23, your time) when quiet hours start",
+        quiet_end="Hour (0-23, your time) when quiet hours end",
+        quiet_off="Turn quiet hours off",
+    )
+    async def slash_watersettings(self, interaction: discord.Interaction, timezone: str = None,
+                                  quiet_start: int = None, quiet_end: int = None, quiet_off: bool = False):
+        """View or change your water reminder time zone and quiet hours."""
+        ok, message = self.update_water_settings(interaction.user.id, timezone, quiet_start, quiet_end, quiet_off)
+        await interaction.response.send_message(message, ephemeral=True)
+
+    @slash_watersettings.autocomplete("timezone")
+    async def watersettings_timezone_autocomplete(self, interaction: discord.Interaction, current: str):
+        current = current.lower()
+        matches = [tz for tz in all_timezones if current in tz.lower()]
+        return [app_commands.Choice(name=tz, value=tz) for tz in matches[:25]]
+
+    def format_stats(self, user_id, guild_id=None):
+        record = self.bot.streaks.get(user_id)
+        subscribed = "Yes" if user_id in self.bot.water_subscriptions else "No"
+        rank = self.bot.streaks.board.rank(user_id)
+        today, week, total = self.bot.analytics.user_stats(user_id)
+        lines = [
+            "📊 **Your Stats:**",
+            f"- Subscribed to reminders: {subscribed}",
+            f"- Check-ins: {today} today, {week} in the last 7 days, {total} in total",
+            f"- Current streak: {record['streak']} days",
+            f"- Best streak: {record['best']} days",
+            f"- Global rank: {f'#{rank}' if rank else 'unranked'}",
+        ]
+        if guild_id is not None:
+            guild_rank = self.bot.streaks.guild_board(guild_id).rank(user_id)
+            lines.append(f"- Server rank: {f'#{guild_rank}' if guild_rank else 'unranked'}")
+            guild_today, guild_total = self.bot.analytics.guild_stats(guild_id)
+            lines.append(f"- Server check-ins: {guild_today} today, {guild_total} in total")
+        return "\n".join(lines)
+
+    def format_leaderboard(self, user_id, guild_id=None, page=1):
+        """Render one page of the global board, or the server's if guild_id is given."""
+        board = self.bot.streaks.board if guild_id is None else self.bot.streaks.guild_board(guild_id)
+        pages = board.pages()
+        page = min(max(page, 1), pages)
+        entries = board.page(page)
+        title = "🏆 **Leaderboard:**" if guild_id is None else "🏆 **Server Leaderboard:**"
+        if not entries:
+            return f"{title}\nNo streaks yet. Subscribe with `waterreminder` and press 💧 I drank on a reminder to get started!"
+        lines = [f"{rank}. <@{uid}> - {streak} days" for rank, uid, streak in entries]
+        rank = board.rank(user_id)
+        footer = f"Page {page}/{pages}" + (f" • Your rank: #{rank}" if rank else "")
+        return f"{title}\n" + "\n".join(lines) + f"\n{footer}"
+
+    @commands.command()
+    async def stats(self, ctx):
+        """Show user engagement stats. Usage: !stats"""
+        guild_id = ctx.guild.id if ctx.guild else None
+        self.bot.streaks.join_guild(ctx.author.id, guild_id)
+        await ctx.send(self.format_stats(ctx.author.id, guild_id))
+
+    @app_commands.command(name="stats")
+    async def slash_stats(self, interaction: discord.Interaction):
+        """Show your reminder stats."""
+        self.bot.streaks.join_guild(interaction.user.id, interaction.guild_id)
+        await interaction.response.send_message(self.format_stats(interaction.user.id, interaction.guild_id))
+
+    @commands.command()
+    async def leaderboard(self, ctx, *args: str):
+        """Show top users by streak. Usage: !leaderboard [server] [page]"""
+        server = bool(args) and args[0].lower() == "server"
+        rest = args[1:] if server else args
+        try:
+            page = int(rest[0]) if rest else 1
+        except ValueError:
+            await ctx.send("Usage: !leaderboard [server] [page]")
+            return
+        guild_id = ctx.guild.id if server and ctx.guild else None
+        await ctx.send(self.format_leaderboard(ctx.author.id, guild_id, page), allowed_mentions=discord.AllowedMentions.none())
+
+    @app_commands.command(name="leaderboard")
+    @app_commands.describe(scope="Global board or just this server", page="Page number")
+    @app_commands.choices(scope=[
+        app_commands.Choice(name="global", value="global"),
+        app_commands.Choice(name="server", value="server"),
+    ])
+    async def slash_leaderboard(self, interaction: discord.Interaction, scope: str = "global", page: int = 1):
+        """See top streaks."""
+        guild_id = interaction.guild_id if scope == "server" else None
+        await interaction.response.send_message(
+            self.format_leaderboard(interaction.user.id, guild_id, page),
+            allowed_mentions=discord.AllowedMentions.none(),
+        )
+
+
+async def setup(bot):
+    await bot.add_cog(Water(bot))
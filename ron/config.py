@@ -0,0 +1,130 @@
+"""Per-guild configuration backed by ``configs.json``.
+
+The whole file is held in memory, with each guild's prefix kept in its own
+dict so prefix resolution is a single lookup per message.  Edits made with
+the `config` command are written atomically (temp file + rename); edits made
+to the file by hand are picked up by `watch`, which polls the file's mtime,
+or immediately with ``config reload``.
+"""
+import asyncio
+import json
+import logging
+import os
+from pathlib import Path
+
+log = logging.getLogger("ron.config")
+
+# Settings a guild can change, and what each one holds.
+SETTINGS = {
+    "prefix": "command prefix for this server",
+    "mod_role": "role ID whose members count as moderators",
+    "announce_channel": "channel ID used for announcements",
+    "reminder_channel": "channel ID for reminders that cannot be DMed (default: #general)",
+    "mod_log_channel": "channel ID where automod reports what it did",
+    "automod": "`on` to check every message for spam and floods",
+    "automod_action": "`delete` (default), `timeout` (delete and time out) or `log` only",
+    "automod_rate": "most messages one member may send, as count/seconds (default 8/10)",
+    "automod_duplicates": "most copies of the same message, as count/seconds (default 3/30)",
+    "automod_links": "most links one member may post, as count/seconds (default 5/30)",
+    "automod_mentions": "most user and role mentions in one message (default 6)",
+    "automod_timeout": "automod timeout length in minutes (default 10)",
+    "throttle": "command limits, e.g. `roll:user=3/10 remind:channel=off`, on top of the defaults",
+}
+
+
+class GuildConfig:
+    """In-memory cache of configs.json keyed by guild ID."""
+
+    def __init__(self, path, default_prefix="!"):
+        self.path = Path(path)
+        self.default_prefix = default_prefix
+        self._configs = {}
+        self._prefixes = {}
+        self._mtime = None
+        self.version = 0  # bumped on every change, for callers that cache parsed settings
+
+    def load(self):
+        """(Re)read the file.  A malformed file keeps the previous settings."""
+        try:
+            mtime = self.path.stat().st_mtime_ns
+        except FileNotFoundError:
+            self._configs, self._prefixes, self._mtime = {}, {}, None
+            return
+        try:
+            raw = json.loads(self.path.read_text())
+        except ValueError:
+            log.error("Could not parse %s; keeping the previous configuration", self.path)
+            self._mtime = mtime
+            return
+        self._configs = {int(guild_id): dict(cfg) for guild_id, cfg in raw.items()}
+        self._prefixes = {
+            guild_id: cfg["prefix"] for guild_id, cfg in self._configs.items() if cfg.get("prefix")
+        }
+        self._mtime = mtime
+        self.version += 1
+        log.info("Loaded configuration for %d guild(s) from %s", len(self._configs), self.path)
+
+    def reload_if_changed(self):
+        try:
+            mtime = self.path.stat().st_mtime_ns
+        except FileNotFoundError:
+            mtime = None
+        if mtime != self._mtime:
+            self.load()
+            return True
+        return False
+
+    async def watch(self, interval=30):
+        """Poll the file's mtime and reload on change (run as a background task)."""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                self.reload_if_changed()
+            except Exception:
+                log.exception("Failed to reload %s", self.path)
+
+    def _save(self):
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        data = {str(guild_id): cfg for guild_id, cfg in self._configs.items() if cfg}
+        tmp.write_text(json.dumps(data, indent=2, sort_keys=True))
+        os.replace(tmp, self.path)
+        self._mtime = self.path.stat().st_mtime_ns
+
+    # -- lookups -----------------------------------------------------------
+
+    def prefix(self, guild_id):
+        return self._prefixes.get(guild_id, self.default_prefix)
+
+    def get(self, guild_id, key, default=None):
+        cfg = self._configs.get(guild_id)
+        if cfg is None:
+            return default
+        value = cfg.get(key)
+        return default if value is None else value
+
+    def all(self, guild_id):
+        return dict(self._configs.get(guild_id, {}))
+
+    def each(self, key):
+        """{guild_id: value} for every guild that has `key` set."""
+        return {guild_id: cfg[key] for guild_id, cfg in self._configs.items() if cfg.get(key) is not None}
+
+    # -- updates -----------------------------------------------------------
+
+    def set(self, guild_id, key, value):
+        if key not in SETTINGS:
+            raise KeyError(key)
+        # another cluster process may have written the file since we read it
+        self.reload_if_changed()
+        cfg = self._configs.setdefault(guild_id, {})
+        if value is None:
+            cfg.pop(key, None)
+        else:
+            cfg[key] = value
+        if key == "prefix":
+            if value:
+                self._prefixes[guild_id] = value
+            else:
+                self._prefixes.pop(guild_id, None)
+        self.version += 1
+        self._save()
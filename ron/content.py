@@ -0,0 +1,332 @@
+"""Content packs: quotes, affirmations, tips, workouts and water phrases.
+
+A pack is a UTF-8 text file with one entry per line (blank lines and lines
+starting with ``#`` are skipped), named ``<kind>.txt`` or
+``<kind>.<variant>.txt`` (``workout.easy.txt``, ``tip.hydration.txt``).
+Packs are searched for in three places, most specific first:
+
+1. ``<packs dir>/<guild id>/``: a server's own packs, which replace
+   the others of the same kind for that server;
+2. ``<packs dir>/``: the bot owner's packs, which replace the built-in
+   ones;
+3. ``ron/packs/``: the built-in packs.
+
+A pack is not read into memory.  The file is memory-mapped, and the first
+time it is seen (or after it changes), the byte offset of every entry is
+written to a sidecar index in ``<packs dir>/.index/``.  That index is mapped
+too, so fetching entry *i* of a pack with millions of lines costs one slice
+of each map.
+
+Draws rotate without repeats per cursor key (a guild, or a user in DMs).
+A cursor is a single integer, the number of draws so far.  Draw *k* is
+entry ``(a*k + b) mod n`` of an affine permutation whose (a, b) is derived
+from a hash of the key and the round ``k // n``, so every entry comes up once
+per round without keeping a shuffled list per key, and each round has a
+new order.  If the pack's size changes, the order changes with it and a few
+entries may repeat early.
+
+`ContentLibrary.scan` picks up added, changed and removed files.  The bot
+runs it (as `rescan`, off the event loop) periodically and on
+``packs reload``.
+"""
+import asyncio
+import hashlib
+import logging
+import math
+import mmap
+import os
+import random
+import struct
+from array import array
+from bisect import bisect_right
+from collections import OrderedDict
+from pathlib import Path
+
+log = logging.getLogger("ron.content")
+
+BUILTIN_DIR = Path(__file__).parent / "packs"
+INDEX_MAGIC = b"RONIDX1\0"
+_HEADER = struct.Struct("<8sQQ")  # magic, source mtime_ns, source size
+
+
+def parse_name(filename):
+    """``"workout.easy.txt"`` -> ``("workout", "easy")``; None if it isn't a pack file."""
+    if not filename.endswith(".txt") or filename.startswith("."):
+        return None
+    kind, _, variant = filename[:-4].lower().partition(".")
+    if not kind.isidentifier() or (variant and not variant.isidentifier()):
+        return None
+    return kind, variant or None
+
+
+def _build_offsets(data):
+    """Byte offsets of the entries in `data` (an mmap or bytes)."""
+    offsets = array("Q")
+    position, size = 0, len(data)
+    while position < size:
+        end = data.find(b"\n", position)
+        if end < 0:
+            end = size
+        line = data[position:end].strip()
+        if line and not line.startswith(b"#"):
+            offsets.append(position)
+        position = end + 1
+    return offsets
+
+
+class Pack:
+    """One memory-mapped pack file and its entry index."""
+
+    def __init__(self, path, kind, variant, index_dir=None):
+        self.path = Path(path)
+        self.kind = kind
+        self.variant = variant
+        stat = self.path.stat()
+        self.stamp = (stat.st_mtime_ns, stat.st_size)
+        self.index_path = self._index_path(index_dir) if index_dir is not None else None
+        self._file = self._map = self._index_file = self._index_map = None
+        self._offsets = array("Q")
+        if stat.st_size:
+            self._file = open(self.path, "rb")
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            self._offsets = self._load_index()
+
+    def _index_path(self, index_dir):
+        digest = hashlib.sha1(str(self.path.resolve()).encode()).hexdigest()[:16]
+        return Path(index_dir) / f"{self.path.stem}.{digest}.idx"
+
+    def _load_index(self):
+        index_path = self.index_path
+        if index_path is None:
+            return _build_offsets(self._map)
+        try:
+            with open(index_path, "rb") as f:
+                header = _HEADER.unpack(f.read(_HEADER.size))
+            if header != (INDEX_MAGIC, *self.stamp):
+                raise ValueError("stale index")
+        except (OSError, ValueError, struct.error):
+            offsets = _build_offsets(self._map)
+            try:
+                index_path.parent.mkdir(parents=True, exist_ok=True)
+                tmp = index_path.with_suffix(".tmp")
+                with open(tmp, "wb") as f:
+                    f.write(_HEADER.pack(INDEX_MAGIC, *self.stamp))
+                    offsets.tofile(f)
+                os.replace(tmp, index_path)
+            except OSError:
+                log.warning("Could not write index for %s; keeping it in memory", self.path)
+                return offsets
+            if not offsets:
+                return offsets
+        self._index_file = open(index_path, "rb")
+        self._index_map = mmap.mmap(self._index_file.fileno(), 0, access=mmap.ACCESS_READ)
+        return memoryview(self._index_map)[_HEADER.size:].cast("Q")
+
+    def __len__(self):
+        return len(self._offsets)
+
+    def __getitem__(self, i):
+        start = self._offsets[i]
+        end = self._map.find(b"\n", start)
+        return self._map[start:end if end >= 0 else len(self._map)].decode("utf-8", "replace").strip()
+
+    def close(self):
+        if isinstance(self._offsets, memoryview):
+            self._offsets.release()
+        for handle in (self._index_map, self._index_file, self._map, self._file):
+            if handle is not None:
+                handle.close()
+
+
+class Selection:
+    """Several packs of one kind seen as a single sequence."""
+
+    def __init__(self, packs):
+        self.packs = packs
+        self._starts = []
+        total = 0
+        for pack in packs:
+            self._starts.append(total)
+            total += len(pack)
+        self.size = total
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, i):
+        k = bisect_right(self._starts, i) - 1
+        return self.packs[k][i - self._starts[k]]
+
+
+class ContentLibrary:
+    """Every known pack, plus the no-repeat cursors.
+
+    `packs_dir` holds the owner's and the servers' packs (and the index
+    sidecars).  At most `max_cursors` cursors are kept; the least recently
+    used are dropped, which only means that key may see a repeat early.
+    """
+
+    def __init__(self, packs_dir, builtin_dir=BUILTIN_DIR, max_cursors=200_000):
+        self.packs_dir = Path(packs_dir)
+        self.builtin_dir = Path(builtin_dir)
+        self.index_dir = self.packs_dir / ".index"
+        self.max_cursors = max_cursors
+        self._packs = {}    # path -> Pack
+        self._scopes = {}   # scope (None, "", or guild ID) -> {kind: [Pack, ...]}
+        self._selections = {}  # (kind, variant, guild ID) -> Selection, until the next scan
+        self._cursors = OrderedDict()  # (key, guild ID, kind, variant) -> draws so far
+        self._salt = random.getrandbits(64)
+        self._lock = asyncio.Lock()
+
+    # -- loading -------------------------------------------------------------
+
+    def _files(self):
+        """(scope, path, kind, variant) for every pack file on disk."""
+        sources = [(None, self.builtin_dir), ("", self.packs_dir)]
+        if self.packs_dir.is_dir():
+            sources += [(int(d.name), d) for d in self.packs_dir.iterdir() if d.is_dir() and d.name.isdigit()]
+        for scope, directory in sources:
+            try:
+                names = sorted(os.listdir(directory))
+            except OSError:
+                continue
+            for name in names:
+                parsed = parse_name(name)
+                if parsed is not None:
+                    yield scope, directory / name, *parsed
+
+    def _load(self):
+        """Open new and changed packs without touching the live ones.
+
+        Returns ({scope: {kind: [Pack, ...]}}, {path: Pack}, number opened).
+        Building a big pack's index takes a while, so `rescan` runs this on a
+        worker thread.
+        """
+        scopes, packs, loaded = {}, {}, 0
+        for scope, path, kind, variant in self._files():
+            try:
+                stat = path.stat()
+                pack = self._packs.get(path)
+                if pack is None or pack.stamp != (stat.st_mtime_ns, stat.st_size):
+                    pack = Pack(path, kind, variant, self.index_dir)
+                    loaded += 1
+            except (OSError, ValueError):
+                log.exception("Could not load content pack %s", path)
+                continue
+            packs[path] = pack
+            scopes.setdefault(scope, {}).setdefault(kind, []).append(pack)
+        return scopes, packs, loaded
+
+    def _swap(self, scopes, packs, loaded):
+        old, self._packs, self._scopes = self._packs, packs, scopes
+        self._selections = {}
+        removed = 0
+        for path, pack in old.items():
+            if packs.get(path) is not pack:
+                pack.close()
+            if path not in packs:
+                removed += 1
+                if pack.index_path is not None:
+                    pack.index_path.unlink(missing_ok=True)
+        if loaded or removed:
+            log.info("Content packs: %d loaded, %d removed, %d in use", loaded, removed, len(packs))
+        return loaded, removed
+
+    def scan(self):
+        """Load new or changed packs and drop removed ones; returns (loaded, removed) counts."""
+        return self._swap(*self._load())
+
+    async def rescan(self):
+        """`scan`, with the file reading and indexing done on a worker thread."""
+        async with self._lock:
+            return self._swap(*await asyncio.to_thread(self._load))
+
+    async def watch(self, interval=60):
+        """Rescan every `interval` seconds (run as a background task)."""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.rescan()
+            except Exception:
+                log.exception("Failed to rescan content packs")
+
+    def close(self):
+        for pack in self._packs.values():
+            pack.close()
+        self._packs.clear()
+        self._scopes = {}
+        self._selections = {}
+
+    # -- lookups -------------------------------------------------------------
+
+    def guild_dir(self, guild_id):
+        """Where `guild_id`'s own packs live."""
+        return self.packs_dir / str(guild_id)
+
+    def source(self, pack):
+        """``"server"``, ``"custom"`` or ``"built-in"``: which directory `pack` came from."""
+        if pack.path.parent == self.builtin_dir:
+            return "built-in"
+        return "custom" if pack.path.parent == self.packs_dir else "server"
+
+    def packs(self, kind, guild_id=None):
+        """The packs that serve `kind` in `guild_id`: the guild's, else the owner's, else built-in."""
+        for scope in ((guild_id,) if guild_id is not None else ()) + ("", None):
+            found = self._scopes.get(scope, {}).get(kind)
+            if found:
+                return found
+        return []
+
+    def variants(self, kind, guild_id=None):
+        return sorted({pack.variant for pack in self.packs(kind, guild_id) if pack.variant})
+
+    def kinds(self, guild_id=None):
+        """{kind: entry count} as seen from `guild_id`."""
+        names = set()
+        for scope in ((guild_id,) if guild_id is not None else ()) + ("", None):
+            names.update(self._scopes.get(scope, {}))
+        return {kind: sum(len(pack) for pack in self.packs(kind, guild_id)) for kind in sorted(names)}
+
+    def selection(self, kind, variant=None, guild_id=None):
+        """The entries of `kind` (only `variant`'s, if given) as seen from `guild_id`."""
+        key = (kind, variant, guild_id if guild_id in self._scopes else None)
+        selection = self._selections.get(key)
+        if selection is None:
+            packs = self.packs(kind, guild_id)
+            if variant is not None:
+                packs = [pack for pack in packs if pack.variant == variant]
+            selection = self._selections[key] = Selection(packs)
+        return selection
+
+    def draw(self, kind, variant=None, guild_id=None, key=None, default=""):
+        """Next entry of `kind` for cursor `key`, without repeats until all were shown.
+
+        With no `key` it is a plain random pick.  Returns `default` if there
+        is no such content.
+        """
+        selection = self.selection(kind, variant, guild_id)
+        n = len(selection)
+        if n == 0:
+            return default
+        if key is None:
+            return selection[random.randrange(n)]
+        return selection[self._next((key, guild_id, kind, variant), n)]
+
+    def _next(self, cursor_key, n):
+        draws = self._cursors.pop(cursor_key, 0)
+        self._cursors[cursor_key] = draws + 1
+        if len(self._cursors) > self.max_cursors:
+            self._cursors.popitem(last=False)
+        a, b = _permutation(hash((self._salt, cursor_key, draws // n)), n)
+        return (a * (draws % n) + b) % n
+
+
+def _permutation(seed, n):
+    """(a, b) from `seed` with gcd(a, n) == 1, so ``i -> (a*i + b) % n`` visits every index once."""
+    seed &= (1 << 64) - 1
+    if n <= 2:
+        return 1, seed % n
+    a = 1 + seed % (n - 1)
+    while math.gcd(a, n) != 1:
+        a = a % (n - 1) + 1
+    return a, (seed >> 32) % n
@@ -0,0 +1,499 @@
+"""Dice expressions: parsing, rolling and exact distributions.
+
+Syntax (case-insensitive, spaces ignored)::
+
+    expr     := term (("+" | "-") term)*
+    term     := dice | integer
+    dice     := [count] "d" (sides | "%") modifier*
+    modifier := "kh" n | "k" n     keep the n highest dice
+              | "kl" n             keep the n lowest
+              | "dh" n             drop the n highest
+              | "dl" n | "d" n     drop the n lowest
+              | "r" n              reroll (once) any die showing n or less
+              | "!"                explode: roll again and add on the top face
+
+Examples: ``2d6``, ``d20+5``, ``4d6kh3``, ``2d20kl1``, ``6d10!``, ``8d6r1``.
+
+`parse` is cached (LRU), so repeated rolls of the same expression skip the
+parser.  Pools of at most `DETAIL_LIMIT` dice are rolled die by die and
+shown individually.  Larger pools (up to `MAX_DICE`) are rolled as a
+histogram of face counts, in chunks, so ``1000000d6`` needs constant memory
+no matter how many dice are rolled.  `distribution` computes the exact
+probability distribution of an expression by convolving per-die
+distributions, using NumPy when it is installed.
+"""
+import functools
+import math
+import random
+import re
+from collections import Counter
+from itertools import combinations_with_replacement
+from typing import NamedTuple, Optional, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # optional; only makes distributions faster
+    np = None
+
+MAX_DICE = 10_000_000      # dice per expression
+MAX_SIDES = 1_000_000
+MAX_TERMS = 20
+DETAIL_LIMIT = 100         # pools up to this size list every die
+HISTOGRAM_SIDES = 1000     # larger dice in big pools only report their sum
+MAX_EXPLODE = 100          # re-rolls per die
+CHUNK = 65536
+# Largest outcome range `distribution` will compute, and (without NumPy)
+# the most multiply-adds it may spend doing so
+MAX_SUPPORT = 1_000_000
+MAX_PURE_PYTHON_WORK = 20_000_000
+MAX_MULTISETS = 200_000    # keep/drop distributions enumerate sorted pools
+MESSAGE_LIMIT = 2000
+
+_TOKEN_RE = re.compile(r"([+-])|(\d*)d(\d+|%)((?:kh\d+|kl\d+|k\d+|dh\d+|dl\d+|d\d+|r\d+|!)*)|(\d+)")
+_MODIFIER_RE = re.compile(r"(kh|kl|k|dh|dl|d|r)(\d+)|!")
+
+
+class DiceError(ValueError):
+    """An expression that cannot be parsed or is too large; the message is user-facing."""
+
+
+class DiceTerm(NamedTuple):
+    sign: int
+    count: int
+    sides: int
+    keep: Optional[Tuple[bool, int]] = None  # (highest?, how many), drops are normalised to keeps
+    reroll: int = 0                           # reroll once at or below this
+    explode: bool = False
+
+    def __str__(self):
+        text = f"{self.count}d{self.sides}"
+        if self.keep is not None:
+            text += f"k{'h' if self.keep[0] else 'l'}{self.keep[1]}"
+        if self.reroll:
+            text += f"r{self.reroll}"
+        if self.explode:
+            text += "!"
+        return text
+
+
+class Expression(NamedTuple):
+    text: str
+    terms: Tuple[DiceTerm, ...]
+    constant: int
+
+    @property
+    def dice_count(self):
+        return sum(term.count for term in self.terms)
+
+
+def parse(text):
+    """Parse `text` into an Expression; raises DiceError."""
+    return _parse(re.sub(r"\s+", "", text.lower()))
+
+
+@functools.lru_cache(maxsize=1024)
+def _parse(text):
+    if not text:
+        raise DiceError("Empty dice expression.")
+    terms, constant, pos, sign, expect_term = [], 0, 0, 1, True
+    while pos < len(text):
+        match = _TOKEN_RE.match(text, pos)
+        if match is None:
+            raise DiceError(f"Unexpected `{text[pos:pos + 10]}` in dice expression.")
+        pos = match.end()
+        op, count, sides, modifiers, number = match.groups()
+        if op:
+            if expect_term:
+                if match.start():
+                    raise DiceError("Two operators in a row.")
+                sign = -1 if op == "-" else 1  # leading sign
+                continue
+            sign, expect_term = (-1 if op == "-" else 1), True
+            continue
+        if not expect_term:
+            raise DiceError("Missing `+` or `-` between terms.")
+        expect_term = False
+        if number is not None:
+            constant += sign * int(number)
+            continue
+        terms.append(_dice_term(sign, count, sides, modifiers))
+        if len(terms) > MAX_TERMS:
+            raise DiceError(f"At most {MAX_TERMS} dice terms.")
+    if expect_term:
+        raise DiceError("Expression ends with an operator.")
+    expression = Expression(text, tuple(terms), constant)
+    if expression.dice_count > MAX_DICE:
+        raise DiceError(f"At most {MAX_DICE:,} dice per roll.")
+    return expression
+
+
+def _dice_term(sign, count, sides, modifiers):
+    count = int(count) if count else 1
+    sides = 100 if sides == "%" else int(sides)
+    if count < 1:
+        raise DiceError("Roll at least one die.")
+    if not 1 <= sides <= MAX_SIDES:
+        raise DiceError(f"Dice need between 1 and {MAX_SIDES:,} sides.")
+    keep, reroll, explode = None, 0, False
+    for match in _MODIFIER_RE.finditer(modifiers):
+        kind, value = match.group(1), match.group(2)
+        if kind is None:
+            if sides == 1:
+                raise DiceError("A d1 cannot explode.")
+            explode = True
+        elif kind == "r":
+            reroll = int(value)
+            if reroll >= sides:
+                raise DiceError("Reroll threshold must be below the number of sides.")
+        else:
+            if keep is not None:
+                raise DiceError("Only one keep/drop modifier per term.")
+            n = int(value)
+            if kind in ("dh", "dl", "d"):
+                if n >= count:
+                    raise DiceError("Cannot drop every die.")
+                keep = (kind != "dh", count - n)  # drop highest = keep lowest
+            else:
+                if not 1 <= n <= count:
+                    raise DiceError("Keep between 1 and the number of dice rolled.")
+                keep = (kind != "kl", n)
+    if keep is not None and keep[1] == count:
+        keep = None
+    if count > DETAIL_LIMIT and sides > HISTOGRAM_SIDES and (keep or reroll or explode):
+        raise DiceError(f"Modifiers on more than {DETAIL_LIMIT} dice need dice of at most {HISTOGRAM_SIDES} sides.")
+    return DiceTerm(sign, count, sides, keep, reroll, explode)
+
+
+# -- rolling ---------------------------------------------------------------
+
+
+class TermRoll:
+    """Outcome of one dice term.
+
+    Small pools keep every die in `dice` as (value, kept, exploded).  Large
+    pools keep `counts`, a histogram of die value -> number of dice (None
+    for plain pools of very large dice, which only track the sum).
+    """
+
+    __slots__ = ("term", "total", "dice", "counts")
+
+    def __init__(self, term, total, dice=None, counts=None):
+        self.term = term
+        self.total = total
+        self.dice = dice
+        self.counts = counts
+
+
+class RollResult(NamedTuple):
+    expression: Expression
+    terms: Tuple[TermRoll, ...]
+    total: int
+
+
+def roll(expression, rng=random):
+    """Roll a parsed Expression.  Large pools can take a moment; run them off the event loop."""
+    terms = tuple(_roll_term(term, rng) for term in expression.terms)
+    total = sum(term.term.sign * term.total for term in terms) + expression.constant
+    return RollResult(expression, terms, total)
+
+
+def _roll_die(term, rng):
+    value = rng.randint(1, term.sides)
+    if value <= term.reroll:
+        value = rng.randint(1, term.sides)
+    exploded = False
+    if term.explode:
+        last, depth = value, 0
+        while last == term.sides and depth < MAX_EXPLODE:
+            last = rng.randint(1, term.sides)
+            value += last
+            depth += 1
+            exploded = True
+    return value, exploded
+
+
+def _roll_term(term, rng):
+    if term.count <= DETAIL_LIMIT:
+        rolled = [_roll_die(term, rng) for _ in range(term.count)]
+        kept = set(range(len(rolled)))
+        if term.keep is not None:
+            highest, n = term.keep
+            order = sorted(range(len(rolled)), key=lambda i: rolled[i][0], reverse=highest)
+            kept = set(order[:n])
+        dice = [(value, i in kept, exploded) for i, (value, exploded) in enumerate(rolled)]
+        return TermRoll(term, sum(value for value, keep, _ in dice if keep), dice=dice)
+    if term.sides > HISTOGRAM_SIDES:
+        # plain pool of huge dice: the sum is all we report
+        total, remaining = 0, term.count
+        faces = range(1, term.sides + 1)
+        while remaining:
+            k = min(remaining, CHUNK)
+            total += sum(rng.choices(faces, k=k))
+            remaining -= k
+        return TermRoll(term, total)
+    counts = _face_counts(term.count, term.sides, rng)
+    if term.reroll:
+        again = sum(counts.pop(face, 0) for face in range(1, term.reroll + 1))
+        counts.update(_face_counts(again, term.sides, rng))
+    if term.explode:
+        counts = _explode_counts(counts, term.sides, rng)
+    if term.keep is not None:
+        counts = _keep_counts(counts, *term.keep)
+    return TermRoll(term, sum(value * n for value, n in counts.items()), counts=counts)
+
+
+def _face_counts(n, sides, rng):
+    """Histogram of `n` rolls of a d`sides`, in memory independent of `n`."""
+    counts = Counter()
+    faces = range(1, sides + 1)
+    while n:
+        k = min(n, CHUNK)
+        counts.update(rng.choices(faces, k=k))
+        n -= k
+    return counts
+
+
+def _explode_counts(counts, sides, rng):
+    values = Counter()
+    level, depth = counts, 0
+    while True:
+        again = level.pop(sides, 0)
+        for face, n in level.items():
+            values[depth * sides + face] += n
+        if not again:
+            return values
+        if depth == MAX_EXPLODE:
+            values[(depth + 1) * sides] += again
+            return values
+        level = _face_counts(again, sides, rng)
+        depth += 1
+
+
+def _keep_counts(counts, highest, n):
+    kept = Counter()
+    for value in sorted(counts, reverse=highest):
+        take = min(counts[value], n)
+        kept[value] = take
+        n -= take
+        if not n:
+            break
+    return kept
+
+
+# -- exact distributions ---------------------------------------------------
+
+
+def _die_pmf(term):
+    """Distribution of a single die after rerolls and explosions: {value: p}."""
+    p = 1 / term.sides
+    pmf = {face: p for face in range(1, term.sides + 1)}
+    if term.reroll:
+        low = term.reroll * p
+        pmf = {face: (0 if face <= term.reroll else p) + low * p for face in pmf}
+    if term.explode:
+        # each extra roll is a plain die; the chain is cut off once its
+        # remaining probability is negligible
+        weight, offset = pmf.pop(term.sides), term.sides
+        for _ in range(_explode_depth(term.sides)):
+            for face in range(1, term.sides):
+                pmf[offset + face] = pmf.get(offset + face, 0) + weight * p
+            weight *= p
+            offset += term.sides
+    return pmf
+
+
+def _explode_depth(sides):
+    return min(MAX_EXPLODE, math.ceil(15 / math.log10(sides)))
+
+
+def _to_array(pmf):
+    lo, hi = min(pmf), max(pmf)
+    values = [0.0] * (hi - lo + 1)
+    for value, p in pmf.items():
+        values[value - lo] = p
+    return lo, values
+
+
+def _convolve(a, b):
+    if np is not None:
+        return np.convolve(a, b)
+    out = [0.0] * (len(a) + len(b) - 1)
+    for i, x in enumerate(a):
+        if x:
+            for j, y in enumerate(b):
+                out[i + j] += x * y
+    return out
+
+
+def _add_uniform(values, sides):
+    """Convolve with a fair d`sides` using a running window sum: O(len)."""
+    out, window, p = [], 0.0, 1 / sides
+    for i in range(len(values) + sides - 1):
+        if i < len(values):
+            window += values[i]
+        if i >= sides:
+            window -= values[i - sides]
+        out.append(window * p)
+    return out
+
+
+def _power(lo, values, n, uniform=False):
+    """Distribution of the sum of `n` independent copies."""
+    if np is None:
+        # one die at a time; squaring would cost O(len^2) per step
+        result = [1.0]
+        for _ in range(n):
+            result = _add_uniform(result, len(values)) if uniform else _convolve(result, values)
+        return lo * n, result
+    result_lo, result = 0, [1.0]
+    while n:
+        if n & 1:
+            result_lo, result = result_lo + lo, _convolve(result, values)
+        n >>= 1
+        if n:
+            lo, values = lo * 2, _convolve(values, values)
+    return result_lo, result
+
+
+def _keep_pmf(term, pmf):
+    """Exact distribution of a keep/drop pool by enumerating sorted pools."""
+    faces = sorted(pmf)
+    n = term.count
+    if math.comb(n + len(faces) - 1, n) > MAX_MULTISETS:
+        raise DiceError("That keep/drop pool is too large for exact statistics.")
+    highest, keep = term.keep
+    out = {}
+    log_fact_n = math.lgamma(n + 1)
+    for pool in combinations_with_replacement(faces, n):
+        tally = Counter(pool)
+        log_p = log_fact_n
+        for face, k in tally.items():
+            log_p += k * math.log(pmf[face]) - math.lgamma(k + 1)
+        kept = sum(pool[-keep:]) if highest else sum(pool[:keep])
+        out[kept] = out.get(kept, 0) + math.exp(log_p)
+    return out
+
+
+def _term_distribution(term):
+    pmf = _die_pmf(term)
+    if term.keep is not None:
+        lo, values = _to_array(_keep_pmf(term, pmf))
+    else:
+        lo, values = _to_array(pmf)
+        plain = not term.reroll and not term.explode
+        lo, values = _power(lo, values, term.count, uniform=plain)
+    if term.sign < 0:
+        hi = lo + len(values) - 1
+        lo, values = -hi, list(values)[::-1]
+    return lo, values
+
+
+@functools.lru_cache(maxsize=64)
+def distribution(expression):
+    """Exact distribution of `expression` as (lowest total, [p per total...])."""
+    support = work = 1
+    for term in expression.terms:
+        top = term.sides * (_explode_depth(term.sides) + 1 if term.explode else 1)
+        width = (term.keep[1] if term.keep else term.count) * top
+        support += width
+        if term.keep is None:
+            per_die = 1 if not term.reroll and not term.explode else top
+            work += term.count * width * per_die // 2
+    work += support * len(expression.terms)
+    if support > MAX_SUPPORT or (np is None and work > MAX_PURE_PYTHON_WORK):
+        raise DiceError("That expression has too many outcomes for exact statistics.")
+    lo, values = expression.constant, [1.0]
+    for term in expression.terms:
+        term_lo, term_values = _term_distribution(term)
+        lo, values = lo + term_lo, _convolve(values, term_values)
+    values = [float(p) for p in values]
+    # trim the negligible tails that explosions leave behind
+    first = next((i for i, p in enumerate(values) if p > 1e-12), 0)
+    last = max((i for i, p in enumerate(values) if p > 1e-12), default=len(values) - 1)
+    return lo + first, values[first:last + 1]
+
+
+# -- formatting ------------------------------------------------------------
+
+
+def truncate(text, limit=MESSAGE_LIMIT):
+    """Cut `text` at a line boundary so it fits in one Discord message."""
+    if len(text) <= limit:
+        return text
+    lines = text.split("\n")
+    kept, size = [], 0
+    for line in lines:
+        if size + len(line) + 1 > limit - 30:
+            break
+        kept.append(line)
+        size += len(line) + 1
+    if not kept:
+        return text[:limit - 1] + "…"
+    return "\n".join(kept) + f"\n… ({len(lines) - len(kept)} more lines)"
+
+
+def _bar(fraction, width=20):
+    return "█" * max(1 if fraction > 0 else 0, round(fraction * width))
+
+
+def _histogram_lines(counts, buckets=12):
+    lo, hi = min(counts), max(counts)
+    size = max(1, math.ceil((hi - lo + 1) / buckets))
+    binned = Counter()
+    for value, n in counts.items():
+        binned[(value - lo) // size] += n
+    peak = max(binned.values())
+    lines = []
+    for index in range(max(binned) + 1):
+        start = lo + index * size
+        label = str(start) if size == 1 else f"{start}-{start + size - 1}"
+        lines.append(f"`{label:>11}` {_bar(binned[index] / peak)} {binned[index]:,}")
+    return lines
+
+
+def format_roll(result):
+    """Discord message text for a RollResult."""
+    parts, details = [], []
+    for term_roll in result.terms:
+        term = term_roll.term
+        sign = "- " if term.sign < 0 else ("+ " if parts else "")
+        if term_roll.dice is not None:
+            shown = []
+            for value, kept, exploded in term_roll.dice:
+                text = f"{value}!" if exploded else str(value)
+                shown.append(text if kept else f"~~{text}~~")
+            parts.append(f"{sign}[{', '.join(shown)}]")
+        else:
+            parts.append(f"{sign}{term_roll.total:,}")
+            if term_roll.counts:
+                details.append(f"{term} (mean {term_roll.total / sum(term_roll.counts.values()):.2f} per kept die):")
+                details.extend(_histogram_lines(term_roll.counts))
+    if result.expression.constant:
+        c = result.expression.constant
+        parts.append(f"{'-' if c < 0 else '+'} {abs(c)}")
+    text = f"🎲 Rolled {result.expression.text}: {' '.join(parts)} (total: {result.total:,})"
+    if details:
+        text += "\n" + "\n".join(details)
+    return truncate(text)
+
+
+def format_distribution(expression, lo, values, rows=25):
+    """Discord message text for an exact distribution."""
+    mean = sum((lo + i) * p for i, p in enumerate(values))
+    variance = sum((lo + i - mean) ** 2 * p for i, p in enumerate(values))
+    mode = lo + max(range(len(values)), key=values.__getitem__)
+    header = (
+        f"📊 {expression.text}: mean {mean:.2f}, σ {math.sqrt(variance):.2f}, "
+        f"range {lo}–{lo + len(values) - 1}, most likely {mode}"
+    )
+    size = max(1, math.ceil(len(values) / rows))
+    binned = [sum(values[i:i + size]) for i in range(0, len(values), size)]
+    peak = max(binned)
+    lines, at_least = [], 1.0
+    for index, p in enumerate(binned):
+        start = lo + index * size
+        end = min(start + size - 1, lo + len(values) - 1)
+        label = str(start) if start == end else f"{start}-{end}"
+        lines.append(f"`{label:>11} {p * 100:6.2f}%  ≥{at_least * 100:6.2f}%` {_bar(p / peak, 16)}")
+        at_least -= p
+    return truncate(header + "\n" + "\n".join(lines))
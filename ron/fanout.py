@@ -0,0 +1,176 @@
+"""Concurrent, rate-limit-aware DM fan-out.
+
+Used by the hourly water reminders to DM every subscriber.  Instead of a
+`fetch_user` + `user.send` round trip per subscriber, the DM channel ID for
+each user is opened once and cached (and persisted), so a steady-state send
+is a single REST call.  Sends run on a bounded pool of workers paced by token
+buckets that stay under Discord's global limit and the DM-open route limit;
+discord.py still handles any 429 that slips through.
+
+Failures are classified: a user who has DMs closed or no longer exists is a
+permanent failure and reported through `on_undeliverable`, while 5xx/429 and
+network errors are retried with jittered exponential backoff.
+"""
+import asyncio
+import logging
+import random
+import time
+
+import aiohttp
+import discord
+
+log = logging.getLogger("ron.fanout")
+
+DM_CHANNEL_NS = "dm_channels"
+
+
+class RateLimiter:
+    """Token bucket: `rate` tokens per second, holding at most `burst`."""
+
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.burst = burst or rate
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class FanoutStats:
+    """Per-run counters for a fan-out pass."""
+
+    __slots__ = ("delivered", "failed", "skipped", "retried", "started", "finished")
+
+    def __init__(self):
+        self.delivered = self.failed = self.skipped = self.retried = 0
+        self.started = time.monotonic()
+        self.finished = None
+
+    @property
+    def duration(self):
+        return (self.finished or time.monotonic()) - self.started
+
+    def __str__(self):
+        return (
+            f"delivered={self.delivered} failed={self.failed} skipped={self.skipped} "
+            f"retried={self.retried} in {self.duration:.1f}s"
+        )
+
+
+class DMFanout:
+    """Sends one DM to each of many users through a bounded worker pool."""
+
+    def __init__(self, bot, store=None, workers=8, global_rate=40, dm_open_rate=5,
+                 max_retries=3, on_undeliverable=None):
+        self.bot = bot
+        self.store = store
+        self.workers = workers
+        self.max_retries = max_retries
+        self.on_undeliverable = on_undeliverable
+        self._global = RateLimiter(global_rate)
+        self._dm_open = RateLimiter(dm_open_rate)
+        self._channels = {}
+        if store is not None:
+            self._channels = {int(k): v for k, v in store.load(DM_CHANNEL_NS).items()}
+
+    async def _channel_id(self, user_id):
+        channel_id = self._channels.get(user_id)
+        if channel_id is None:
+            await self._dm_open.acquire()
+            await self._global.acquire()
+            data = await self.bot.http.start_private_message(user_id)
+            channel_id = int(data["id"])
+            self._channels[user_id] = channel_id
+            if self.store is not None:
+                self.store.put(DM_CHANNEL_NS, user_id, channel_id)
+        return channel_id
+
+    def _forget_channel(self, user_id):
+        if self._channels.pop(user_id, None) is not None and self.store is not None:
+            self.store.delete(DM_CHANNEL_NS, user_id)
+
+    async def send(self, user_id, content, stats=None, **kwargs):
+        """DM one user, retrying transient failures.  Returns True if delivered."""
+        stats = stats if stats is not None else FanoutStats()
+        for attempt in range(self.max_retries + 1):
+            try:
+                channel_id = await self._channel_id(user_id)
+                await self._global.acquire()
+                channel = self.bot.get_partial_messageable(channel_id, type=discord.ChannelType.private)
+                await channel.send(content, **kwargs)
+                stats.delivered += 1
+                return True
+            except discord.Forbidden:
+                # 50007: cannot send messages to this user (DMs closed / blocked)
+                return self._give_up(user_id, stats, permanent=True, reason="DMs closed")
+            except discord.NotFound:
+                # the cached DM channel is gone; reopen once, then give up
+                self._forget_channel(user_id)
+                if attempt > 0:
+                    return self._give_up(user_id, stats, permanent=True, reason="unknown channel")
+                continue
+            except discord.HTTPException as exc:
+                if exc.status != 429 and exc.status < 500:
+                    return self._give_up(user_id, stats, permanent=False, reason=f"HTTP {exc.status}")
+                log.debug("DM to %s got HTTP %s; retrying", user_id, exc.status)
+            except (aiohttp.ClientError, asyncio.TimeoutError, OSError) as exc:
+                log.debug("DM to %s hit a network error (%r); retrying", user_id, exc)
+            if attempt < self.max_retries:
+                stats.retried += 1
+                await asyncio.sleep(min(2 ** attempt, 30) * random.uniform(0.5, 1.5))
+        return self._give_up(user_id, stats, permanent=False, reason="retries exhausted")
+
+    def _give_up(self, user_id, stats, permanent, reason):
+        stats.failed += 1
+        # one line per failed DM; sampled by ron.logs, so a mass failure stays readable
+        log.info("DM to %s failed: %s", user_id, reason, extra={"user": user_id, "permanent": permanent})
+        if permanent and self.on_undeliverable is not None:
+            self.on_undeliverable(user_id)
+        return False
+
+    async def run(self, user_ids, make_content, should_skip=None, on_delivered=None, **kwargs):
+        """DM every user in `user_ids`; returns the run's FanoutStats.
+
+        `make_content(user_id)` builds each message, `should_skip(user_id)`
+        may veto a send at the moment it is dequeued and
+        `on_delivered(user_id)` is called after each successful send.
+        """
+        stats = FanoutStats()
+        queue = asyncio.Queue(maxsize=self.workers * 4)
+
+        async def worker():
+            while True:
+                user_id = await queue.get()
+                try:
+                    if should_skip is not None and should_skip(user_id):
+                        stats.skipped += 1
+                    elif await self.send(user_id, make_content(user_id), stats, **kwargs):
+                        if on_delivered is not None:
+                            on_delivered(user_id)
+                except Exception:
+                    stats.failed += 1
+                    log.exception("Unexpected error sending DM to %s", user_id)
+                finally:
+                    queue.task_done()
+
+        tasks = [asyncio.create_task(worker()) for _ in range(self.workers)]
+        try:
+            for user_id in user_ids:
+                await queue.put(user_id)
+            await queue.join()
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+        stats.finished = time.monotonic()
+        return stats
@@ -0,0 +1,267 @@
+"""Hydration reminder subscribers, their delivery slots and quiet hours.
+
+Each subscription carries a stable minute-of-the-hour ``slot`` (assigned to
+the least-loaded minute when the user subscribes), a time zone and optional
+quiet hours.  The reminder loop sends a small, even batch every minute
+instead of everyone at the top of the hour, and users inside their quiet
+hours are skipped before any API call is made.
+
+`SubscriberRegistry` holds every subscription in packed columns instead of
+a dict per user: user IDs in a sorted ``array('Q')``, and beside them the
+slot and flags (one byte each), the time zone as an index into a table of
+zone names and the quiet hours (two bytes each).  That is 14 bytes per
+subscriber plus the arrays' spare capacity.  A lookup is a binary search,
+a minute's batch is a scan of the slot column (``bytearray.find``, in C),
+and a snapshot is the raw columns written to one file.
+
+The store's ``water`` namespace (one JSON record per user) stays the source
+of truth; `get` returns a record in that format.
+"""
+import os
+import struct
+import sys
+from array import array
+from bisect import bisect_left
+from datetime import datetime, timezone as dt_timezone
+from pathlib import Path
+
+from pytz import UnknownTimeZoneError, timezone
+
+SLOTS = 60
+
+FLAG_QUIET = 1  # has quiet hours
+
+SNAPSHOT_MAGIC = b"RONSUB1\0"
+_SNAPSHOT_HEADER = struct.Struct("<8sQI")  # magic, subscribers, length of the zone table
+
+
+def is_valid_timezone(name):
+    try:
+        timezone(name)
+    except UnknownTimeZoneError:
+        return False
+    return True
+
+
+def local_hour(tz_name, now=None):
+    now = now or datetime.now(dt_timezone.utc)
+    try:
+        return now.astimezone(timezone(tz_name or "UTC")).hour
+    except UnknownTimeZoneError:
+        return now.hour
+
+
+def in_quiet_window(start, end, hour):
+    """True if `hour` is in ``[start, end)``, which may wrap midnight (e.g. 22-7)."""
+    if start <= end:
+        return start <= hour < end
+    return hour >= start or hour < end
+
+
+class SubscriberRegistry:
+    """Every water subscription, in parallel columns sorted by user ID.
+
+    `owns(user_id)`, if given, limits `due` to the users this process
+    delivers to (cluster mode); every subscriber is still known, so
+    settings and membership checks work for all of them.
+    """
+
+    def __init__(self, owns=None):
+        self.owns = owns
+        self._ids = array("Q")
+        self._slots = bytearray()
+        self._flags = bytearray()
+        self._zones = array("H")
+        self._quiet = array("H")       # start << 8 | end, valid with FLAG_QUIET
+        self._zone_names = ["UTC"]
+        self._zone_index = {"UTC": 0}
+        self._slot_sizes = [0] * SLOTS
+
+    def __len__(self):
+        return len(self._ids)
+
+    def __contains__(self, user_id):
+        return self._find(user_id) >= 0
+
+    def __iter__(self):
+        return iter(self._ids)
+
+    def _find(self, user_id):
+        ids = self._ids
+        i = bisect_left(ids, user_id)
+        return i if i < len(ids) and ids[i] == user_id else -1
+
+    def _zone(self, name):
+        name = name or "UTC"
+        index = self._zone_index.get(name)
+        if index is None:
+            index = self._zone_index[name] = len(self._zone_names)
+            self._zone_names.append(name)
+        return index
+
+    def _encode(self, data):
+        quiet = data.get("quiet")
+        flags = FLAG_QUIET if quiet else 0
+        return data["slot"] % SLOTS, flags, self._zone(data.get("tz")), (quiet[0] << 8 | quiet[1]) if quiet else 0
+
+    # -- reads ---------------------------------------------------------------
+
+    def get(self, user_id):
+        """`user_id`'s subscription as a store record, or None."""
+        i = self._find(user_id)
+        if i < 0:
+            return None
+        data = {"subscribed": True, "slot": self._slots[i], "tz": self._zone_names[self._zones[i]]}
+        if self._flags[i] & FLAG_QUIET:
+            data["quiet"] = [self._quiet[i] >> 8, self._quiet[i] & 0xFF]
+        return data
+
+    def timezone(self, user_id):
+        """`user_id`'s time zone name, or None if not subscribed."""
+        i = self._find(user_id)
+        return None if i < 0 else self._zone_names[self._zones[i]]
+
+    def least_loaded(self):
+        return min(range(SLOTS), key=self._slot_sizes.__getitem__)
+
+    def sizes(self):
+        return list(self._slot_sizes)
+
+    def due(self, minute):
+        """Users whose reminder fires at UTC minute `minute` (0-59)."""
+        slot, slots, ids, owns = minute % SLOTS, self._slots, self._ids, self.owns
+        users = []
+        i = slots.find(slot)
+        while i >= 0:
+            if owns is None or owns(ids[i]):
+                users.append(ids[i])
+            i = slots.find(slot, i + 1)
+        return users
+
+    def quiet_filter(self, now=None):
+        """A ``should_skip(user_id)`` for one delivery tick.
+
+        True for users who unsubscribed meanwhile or are inside their quiet
+        hours.  Each time zone's local hour is worked out once per tick.
+        """
+        now = now or datetime.now(dt_timezone.utc)
+        hours = {}  # zone index -> local hour
+
+        def skip(user_id):
+            i = self._find(user_id)
+            if i < 0:
+                return True
+            if not self._flags[i] & FLAG_QUIET:
+                return False
+            zone = self._zones[i]
+            hour = hours.get(zone)
+            if hour is None:
+                hour = hours[zone] = local_hour(self._zone_names[zone], now)
+            return in_quiet_window(self._quiet[i] >> 8, self._quiet[i] & 0xFF, hour)
+
+        return skip
+
+    def memory_bytes(self):
+        """Bytes held by the columns (including spare capacity) and the zone table."""
+        columns = (self._ids, self._slots, self._flags, self._zones, self._quiet)
+        return sum(sys.getsizeof(column) for column in columns) + sum(len(name) for name in self._zone_names)
+
+    def bytes_per_subscriber(self):
+        return self.memory_bytes() / len(self) if len(self) else 0.0
+
+    # -- writes --------------------------------------------------------------
+
+    def set(self, user_id, data):
+        """Add or update `user_id` from a store record (needs a ``slot``)."""
+        slot, flags, zone, quiet = self._encode(data)
+        i = self._find(user_id)
+        if i >= 0:
+            self._slot_sizes[self._slots[i]] -= 1
+            self._slots[i], self._flags[i], self._zones[i], self._quiet[i] = slot, flags, zone, quiet
+        else:
+            i = bisect_left(self._ids, user_id)
+            self._ids.insert(i, user_id)
+            self._slots.insert(i, slot)
+            self._flags.insert(i, flags)
+            self._zones.insert(i, zone)
+            self._quiet.insert(i, quiet)
+        self._slot_sizes[slot] += 1
+
+    def discard(self, user_id):
+        """Remove `user_id`; returns False if they were not subscribed."""
+        i = self._find(user_id)
+        if i < 0:
+            return False
+        self._slot_sizes[self._slots[i]] -= 1
+        for column in (self._ids, self._slots, self._flags, self._zones, self._quiet):
+            del column[i]
+        return True
+
+    def load(self, records):
+        """Replace everything with `records` ({user ID: store record}) in one sort.
+
+        Records from before slots existed are given one (in place); returns
+        their user IDs so the caller can save them.
+        """
+        self._slot_sizes = [0] * SLOTS
+        for data in records.values():
+            if "slot" in data:
+                self._slot_sizes[data["slot"] % SLOTS] += 1
+        assigned = []
+        for user_id, data in records.items():
+            if "slot" not in data:
+                data["slot"] = self.least_loaded()
+                self._slot_sizes[data["slot"]] += 1
+                assigned.append(user_id)
+        rows = sorted((int(user_id), self._encode(data)) for user_id, data in records.items())
+        self._ids = array("Q", [user_id for user_id, _ in rows])
+        self._slots = bytearray(row[0] for _, row in rows)
+        self._flags = bytearray(row[1] for _, row in rows)
+        self._zones = array("H", [row[2] for _, row in rows])
+        self._quiet = array("H", [row[3] for _, row in rows])
+        return assigned
+
+    def _count_slots(self):
+        slots = bytes(self._slots)
+        self._slot_sizes = [slots.count(slot) for slot in range(SLOTS)]
+
+    # -- snapshots -----------------------------------------------------------
+
+    def snapshot(self, path):
+        """Write the columns to `path` (atomically).  Native byte order: for this machine only."""
+        path = Path(path)
+        tmp = path.with_name(path.name + ".tmp")
+        zones = "\n".join(self._zone_names).encode()
+        with open(tmp, "wb") as f:
+            f.write(_SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, len(self), len(zones)))
+            f.write(zones)
+            self._ids.tofile(f)
+            f.write(self._slots)
+            f.write(self._flags)
+            self._zones.tofile(f)
+            self._quiet.tofile(f)
+        os.replace(tmp, path)
+
+    def restore(self, path, expected=None):
+        """Load a `snapshot`; returns False (leaving the registry as it was) if
+        it is missing, damaged, or does not hold `expected` subscribers."""
+        try:
+            with open(path, "rb") as f:
+                magic, count, zone_bytes = _SNAPSHOT_HEADER.unpack(f.read(_SNAPSHOT_HEADER.size))
+                if magic != SNAPSHOT_MAGIC or (expected is not None and count != expected):
+                    return False
+                zone_names = f.read(zone_bytes).decode().split("\n")
+                ids, zones, quiet = array("Q"), array("H"), array("H")
+                ids.fromfile(f, count)
+                slots, flags = bytearray(f.read(count)), bytearray(f.read(count))
+                zones.fromfile(f, count)
+                quiet.fromfile(f, count)
+                if len(slots) != count or len(flags) != count or f.read(1):
+                    return False
+        except (OSError, EOFError, struct.error, UnicodeDecodeError):
+            return False
+        self._ids, self._slots, self._flags, self._zones, self._quiet = ids, slots, flags, zones, quiet
+        self._zone_names = zone_names
+        self._zone_index = {name: i for i, name in enumerate(zone_names)}
+        self._count_slots()
+        return True
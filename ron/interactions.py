@@ -0,0 +1,180 @@
+"""Automatic deferral of slow slash commands, and time-to-first-ack timing.
+
+Discord drops an interaction that is not acknowledged within 3 seconds of
+being created ("The application did not respond").  Instead of every
+handler having to remember to call ``defer()`` before slow work, the
+command tree attaches an `AutoDeferResponse` to each slash command
+interaction.  If the handler has not responded `budget` seconds after the
+interaction was created, it is deferred for the handler ("Ron is
+thinking..."), and from then on the handler's
+``interaction.response.send_message`` calls are sent as follow-ups, so the
+handler code does not change.
+
+An automatic deferral is ephemeral, since it cannot know whether the reply
+will be.  If the handler's first reply is public, the "thinking" message is
+replaced by a public follow-up and removed.  Modals cannot be sent after a
+deferral, so a command that opens one must do so within the budget.
+
+The first acknowledgement of every interaction (reply, defer, automatic
+defer or modal) is timed from the interaction's creation and reported
+through `on_ack`.
+"""
+import asyncio
+import logging
+
+import discord
+
+log = logging.getLogger("ron.interactions")
+
+# Discord's limit for the first response
+ACK_DEADLINE = 3.0
+
+
+class AutoDeferResponse(discord.InteractionResponse):
+    """An ``interaction.response`` that defers itself when the handler is slow."""
+
+    __slots__ = ("_deferrer", "_lock", "_timer", "_acked", "auto_deferred", "_placeholder")
+
+    def __init__(self, parent, deferrer):
+        super().__init__(parent)
+        self._deferrer = deferrer
+        self._lock = asyncio.Lock()
+        self._timer = None
+        self._acked = False
+        self.auto_deferred = False
+        self._placeholder = False  # the automatic "thinking" message is still showing
+
+    def _ack(self, how):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._acked:
+            self._acked = True
+            self._deferrer.acknowledged(self._parent, how)
+
+    async def auto_defer(self):
+        """Defer now unless the handler has already responded."""
+        async with self._lock:
+            if self.is_done():
+                return
+            await super().defer(ephemeral=True, thinking=True)
+            self.auto_deferred = self._placeholder = True
+            self._ack("auto_defer")
+
+    async def defer(self, *, ephemeral=False, thinking=False):
+        async with self._lock:
+            if self.auto_deferred:
+                return None  # already done for the handler; replies become follow-ups
+            result = await super().defer(ephemeral=ephemeral, thinking=thinking)
+            self._ack("defer")
+            return result
+
+    async def send_message(self, content=None, *, ephemeral=False, delete_after=None, **kwargs):
+        async with self._lock:
+            if not self.auto_deferred:
+                result = await super().send_message(content, ephemeral=ephemeral, delete_after=delete_after, **kwargs)
+                self._ack("reply")
+                return result
+            return await self._follow_up(content, ephemeral, delete_after, kwargs)
+
+    async def send_modal(self, modal, /):
+        async with self._lock:
+            result = await super().send_modal(modal)
+            self._ack("modal")
+            return result
+
+    async def _follow_up(self, content, ephemeral, delete_after, kwargs):
+        interaction = self._parent
+        if content is not None:
+            kwargs["content"] = content
+        replace_placeholder = self._placeholder and not ephemeral
+        if replace_placeholder:
+            # the first follow-up would take over the ephemeral "thinking"
+            # message, so settle that first and post the public reply after it
+            await interaction.edit_original_response(content="✅")
+        self._placeholder = False
+        message = await interaction.followup.send(ephemeral=ephemeral, wait=True, **kwargs)
+        if replace_placeholder:
+            try:
+                await interaction.delete_original_response()
+            except discord.HTTPException as e:
+                self._deferrer.on_error("interactions.delete_placeholder", e)
+        if delete_after is not None:
+            await message.delete(delay=delete_after)
+        return message
+
+    async def fail(self, text):
+        """Answer the "thinking" message left by an automatic deferral after the handler failed."""
+        async with self._lock:
+            if self._placeholder:
+                self._placeholder = False
+                await self._parent.followup.send(text, ephemeral=True)
+
+
+class Deferrer:
+    """Attaches `AutoDeferResponse` to interactions and times their first ack.
+
+    `budget` is how long after an interaction's creation a handler has to
+    respond before it is deferred for it; 0 turns automatic deferral off
+    (acks are still timed).  `on_ack(interaction, how, seconds)` is called
+    once per interaction, and `on_error(where, exc)` for errors that are
+    carried on from.
+    """
+
+    def __init__(self, budget=2.0, on_ack=None, on_error=None):
+        self.budget = budget
+        self.on_ack = on_ack
+        self.on_error = on_error or (lambda where, exc: log.warning("%s failed: %s", where, exc))
+        self._tasks = set()
+        self.auto_deferred = 0
+
+    def attach(self, interaction):
+        """Replace `interaction.response`, and arm the deferral timer."""
+        response = AutoDeferResponse(interaction, self)
+        interaction._cs_response = response
+        if self.budget > 0:
+            age = max(self.age(interaction), 0.0)  # a fast local clock can make it negative
+            response._timer = asyncio.get_running_loop().call_later(
+                max(self.budget - age, 0.0), self._fire, response)
+        return response
+
+    @staticmethod
+    def age(interaction):
+        return (discord.utils.utcnow() - interaction.created_at).total_seconds()
+
+    def _fire(self, response):
+        response._timer = None
+        task = asyncio.create_task(self._auto_defer(response), name="ron: auto defer")
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _auto_defer(self, response):
+        try:
+            await response.auto_defer()
+        except discord.HTTPException as e:
+            # typically the token already expired because the loop was stalled
+            self.on_error("interactions.auto_defer", e)
+        else:
+            if response.auto_deferred:
+                self.auto_deferred += 1
+
+    def acknowledged(self, interaction, how):
+        seconds = self.age(interaction)
+        if seconds > ACK_DEADLINE:
+            log.warning("Interaction acknowledged after %.2fs (%s)", seconds, how)
+        if self.on_ack is not None:
+            self.on_ack(interaction, how, seconds)
+
+    async def finish(self, interaction, failed=False):
+        """The command is over: disarm the timer, and answer a deferral it left hanging if it failed."""
+        response = interaction.response
+        if not isinstance(response, AutoDeferResponse):
+            return
+        if response._timer is not None:
+            response._timer.cancel()
+            response._timer = None
+        if failed:
+            try:
+                await response.fail("❌ Something went wrong running that command.")
+            except discord.HTTPException as e:
+                self.on_error("interactions.fail", e)
@@ -0,0 +1,208 @@
+"""Logging setup: structured records written off the event loop.
+
+`setup` gives the root logger a single `QueueHandler`.  A `QueueListener`
+thread drains the queue and does the formatting and the stream/file I/O, so
+a slow disk or a blocked stderr pipe never stalls the event loop.
+
+Records are JSON lines by default (``LOG_FORMAT=text`` for a plain console
+format).  Besides the usual fields, each line carries whatever was bound
+with `bind` for the current task (the command, guild and user of the
+command being run) and any ``extra=`` fields such as ``latency_ms``.
+
+Noisy loggers (DM fan-out, outbound sends, ignored errors) get a
+`RateLimitFilter`: at most `burst` records per message template per
+`interval`, with the number suppressed reported on the next one let through.
+`ErrorTally` is for ``except`` blocks that deliberately carry on: it counts
+the error in a metric and logs a sample instead of discarding it.
+
+Environment:
+
+- ``LOG_LEVEL``: root level (default INFO)
+- ``LOG_LEVELS``: per-logger levels, e.g. ``discord=WARNING,ron.commands=DEBUG``
+- ``LOG_FORMAT``: ``json`` (default) or ``text``
+- ``LOG_FILE``: also write to this file, rotated at ``LOG_MAX_BYTES``
+  (default 10 MB) keeping ``LOG_BACKUPS`` old files (default 5).  Cluster
+  workers each get their own file (``ron.1.log`` for worker 1), since
+  processes can't share a rotating file.
+- ``LOG_SAMPLED``: comma-separated loggers to rate-limit
+"""
+import atexit
+import contextvars
+import copy
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+# Fields bound to the current task with `bind`
+_context = contextvars.ContextVar("ron_log_context", default={})
+
+# Attributes every LogRecord has; anything else came from `extra=` or `bind`
+_STANDARD = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "taskName"}
+
+TEXT_FORMAT = "%(asctime)s %(levelname)s %(name)s: %(message)s"
+DEFAULT_SAMPLED = "ron.fanout,ron.outbound,ron.errors"
+
+
+def bind(**fields):
+    """Attach `fields` to every record logged from the current task (and tasks it starts)."""
+    _context.set({**_context.get(), **fields})
+
+
+class ContextFilter(logging.Filter):
+    """Copies the bound fields onto the record, in the thread that logged it."""
+
+    def filter(self, record):
+        for key, value in _context.get().items():
+            if not hasattr(record, key):
+                setattr(record, key, value)
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line."""
+
+    def format(self, record):
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _STANDARD and key != "sample_key":
+                entry[key] = value if isinstance(value, (str, int, float, bool, type(None))) else str(value)
+        if record.exc_info or record.exc_text:
+            entry["exc"] = record.exc_text or self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    def prepare(self, record):
+        # Like QueueHandler.prepare, but keeps the traceback apart from the
+        # message (as exc_text) so the JSON formatter can give it its own field
+        record = copy.copy(record)
+        record.msg, record.args = record.getMessage(), None
+        if record.exc_info:
+            record.exc_text = _plain.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+_plain = logging.Formatter()
+
+
+class RateLimitFilter(logging.Filter):
+    """Lets through at most `burst` records per message template per `interval` seconds."""
+
+    def __init__(self, burst=5, interval=60.0):
+        super().__init__()
+        self.burst = burst
+        self.interval = interval
+        self._windows = {}  # key -> [window start, records let through, records suppressed]
+
+    def filter(self, record):
+        key = (record.name, record.levelno, getattr(record, "sample_key", None) or record.msg)
+        now = time.monotonic()
+        window = self._windows.get(key)
+        if window is None or now - window[0] >= self.interval:
+            suppressed = window[2] if window is not None else 0
+            if len(self._windows) > 10000:
+                self._windows.clear()
+            window = self._windows[key] = [now, 0, 0]
+            if suppressed:
+                record.suppressed = suppressed
+        if window[1] >= self.burst:
+            window[2] += 1
+            return False
+        window[1] += 1
+        return True
+
+
+class ErrorTally:
+    """Counts and samples errors that are handled by carrying on.
+
+    ``errors("dm.delete_invocation", exc)`` increments `counter` (a
+    `ron.metrics.Counter` labelled by place and exception type, if given)
+    and logs a warning on ``ron.errors``, rate-limited per place.
+    """
+
+    def __init__(self, counter=None):
+        self.counter = counter
+        self.log = logging.getLogger("ron.errors")
+
+    def __call__(self, where, exc=None):
+        kind = type(exc).__name__ if exc is not None else "unknown"
+        if self.counter is not None:
+            self.counter.inc(where, kind)
+        self.log.warning("Ignored %s in %s: %s", kind, where, exc, extra={"sample_key": where, "where": where})
+
+
+_listener = None
+
+
+def parse_levels(spec):
+    """``"discord=WARNING,ron.fanout=DEBUG"`` -> {logger name: level}; bad entries are skipped."""
+    levels = {}
+    for item in spec.split(","):
+        name, _, level = item.partition("=")
+        level = logging.getLevelName(level.strip().upper())
+        if name.strip() and isinstance(level, int):
+            levels[name.strip()] = level
+    return levels
+
+
+def setup(env=os.environ, stream=None):
+    """Route all logging through a queue to a background writer thread.
+
+    Safe to call more than once; later calls do nothing.  Returns the
+    QueueListener.
+    """
+    global _listener
+    if _listener is not None:
+        return _listener
+    formatter = logging.Formatter(TEXT_FORMAT) if env.get("LOG_FORMAT", "json").lower() == "text" else JsonFormatter()
+    handlers = [logging.StreamHandler(stream or sys.stderr)]
+    if env.get("LOG_FILE"):
+        path = Path(env["LOG_FILE"])
+        if env.get("RON_CLUSTER_ID"):
+            path = path.with_name(f"{path.stem}.{env['RON_CLUSTER_ID']}{path.suffix}")
+        path.parent.mkdir(parents=True, exist_ok=True)
+        handlers.append(logging.handlers.RotatingFileHandler(
+            path, maxBytes=int(env.get("LOG_MAX_BYTES", 10 * 1024 * 1024)),
+            backupCount=int(env.get("LOG_BACKUPS", 5)), encoding="utf-8",
+        ))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    records = queue.SimpleQueue()
+    queue_handler = _QueueHandler(records)
+    queue_handler.addFilter(ContextFilter())
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(parse_levels(f"root={env.get('LOG_LEVEL', 'INFO')}").get("root", logging.INFO))
+    for name, level in parse_levels(env.get("LOG_LEVELS", "")).items():
+        logging.getLogger(name).setLevel(level)
+    for name in env.get("LOG_SAMPLED", DEFAULT_SAMPLED).split(","):
+        if name.strip():
+            logging.getLogger(name.strip()).addFilter(RateLimitFilter())
+
+    _listener = logging.handlers.QueueListener(records, *handlers, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown)
+    return _listener
+
+
+def shutdown():
+    """Write out what is still queued and stop the writer thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
@@ -0,0 +1,314 @@
+"""Per-guild member lookup index.
+
+Resolves a free-text member reference (username, global name, display name,
+or legacy ``name#discriminator``) with hash lookups instead of scanning
+`guild.members`, and serves prefix suggestions for slash-command
+autocomplete from a sorted key list via bisect.  The index is built lazily
+per guild, in a worker thread so a large guild does not stall the event
+loop, and kept current from the member join/update/remove events.
+
+In lean member-cache mode (``MEMBER_CACHE=lean``) discord.py neither chunks
+guilds at startup nor keeps members, so the index is built from a one-off,
+uncached chunk of the guild the first time a command needs names, and
+members are fetched by ID through a small LRU instead of `guild.get_member`.
+Member updates are not delivered for uncached members, so in that mode an
+index is rebuilt once it is older than `max_age`.
+"""
+import asyncio
+import bisect
+import heapq
+import itertools
+import logging
+import sys
+import time
+from array import array
+from collections import OrderedDict
+
+import discord
+
+log = logging.getLogger("ron.members")
+
+SORT_SLICE = 20000
+
+
+def _names(member):
+    """Lowercased names a member can be looked up by, most specific first."""
+    names = [member.name.lower()]
+    if member.global_name:
+        names.append(member.global_name.lower())
+    if member.nick:
+        names.append(member.nick.lower())
+    if member.discriminator and member.discriminator != "0":
+        names.append(f"{member.name.lower()}#{member.discriminator}")
+    # preserve order, drop duplicates
+    return list(dict.fromkeys(names))
+
+
+class GuildMemberIndex:
+    """Name -> member ID maps for a single guild."""
+
+    def __init__(self):
+        self._by_name = {}  # lowercase name -> set of member IDs
+        self._names = {}    # member ID -> names it is indexed under
+        self._sorted = []   # sorted unique names, for prefix search
+
+    def __len__(self):
+        return len(self._names)
+
+    def add(self, member):
+        self.remove(member.id)
+        names = _names(member)
+        self._names[member.id] = names
+        for name in names:
+            ids = self._by_name.get(name)
+            if ids is None:
+                ids = self._by_name[name] = set()
+                bisect.insort(self._sorted, name)
+            ids.add(member.id)
+
+    @classmethod
+    def build(cls, members):
+        """An index of `members`, with the name list sorted once at the end."""
+        index = cls()
+        by_name, names_of = index._by_name, index._names
+        # a member listed twice keeps their last entry, as with `add`
+        for member in {member.id: member for member in members}.values():
+            names = names_of[member.id] = _names(member)
+            for name in names:
+                ids = by_name.get(name)
+                if ids is None:
+                    ids = by_name[name] = set()
+                ids.add(member.id)
+        # sorted in slices and merged: one sorted() call over 200k names holds
+        # the GIL for ~150ms, which would stall the loop during a threaded build
+        names = list(by_name)
+        runs = [sorted(names[i:i + SORT_SLICE]) for i in range(0, len(names), SORT_SLICE)]
+        index._sorted = list(heapq.merge(*runs)) if len(runs) > 1 else (runs[0] if runs else [])
+        return index
+
+    def remove(self, member_id):
+        for name in self._names.pop(member_id, ()):
+            ids = self._by_name.get(name)
+            if ids is None:
+                continue
+            ids.discard(member_id)
+            if not ids:
+                del self._by_name[name]
+                del self._sorted[bisect.bisect_left(self._sorted, name)]
+
+    def lookup(self, text):
+        """Member IDs matching `text` exactly (case-insensitive)."""
+        return self._by_name.get(text.lower(), set())
+
+    def suggest(self, prefix, limit=25):
+        """Up to `limit` (name, member_id) pairs whose name starts with `prefix`.
+
+        Exact matches sort first, then shorter names; O(log n + limit).
+        """
+        prefix = prefix.lower()
+        start = bisect.bisect_left(self._sorted, prefix)
+        matches = []
+        for name in self._sorted[start:start + limit * 2]:
+            if not name.startswith(prefix):
+                break
+            for member_id in self._by_name[name]:
+                matches.append((name, member_id))
+        matches.sort(key=lambda item: (item[0] != prefix, len(item[0]), item[0]))
+        return matches[:limit]
+
+
+class MemberLRU:
+    """Bounded ``(guild ID, member ID) -> Member`` cache, least recently used out."""
+
+    def __init__(self, maxsize=1024):
+        self.maxsize = maxsize
+        self._members = OrderedDict()
+
+    def __len__(self):
+        return len(self._members)
+
+    def get(self, guild_id, member_id):
+        member = self._members.get((guild_id, member_id))
+        if member is not None:
+            self._members.move_to_end((guild_id, member_id))
+        return member
+
+    def put(self, member):
+        self._members[member.guild.id, member.id] = member
+        self._members.move_to_end((member.guild.id, member.id))
+        while len(self._members) > self.maxsize:
+            self._members.popitem(last=False)
+
+    def discard(self, guild_id, member_id):
+        self._members.pop((guild_id, member_id), None)
+
+    def drop_guild(self, guild_id):
+        for key in [key for key in self._members if key[0] == guild_id]:
+            del self._members[key]
+
+
+class MemberIndex:
+    """Lazily built `GuildMemberIndex` per guild, plus on-demand member lookup.
+
+    With `lean` set, members come from `guild.fetch_member` through an LRU of
+    `cache_size` entries and name indexes are built from an uncached chunk.
+    """
+
+    def __init__(self, lean=False, cache_size=1024, max_age=3600):
+        self.lean = lean
+        self.max_age = max_age
+        self.cache = MemberLRU(cache_size)
+        self._guilds = {}
+        self._built = {}  # guild ID -> monotonic time its index was built
+        self._missed = {}  # guild ID -> member events that arrived while its index was being built
+        self._refreshing = {}  # guild ID -> task chunking and building its index
+
+    async def ensure(self, guild):
+        """The guild's index, chunking the guild first if its members aren't cached."""
+        index = self._guilds.get(guild.id)
+        stale = self.lean and time.monotonic() - self._built.get(guild.id, 0) > self.max_age
+        if index is not None and not stale:
+            return index
+        # one chunk and build per guild, however many callers (e.g. an
+        # autocomplete per keystroke) ask while it runs
+        task = self._refreshing.get(guild.id)
+        if task is None:
+            task = self._refreshing[guild.id] = asyncio.create_task(
+                self._refresh(guild), name=f"ron: member index {guild.id}")
+            task.add_done_callback(lambda done, guild_id=guild.id: self._refreshed(guild_id, done))
+        # a caller that gives up (times out) does not cancel it for the others
+        return await asyncio.shield(task)
+
+    def _refreshed(self, guild_id, task):
+        if self._refreshing.get(guild_id) is task:
+            del self._refreshing[guild_id]
+        if not task.cancelled() and task.exception() is not None:
+            log.warning("Building the member index of guild %s failed: %r", guild_id, task.exception())
+
+    async def _refresh(self, guild):
+        if guild.chunked:
+            return await self._build(guild.id, list(guild.members))
+        started = time.perf_counter()
+        members = await guild.chunk(cache=False)
+        index = await self._build(guild.id, members)
+        log.info("Chunked guild %s on demand: %d members in %.2fs", guild.id, len(members), time.perf_counter() - started)
+        return index
+
+    async def _build(self, guild_id, members):
+        """Build an index of `members` in a worker thread, then swap it in.
+
+        The current index (if any) keeps serving meanwhile.  Joins, updates
+        and removals that arrive during the build are replayed onto the new
+        index before the swap, so none are lost.
+        """
+        missed = self._missed[guild_id] = []
+        try:
+            index = await asyncio.to_thread(GuildMemberIndex.build, members)
+        finally:
+            if self._missed.get(guild_id) is missed:
+                del self._missed[guild_id]
+        for member, member_id in missed:
+            if member is not None:
+                index.add(member)
+            else:
+                index.remove(member_id)
+        self._guilds[guild_id] = index
+        self._built[guild_id] = time.monotonic()
+        return index
+
+    def on_join(self, member):
+        index = self._guilds.get(member.guild.id)
+        if index is not None:
+            index.add(member)
+        missed = self._missed.get(member.guild.id)
+        if missed is not None:
+            missed.append((member, member.id))
+
+    def on_update(self, member):
+        self.on_join(member)
+        if self.cache.get(member.guild.id, member.id) is not None:
+            self.cache.put(member)
+
+    def on_remove(self, guild_id, member_id):
+        index = self._guilds.get(guild_id)
+        if index is not None:
+            index.remove(member_id)
+        missed = self._missed.get(guild_id)
+        if missed is not None:
+            missed.append((None, member_id))
+        self.cache.discard(guild_id, member_id)
+
+    def drop_guild(self, guild_id):
+        task = self._refreshing.pop(guild_id, None)
+        if task is not None:
+            task.cancel()
+        self._guilds.pop(guild_id, None)
+        self._built.pop(guild_id, None)
+        self.cache.drop_guild(guild_id)
+
+    def cached(self, guild, member_id):
+        """The member if discord.py or the LRU has it, without any I/O."""
+        return guild.get_member(member_id) or self.cache.get(guild.id, member_id)
+
+    async def member(self, guild, member_id):
+        """The member with `member_id`, fetched over REST if it isn't cached; None if not in the guild."""
+        member = self.cached(guild, member_id)
+        if member is None and self.lean:
+            try:
+                member = await guild.fetch_member(member_id)
+            except discord.NotFound:
+                return None
+            self.cache.put(member)
+        return member
+
+    async def resolve(self, guild, text):
+        """Resolve `text` (mention, ID or name) to a Member, or None."""
+        text = text.strip()
+        digits = text[2:-1].lstrip("!") if text.startswith("<@") and text.endswith(">") else text
+        if digits.isdigit():
+            member = await self.member(guild, int(digits))
+            if member is not None:
+                return member
+        for member_id in (await self.ensure(guild)).lookup(text):
+            member = await self.member(guild, member_id)
+            # a lean index can be stale; make sure the name still matches
+            if member is not None and text.lower() in _names(member):
+                return member
+        return None
+
+
+def _sizeof(obj, seen, depth=0):
+    """Approximate deep size of one cached member (skips shared guild/state)."""
+    if id(obj) in seen or depth > 4 or isinstance(obj, (discord.Guild, discord.state.ConnectionState)):
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, (str, bytes, int, float, bool, array)) or obj is None:
+        return size
+    if isinstance(obj, dict):
+        return size + sum(_sizeof(k, seen, depth + 1) + _sizeof(v, seen, depth + 1) for k, v in obj.items())
+    if isinstance(obj, (list, tuple, set, frozenset)):
+        return size + sum(_sizeof(item, seen, depth + 1) for item in obj)
+    for cls in type(obj).__mro__:
+        for slot in getattr(cls, "__slots__", ()):
+            if slot not in ("_state", "guild"):
+                size += _sizeof(getattr(obj, slot, None), seen, depth + 1)
+    if hasattr(obj, "__dict__"):
+        size += _sizeof(vars(obj), seen, depth + 1)
+    return size
+
+
+def cache_footprint(guilds, sample=500):
+    """``(members, approximate bytes)`` held by discord.py's member cache.
+
+    Sizes a sample of cached members and scales up, so it is cheap enough to
+    call at startup with millions of members.
+    """
+    count = sum(len(guild._members) for guild in guilds)
+    members = list(itertools.islice(
+        (member for guild in guilds for member in guild._members.values()), sample))
+    if not members:
+        return count, 0
+    seen = set()
+    sampled = sum(_sizeof(member, seen) for member in members)
+    return count, round(sampled / len(members) * count)
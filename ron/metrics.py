@@ -0,0 +1,206 @@
+"""In-process metrics with a Prometheus text endpoint.
+
+Counters, gauges and histograms are plain Python objects registered on a
+`Registry`; gauges can also be callbacks that are evaluated at scrape time
+(process RSS, task count, ...).  `serve` exposes ``/metrics`` in the
+Prometheus text format on a local port, using nothing but asyncio streams.
+The same registry backs the `/health` embed, so both always agree.
+"""
+import asyncio
+import bisect
+import logging
+
+log = logging.getLogger("ron.metrics")
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _labels(names, values):
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{str(value).replace(chr(34), chr(39))}"' for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+
+    def header(self):
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name, help, labelnames=()):
+        super().__init__(name, help, labelnames)
+        self._values = {}
+
+    def inc(self, *labels, amount=1):
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels):
+        return self._values.get(labels, 0)
+
+    def total(self):
+        return sum(self._values.values())
+
+    def render(self):
+        return [f"{self.name}{_labels(self.labelnames, labels)} {value}" for labels, value in self._values.items()]
+
+
+class Gauge(_Metric):
+    """A settable gauge, or a callback gauge if `func` is given."""
+
+    kind = "gauge"
+
+    def __init__(self, name, help, func=None):
+        super().__init__(name, help)
+        self.func = func
+        self._value = 0
+
+    def set(self, value):
+        self._value = value
+
+    def value(self):
+        return self.func() if self.func is not None else self._value
+
+    def render(self):
+        try:
+            return [f"{self.name} {self.value()}"]
+        except Exception:
+            log.exception("Gauge %s failed", self.name)
+            return []
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(buckets)
+        self._series = {}  # labels -> [bucket counts..., sum, count]
+
+    def observe(self, value, *labels):
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [0] * (len(self.buckets) + 2)
+        index = bisect.bisect_left(self.buckets, value)
+        if index < len(self.buckets):
+            series[index] += 1  # larger values only land in +Inf (the count)
+        series[-2] += value
+        series[-1] += 1
+
+    def count(self, *labels):
+        series = self._series.get(labels)
+        return series[-1] if series else 0
+
+    def mean(self, *labels):
+        series = self._series.get(labels)
+        return series[-2] / series[-1] if series and series[-1] else 0.0
+
+    def total(self):
+        """Observations across every label set."""
+        return sum(series[-1] for series in self._series.values())
+
+    def quantile(self, q, *labels):
+        """Approximate quantile: upper bound of the bucket containing it.
+
+        With no labels on a labelled histogram, all series are merged.
+        """
+        if labels or not self.labelnames:
+            series = self._series.get(labels)
+        else:
+            series = [sum(column) for column in zip(*self._series.values())] or None
+        if not series or not series[-1]:
+            return 0.0
+        target, seen = q * series[-1], 0
+        for bound, count in zip(self.buckets, series):
+            seen += count
+            if seen >= target:
+                return bound
+        return float("inf")
+
+    def render(self):
+        lines = []
+        for labels, series in self._series.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames + ('le',), labels + (bound,))} {cumulative}")
+            lines.append(f"{self.name}_bucket{_labels(self.labelnames + ('le',), labels + ('+Inf',))} {series[-1]}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {series[-2]}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {series[-1]}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+
+    def _add(self, metric):
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, help, labelnames=()):
+        return self._add(Counter(name, help, labelnames))
+
+    def gauge(self, name, help, func=None):
+        return self._add(Gauge(name, help, func))
+
+    def histogram(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._add(Histogram(name, help, labelnames, buckets))
+
+    def __getitem__(self, name):
+        return self._metrics[name]
+
+    def render(self):
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.header())
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+async def monitor_loop_lag(gauge, interval=0.5):
+    """Keep `gauge` at how late the event loop wakes from a short sleep."""
+    loop = asyncio.get_running_loop()
+    while True:
+        started = loop.time()
+        await asyncio.sleep(interval)
+        gauge.set(max(0.0, loop.time() - started - interval))
+
+
+async def serve(registry, host="127.0.0.1", port=9187):
+    """Serve ``GET /metrics`` from `registry`; returns the asyncio Server."""
+
+    async def handle(reader, writer):
+        try:
+            request = await asyncio.wait_for(reader.readline(), 5)
+            # drain headers; we do not need any of them
+            while (await asyncio.wait_for(reader.readline(), 5)) not in (b"\r\n", b"\n", b""):
+                pass
+            parts = request.decode("latin-1").split()
+            if len(parts) >= 2 and parts[0] == "GET" and parts[1].split("?")[0] == "/metrics":
+                status, body = "200 OK", registry.render().encode()
+            else:
+                status, body = "404 Not Found", b"not found\n"
+            writer.write(
+                f"HTTP/1.0 {status}\r\nContent-Type: text/plain; version=0.0.4\r\n"
+                f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode() + body
+            )
+            await writer.drain()
+        except (asyncio.TimeoutError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    server = await asyncio.start_server(handle, host, port)
+    log.info("Serving metrics on http://%s:%d/metrics", host, port)
+    return server
+
@@ -0,0 +1,217 @@
+"""Shared outbound queue for channel messages.
+
+Announcements (immediate or scheduled) are queued here instead of being sent
+inline by the command.  Discord rate-limits ``POST /channels/{id}/messages``
+per channel, so each channel is its own bucket: a FIFO drained by at most one
+task at a time, while different channels drain concurrently on a bounded
+number of slots under a global token bucket.  Consecutive embed-only messages
+waiting for the same channel are coalesced into a single request of up to 10
+embeds.
+
+Failures are classified the way `ron.fanout` does it: missing access or an
+unknown channel fails the target straight away, while 5xx/429 and network
+errors are retried with jittered exponential backoff.  Every `send` or
+`broadcast` returns a `Delivery` that settles once each of its targets has
+been delivered or has failed, and can summarise the result.
+"""
+import asyncio
+import logging
+import random
+import time
+from collections import deque
+
+import aiohttp
+import discord
+
+from ron.fanout import RateLimiter
+
+log = logging.getLogger("ron.outbound")
+
+# Discord's per-message limits when several embeds are sent together.
+MAX_EMBEDS = 10
+MAX_EMBED_CHARS = 6000
+
+
+class Delivery:
+    """Per-target results for one `send` or `broadcast`."""
+
+    def __init__(self, targets):
+        self.targets = list(targets)
+        self.pending = len(self.targets)
+        self.delivered = []
+        self.failed = {}  # channel ID -> reason
+        self.retried = 0
+        self.started = time.monotonic()
+        self.finished = None if self.targets else self.started
+        self._done = asyncio.Event()
+        if not self.targets:
+            self._done.set()
+
+    @property
+    def done(self):
+        return self._done.is_set()
+
+    @property
+    def duration(self):
+        return (self.finished or time.monotonic()) - self.started
+
+    def _settle(self, channel_id, error=None):
+        if error is None:
+            self.delivered.append(channel_id)
+        else:
+            self.failed[channel_id] = error
+        self.pending -= 1
+        if self.pending == 0:
+            self.finished = time.monotonic()
+            self._done.set()
+
+    async def wait(self, timeout=None):
+        """Wait until every target has settled; returns self."""
+        await asyncio.wait_for(self._done.wait(), timeout)
+        return self
+
+    def summary(self, max_failures=10):
+        text = f"Delivered to {len(self.delivered)}/{len(self.targets)} channel(s) in {self.duration:.1f}s"
+        if self.retried:
+            text += f" ({self.retried} retried)"
+        if self.pending:
+            text += f", {self.pending} still queued"
+        if self.failed:
+            failures = [f"<#{channel_id}> ({reason})" for channel_id, reason in self.failed.items()]
+            if len(failures) > max_failures:
+                failures[max_failures:] = [f"and {len(failures) - max_failures} more"]
+            text += ". Failed: " + ", ".join(failures)
+        return text + "."
+
+
+class _Item:
+    __slots__ = ("content", "embeds", "delivery")
+
+    def __init__(self, content, embeds, delivery):
+        self.content = content
+        self.embeds = embeds
+        self.delivery = delivery
+
+    @property
+    def coalescable(self):
+        return not self.content and bool(self.embeds)
+
+
+class OutboundQueue:
+    """Per-channel message buckets drained concurrently under a global rate.
+
+    `on_result` is an optional ``on_result(channel_id, error)`` callback run
+    once per target as it settles (`error` is None on success).
+    """
+
+    def __init__(self, bot, concurrency=16, global_rate=40, max_retries=3, on_result=None):
+        self.bot = bot
+        self.max_retries = max_retries
+        self.on_result = on_result
+        self._global = RateLimiter(global_rate)
+        self._slots = asyncio.Semaphore(concurrency)
+        self._buckets = {}   # channel ID -> deque of _Item
+        self._draining = {}  # channel ID -> drain task
+
+    def __len__(self):
+        """Messages waiting to be sent, across all channels."""
+        return sum(len(bucket) for bucket in self._buckets.values())
+
+    def send(self, channel_id, content=None, *, embed=None):
+        """Queue one message for `channel_id`; returns its Delivery."""
+        return self.broadcast([channel_id], content, embed=embed)
+
+    def broadcast(self, channel_ids, content=None, *, embed=None):
+        """Queue the same message for every channel in `channel_ids`.
+
+        Duplicate IDs are sent once.  Returns a Delivery covering them all.
+        """
+        targets = list(dict.fromkeys(int(channel_id) for channel_id in channel_ids))
+        delivery = Delivery(targets)
+        embeds = [embed] if embed is not None else []
+        for channel_id in targets:
+            self._buckets.setdefault(channel_id, deque()).append(_Item(content, embeds, delivery))
+            if channel_id not in self._draining:
+                self._draining[channel_id] = asyncio.create_task(
+                    self._drain(channel_id), name=f"ron: outbound {channel_id}")
+        return delivery
+
+    async def stop(self):
+        """Cancel every drain task; messages still queued fail as cancelled."""
+        tasks = list(self._draining.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    # -- draining ------------------------------------------------------------
+
+    @staticmethod
+    def _take(bucket):
+        """Pop the next message, plus any embed-only ones that fit with it."""
+        batch = [bucket.popleft()]
+        if not batch[0].coalescable:
+            return batch
+        embeds = len(batch[0].embeds)
+        chars = sum(len(embed) for embed in batch[0].embeds)
+        while bucket and bucket[0].coalescable:
+            more = bucket[0].embeds
+            size = sum(len(embed) for embed in more)
+            if embeds + len(more) > MAX_EMBEDS or chars + size > MAX_EMBED_CHARS:
+                break
+            batch.append(bucket.popleft())
+            embeds += len(more)
+            chars += size
+        return batch
+
+    async def _drain(self, channel_id):
+        bucket = self._buckets[channel_id]
+        channel = self.bot.get_partial_messageable(channel_id)
+        batch = []
+        try:
+            while bucket:
+                batch = self._take(bucket)
+                for attempt in range(self.max_retries + 1):
+                    async with self._slots:
+                        error, transient = await self._attempt(channel, batch)
+                    if error is None or not transient or attempt == self.max_retries:
+                        break
+                    for item in batch:
+                        item.delivery.retried += 1
+                    # back off outside the slot so other channels keep moving
+                    await asyncio.sleep(min(2 ** attempt, 30) * random.uniform(0.5, 1.5))
+                self._settle(channel_id, batch, error)
+                batch = []
+        finally:
+            # only reached with an empty bucket unless the task was cancelled
+            self._settle(channel_id, batch + list(bucket), "cancelled")
+            del self._buckets[channel_id]
+            del self._draining[channel_id]
+
+    async def _attempt(self, channel, batch):
+        """Send `batch` once.  Returns ``(error, transient)``; error is None on success."""
+        try:
+            await self._global.acquire()
+            if len(batch) == 1:
+                await channel.send(content=batch[0].content, embeds=batch[0].embeds)
+            else:
+                await channel.send(embeds=[embed for item in batch for embed in item.embeds])
+            return None, False
+        except discord.Forbidden:
+            return "missing permissions", False
+        except discord.NotFound:
+            return "unknown channel", False
+        except discord.HTTPException as exc:
+            return f"HTTP {exc.status}", exc.status == 429 or exc.status >= 500
+        except (aiohttp.ClientError, asyncio.TimeoutError, OSError):
+            return "network error", True
+        except Exception:
+            log.exception("Unexpected error sending to channel %s", channel.id)
+            return "internal error", False
+
+    def _settle(self, channel_id, items, error):
+        if error is not None and items:
+            log.info("Message to channel %s failed: %s", channel_id, error, extra={"channel": channel_id})
+        for item in items:
+            item.delivery._settle(channel_id, error)
+            if self.on_result is not None:
+                self.on_result(channel_id, error)
@@ -0,0 +1,156 @@
+"""Event-loop stall detection and on-demand sampling profiles.
+
+Both work from a separate thread, so they keep working while the event loop
+is blocked and need no instrumentation in the code being observed.
+
+`StallWatchdog` runs a heartbeat on the loop and a daemon thread that checks
+it.  When the heartbeat is late by more than `threshold`, the thread grabs
+the loop thread's stack (the callback that is blocking it) along with the
+label of the running task.  Commands and events label their task through
+`label_task`.  The stall's duration is filled in once the loop recovers.
+
+`sample_profile` samples the loop thread's stack at a fixed interval for a
+few seconds.  It returns the samples as collapsed stacks
+(``frame;frame;frame count``).  `flamegraph.pl`, speedscope and inferno
+accept this format directly.
+"""
+import asyncio
+import collections
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+import weakref
+
+log = logging.getLogger("ron.profiling")
+
+_task_labels = weakref.WeakKeyDictionary()
+
+
+def label_task(label, task=None):
+    """Tag `task` (default: the current task) with what it is working on."""
+    task = task or asyncio.current_task()
+    if task is not None:
+        _task_labels[task] = label
+
+
+def task_label(task):
+    if task is None:
+        return "idle"
+    return _task_labels.get(task) or task.get_name()
+
+
+def _frame_name(frame):
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})"
+
+
+def _collapsed(frame):
+    names = []
+    while frame is not None:
+        names.append(_frame_name(frame))
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+class Stall:
+    __slots__ = ("started", "duration", "label", "stack")
+
+    def __init__(self, started, label, stack):
+        self.started = started
+        self.duration = None  # set once the loop recovers
+        self.label = label
+        self.stack = stack
+
+    def format(self):
+        duration = "ongoing" if self.duration is None else f"{self.duration * 1000:.0f} ms"
+        when = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(self.started))
+        return f"[{when}] {duration} in {self.label}\n{self.stack}"
+
+
+class StallWatchdog:
+    """Reports event-loop stalls longer than `threshold` seconds."""
+
+    def __init__(self, threshold=0.25, interval=0.05, history=20, on_stall=None):
+        self.threshold = threshold
+        self.interval = interval
+        self.stalls = collections.deque(maxlen=history)
+        self.on_stall = on_stall
+        self._loop = None
+        self._loop_thread = None
+        self._beat = time.monotonic()
+        self._task = None
+        self._thread = None
+        self._stop = threading.Event()
+
+    def start(self):
+        """Start watching the running loop (idempotent)."""
+        if self._task is not None and not self._task.done():
+            return
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread = threading.get_ident()
+        self._beat = time.monotonic()
+        self._task = asyncio.create_task(self._heartbeat(), name="ron: stall watchdog heartbeat")
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._watch, name="ron-stall-watchdog", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._task is not None:
+            self._task.cancel()
+
+    async def _heartbeat(self):
+        while True:
+            self._beat = time.monotonic()
+            await asyncio.sleep(self.interval)
+
+    def _watch(self):
+        current = began = None
+        while not self._stop.wait(self.interval):
+            late = time.monotonic() - self._beat - self.interval
+            if current is None and late > self.threshold:
+                frame = sys._current_frames().get(self._loop_thread)
+                if frame is None:
+                    continue
+                # reading another loop's current task is a plain dict lookup
+                label = task_label(asyncio.current_task(self._loop))
+                stack = "".join(traceback.format_stack(frame))
+                began = self._beat + self.interval  # when the next beat was due
+                current = Stall(time.time() - late, label, stack)
+                self.stalls.append(current)
+                log.warning("Event loop blocked for over %.0f ms in %s:\n%s", late * 1000, label, stack)
+            elif current is not None and late <= self.threshold:
+                # the heartbeat ran again; its timestamp marks the recovery
+                current.duration = self._beat - began
+                log.warning("Event loop stall in %s lasted %.0f ms", current.label, current.duration * 1000)
+                if self.on_stall is not None:
+                    self.on_stall(current)
+                current = None
+
+    def report(self):
+        """All recorded stalls, most recent first, as plain text."""
+        return "\n".join(stall.format() for stall in reversed(self.stalls))
+
+
+def sample_profile(thread_id, duration=10.0, interval=0.005):
+    """Sample `thread_id`'s stack for `duration` seconds.
+
+    Blocks the calling thread, so run it with `asyncio.to_thread`.  Returns
+    (collapsed stack text, number of samples).
+    """
+    counts = collections.Counter()
+    deadline = time.monotonic() + duration
+    samples = 0
+    while time.monotonic() < deadline:
+        frame = sys._current_frames().get(thread_id)
+        if frame is not None:
+            counts[_collapsed(frame)] += 1
+            samples += 1
+        del frame
+        time.sleep(interval)
+    lines = [f"{stack} {count}" for stack, count in counts.most_common()]
+    return "\n".join(lines) + "\n", samples
@@ -0,0 +1,317 @@
+"""Background purge jobs.
+
+A purge walks a channel's history newest-first and deletes the messages
+that match its filter, up to a requested count.  Messages younger than 14
+days are collected into bulk deletes of up to 100 per request.  Older
+messages cannot be bulk-deleted, so they are removed one at a time at a
+slow, fixed pace.
+
+Each job runs as its own task and reports progress through a callback at a
+throttled interval.  A guild can run only `per_guild` jobs at once, and at
+most `max_running` jobs run across all guilds; the rest wait their turn.
+Either way, one moderator cannot spend the bot's whole rate-limit budget.
+"""
+import asyncio
+import itertools
+import logging
+import re
+import time
+from datetime import timedelta
+
+import discord
+
+from ron.fanout import RateLimiter
+
+log = logging.getLogger("ron.purge")
+
+# Discord refuses bulk deletes of messages older than this; keep a margin
+BULK_MAX_AGE = timedelta(days=14) - timedelta(minutes=5)
+BULK_SIZE = 100
+MAX_PATTERN_LENGTH = 200
+
+_AGE_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400, "w": 604800}
+_AGE_RE = re.compile(r"(\d+)([smhdw])")
+
+
+class PurgeBusy(Exception):
+    """The guild already has as many purge jobs running as it may."""
+
+
+def parse_age(text):
+    """``"90m"``, ``"2h30m"``, ``"3d"`` -> timedelta; raises ValueError."""
+    text = text.strip().lower()
+    parts = _AGE_RE.findall(text)
+    if not parts or "".join(n + u for n, u in parts) != text:
+        raise ValueError(f"invalid duration {text!r} (use e.g. 30m, 2h, 3d)")
+    return timedelta(seconds=sum(int(n) * _AGE_UNITS[u] for n, u in parts))
+
+
+def parse_point(text):
+    """A message ID, or an age such as ``2h`` (meaning "2 hours ago")."""
+    if text.isdigit():
+        return discord.Object(int(text))
+    return discord.utils.utcnow() - parse_age(text)
+
+
+class TextPattern:
+    """Case-insensitive text to find in a message, with ``*`` for anything in between.
+
+    Not a regex: the pieces between the ``*`` are found in order with
+    ``str.find``, so matching is linear in the message length whatever the
+    pattern (a regex like ``(a+)+$`` could stall the event loop).
+    """
+
+    def __init__(self, text):
+        self.text = text
+        self._pieces = [piece for piece in text.casefold().split("*") if piece]
+
+    def search(self, content):
+        content = content.casefold()
+        pos = 0
+        for piece in self._pieces:
+            pos = content.find(piece, pos)
+            if pos < 0:
+                return False
+            pos += len(piece)
+        return True
+
+
+class PurgeFilter:
+    """Which messages a purge deletes.  An empty filter matches everything."""
+
+    def __init__(self, author_ids=(), pattern=None, bots_only=False, attachments_only=False,
+                 after=None, before=None):
+        self.author_ids = frozenset(author_ids)
+        self.pattern = TextPattern(pattern) if pattern else None
+        self.bots_only = bots_only
+        self.attachments_only = attachments_only
+        self.after = after    # datetime or discord.Object, passed to history()
+        self.before = before
+
+    @property
+    def empty(self):
+        return not (self.author_ids or self.pattern or self.bots_only or self.attachments_only)
+
+    def matches(self, message):
+        if self.author_ids and message.author.id not in self.author_ids:
+            return False
+        if self.bots_only and not message.author.bot:
+            return False
+        if self.attachments_only and not message.attachments:
+            return False
+        if self.pattern is not None and not self.pattern.search(message.content):
+            return False
+        return True
+
+    def describe(self):
+        parts = []
+        if self.author_ids:
+            parts.append("from " + ", ".join(f"<@{uid}>" for uid in sorted(self.author_ids)))
+        if self.bots_only:
+            parts.append("bots only")
+        if self.attachments_only:
+            parts.append("with attachments")
+        if self.pattern is not None:
+            parts.append(f"containing `{self.pattern.text}`")
+        if self.after is not None:
+            parts.append("after " + _point_text(self.after))
+        if self.before is not None:
+            parts.append("before " + _point_text(self.before))
+        return "; ".join(parts) or "all messages"
+
+
+def _point_text(point):
+    if isinstance(point, discord.Object):
+        return f"message {point.id}"
+    return discord.utils.format_dt(point, "R")
+
+
+def parse_filters(tokens, resolve_user):
+    """Build a PurgeFilter from ``key:value`` tokens.
+
+    Accepted: ``user:<member>`` (repeatable), ``match:<text>``, ``bots``,
+    ``attachments``, ``after:<id|age>``, ``before:<id|age>``.
+    `resolve_user(text)` returns a user ID or None.  Raises ValueError with
+    a message fit for the user.
+    """
+    author_ids, options = [], {}
+    for token in tokens:
+        key, _, value = token.partition(":")
+        key = key.lower()
+        if key in ("bots", "attachments") and not value:
+            options[f"{key}_only"] = True
+        elif key == "user" and value:
+            user_id = resolve_user(value)
+            if user_id is None:
+                raise ValueError(f"Could not find member {value}.")
+            author_ids.append(user_id)
+        elif key == "match" and value:
+            options["pattern"] = value
+        elif key in ("after", "before") and value:
+            options[key] = parse_point(value)
+        else:
+            raise ValueError(f"Unknown filter `{token}`.")
+    return make_filter(author_ids=author_ids, **options)
+
+
+def make_filter(author_ids=(), pattern=None, **options):
+    """PurgeFilter with the match text validated; raises ValueError."""
+    if pattern is not None:
+        if len(pattern) > MAX_PATTERN_LENGTH:
+            raise ValueError(f"Patterns are limited to {MAX_PATTERN_LENGTH} characters.")
+        if not pattern.strip("*"):
+            raise ValueError("Give some text to match, e.g. `match:discord.gg` or `match:free*nitro`.")
+    return PurgeFilter(author_ids=author_ids, pattern=pattern, **options)
+
+
+class PurgeJob:
+    def __init__(self, job_id, channel, requested_by, limit, filter, scan_limit=None, anchor=None):
+        self.id = job_id
+        self.channel = channel
+        self.guild_id = channel.guild.id
+        self.requested_by = requested_by
+        self.limit = limit
+        self.filter = filter
+        self.scan_limit = scan_limit
+        # history is read from before this point (the invoking message), so
+        # progress messages posted afterwards are never scanned
+        self.anchor = anchor
+        self.status = "queued"
+        self.error = None
+        self.scanned = self.deleted = self.failed = 0
+        self.started = time.monotonic()
+        self.finished = None
+        self.task = None
+
+    @property
+    def active(self):
+        return self.finished is None
+
+    def cancel(self):
+        if self.task is not None and not self.task.done():
+            self.task.cancel()
+
+    def summary(self):
+        elapsed = (self.finished or time.monotonic()) - self.started
+        icon = {"done": "🧹", "cancelled": "⏹️", "failed": "❌"}.get(self.status, "⏳")
+        text = (
+            f"{icon} Purge #{self.id} in {self.channel.mention} ({self.filter.describe()}): {self.status}. "
+            f"Deleted {self.deleted}/{self.limit}, scanned {self.scanned} in {elapsed:.0f}s"
+        )
+        if self.failed:
+            text += f", {self.failed} could not be deleted"
+        if self.error:
+            text += f" — {self.error}"
+        return text + "."
+
+
+class PurgeEngine:
+    """Runs purge jobs as background tasks under per-guild and global limits."""
+
+    def __init__(self, per_guild=1, max_running=4, single_rate=1.0, bulk_pause=1.0, report_interval=3.0):
+        self.per_guild = per_guild
+        self.single_rate = single_rate
+        self.bulk_pause = bulk_pause
+        self.report_interval = report_interval
+        self._running = asyncio.Semaphore(max_running)
+        self._ids = itertools.count(1)
+        self.jobs = {}  # job id -> active PurgeJob
+
+    def for_guild(self, guild_id):
+        return [job for job in self.jobs.values() if job.guild_id == guild_id]
+
+    def start(self, channel, requested_by, limit, filter, on_progress=None, scan_limit=None, anchor=None):
+        """Queue a purge; returns the PurgeJob.  Raises PurgeBusy."""
+        if len(self.for_guild(channel.guild.id)) >= self.per_guild:
+            raise PurgeBusy(channel.guild.id)
+        job = PurgeJob(next(self._ids), channel, requested_by, limit, filter, scan_limit, anchor)
+        self.jobs[job.id] = job
+        job.task = asyncio.create_task(self._run(job, on_progress), name=f"ron: purge #{job.id}")
+        return job
+
+    async def _report(self, job, on_progress, final=False):
+        if on_progress is None:
+            return
+        try:
+            await on_progress(job, final)
+        except Exception:
+            log.warning("Progress update for purge #%d failed", job.id, exc_info=True)
+
+    async def _run(self, job, on_progress):
+        try:
+            async with self._running:
+                job.status = "running"
+                await self._purge(job, on_progress)
+                job.status = "done"
+        except asyncio.CancelledError:
+            job.status = "cancelled"
+        except discord.Forbidden:
+            job.status, job.error = "failed", "I am missing the Manage Messages or Read Message History permission"
+        except discord.HTTPException as e:
+            job.status, job.error = "failed", str(e)
+            log.warning("Purge #%d failed: %s", job.id, e)
+        finally:
+            job.finished = time.monotonic()
+            self.jobs.pop(job.id, None)
+        log.info("Purge #%d %s: %d deleted, %d scanned", job.id, job.status, job.deleted, job.scanned)
+        await self._report(job, on_progress, final=True)
+
+    async def _purge(self, job, on_progress):
+        cutoff = discord.utils.time_snowflake(discord.utils.utcnow() - BULK_MAX_AGE)
+        single = RateLimiter(self.single_rate, burst=1)
+        batch, pending = [], 0
+        last_report = time.monotonic()
+        before = job.anchor or job.filter.before
+        if job.anchor is not None and job.filter.before is not None:
+            before = min(job.anchor, job.filter.before, key=_as_snowflake)
+        history = job.channel.history(limit=job.scan_limit, before=before, after=job.filter.after,
+                                      oldest_first=False)
+        async for message in history:
+            job.scanned += 1
+            if job.filter.matches(message):
+                pending += 1
+                if message.id > cutoff:
+                    batch.append(message)
+                    if len(batch) == BULK_SIZE:
+                        await self._delete_batch(job, batch)
+                        batch = []
+                else:
+                    # history is newest first: everything from here on is too
+                    # old for a bulk delete
+                    if batch:
+                        await self._delete_batch(job, batch)
+                        batch = []
+                    await single.acquire()
+                    await self._delete_one(job, message)
+                if pending >= job.limit:
+                    break
+            if time.monotonic() - last_report >= self.report_interval:
+                last_report = time.monotonic()
+                await self._report(job, on_progress)
+        if batch:
+            await self._delete_batch(job, batch)
+
+    async def _delete_batch(self, job, batch):
+        if len(batch) == 1:
+            await self._delete_one(job, batch[0])
+            return
+        await job.channel.delete_messages(batch)
+        job.deleted += len(batch)
+        await asyncio.sleep(self.bulk_pause)
+
+    async def _delete_one(self, job, message):
+        try:
+            await message.delete()
+            job.deleted += 1
+        except discord.NotFound:
+            pass  # already gone
+        except discord.HTTPException as e:
+            if isinstance(e, discord.Forbidden):
+                raise
+            job.failed += 1
+
+
+def _as_snowflake(point):
+    if isinstance(point, discord.Object):
+        return point.id
+    return discord.utils.time_snowflake(point)
@@ -0,0 +1,398 @@
+"""Reminder times: natural-language parsing, cron schedules and recurrence.
+
+`parse_when` splits ``"every weekday at 17:00 stand up"`` into a `When` (the
+first due time, plus a repeat rule for recurring reminders) and the rest of
+the text.  It understands:
+
+- a bare number of minutes (``10``), kept for the old ``remind`` syntax;
+- durations: ``in 2h30m``, ``in 90 minutes``, ``2 hours 15 min``;
+- clock times and days: ``at 9am``, ``17:00``, ``tomorrow 9am``,
+  ``friday at noon``, ``2026-12-24 18:00``;
+- repeats: ``every 2h``, ``every day at 8:30``, ``every weekday at 17:00``,
+  ``every mon,wed,fri at 7am``, ``daily at 9``;
+- cron syntax: ``cron 0 9 * * 1-5`` (minute hour day month weekday).
+
+Clock times are in the user's time zone (a pytz name).  A repeat rule is a
+small JSON-serialisable dict, ``{"cron": "0 17 * * 1-5", "tz": "Europe/Berlin"}``
+or ``{"every": 7200}``, plus the phrase it came from (``"text"``), so it can
+be stored on the reminder.  Cron expressions are compiled once and cached,
+and `Cron.next` finds the next match by jumping a field at a time (month,
+then day, hour and minute) rather than testing every minute.
+"""
+import math
+import re
+import time
+from bisect import bisect_right
+from datetime import datetime, timedelta
+from functools import lru_cache
+
+from pytz import UnknownTimeZoneError, timezone
+
+# Recurring reminders may not fire more often than this
+MIN_INTERVAL = 5 * 60
+# How far ahead a reminder may be set
+MAX_DELAY = 366 * 24 * 3600
+
+UNITS = {
+    "w": 604800, "week": 604800, "weeks": 604800, "wk": 604800, "wks": 604800,
+    "d": 86400, "day": 86400, "days": 86400,
+    "h": 3600, "hr": 3600, "hrs": 3600, "hour": 3600, "hours": 3600,
+    "m": 60, "min": 60, "mins": 60, "minute": 60, "minutes": 60,
+    "s": 1, "sec": 1, "secs": 1, "second": 1, "seconds": 1,
+}
+DURATION_RE = re.compile(r"(\d+(?:\.\d+)?)([a-z]+)")
+NUMBER_RE = re.compile(r"\d+(?:\.\d+)?")
+CLOCK_RE = re.compile(r"(\d{1,2})(?::(\d{2}))?(am|pm)?")
+DATE_RE = re.compile(r"(\d{4})-(\d{1,2})-(\d{1,2})")
+
+DAY_NAMES = {
+    "sun": 0, "sunday": 0, "mon": 1, "monday": 1, "tue": 2, "tues": 2, "tuesday": 2,
+    "wed": 3, "wednesday": 3, "thu": 4, "thur": 4, "thurs": 4, "thursday": 4,
+    "fri": 5, "friday": 5, "sat": 6, "saturday": 6,
+}
+DAY_GROUPS = {"day": "*", "days": "*", "weekday": "1-5", "weekdays": "1-5", "weekend": "0,6", "weekends": "0,6"}
+MONTH_NAMES = {name: i for i, name in enumerate(
+    ("jan", "feb", "mar", "apr", "may", "jun", "jul", "aug", "sep", "oct", "nov", "dec"), 1)}
+SEPARATORS = ("to", "that", "-", ":", "—")
+
+
+class WhenError(ValueError):
+    """The text doesn't start with a time we understand, or the time is invalid."""
+
+
+# -- cron ----------------------------------------------------------------------
+
+
+def _field(text, lo, hi, names=None):
+    values = set()
+    for part in text.split(","):
+        part, _, step = part.partition("/")
+        step = int(step) if step else 1
+        if part == "*":
+            start, end = lo, hi
+        else:
+            start, _, end = part.partition("-")
+            start = names.get(start, start) if names else start
+            end = (names.get(end, end) if names else end) if end else start
+            start, end = int(start), int(end)
+        if not (lo <= start <= hi and lo <= end <= hi) or step < 1:
+            raise ValueError(part)
+        values.update(range(start, end + 1, step))
+    return values
+
+
+class Cron:
+    """A compiled five-field cron expression (minute hour day month weekday)."""
+
+    __slots__ = ("minutes", "hours", "days", "months", "weekdays", "any_day", "any_weekday")
+
+    def __init__(self, expression):
+        fields = expression.lower().split()
+        if len(fields) != 5:
+            raise WhenError("Cron expressions have five fields: minute hour day month weekday.")
+        try:
+            self.minutes = tuple(sorted(_field(fields[0], 0, 59)))
+            self.hours = tuple(sorted(_field(fields[1], 0, 23)))
+            self.days = frozenset(_field(fields[2], 1, 31))
+            self.months = frozenset(_field(fields[3], 1, 12, MONTH_NAMES))
+            # 7 is Sunday too
+            self.weekdays = frozenset(day % 7 for day in _field(fields[4], 0, 7, DAY_NAMES))
+        except ValueError as e:
+            raise WhenError(f"Bad cron field `{e}`.") from None
+        self.any_day = fields[2] == "*"
+        self.any_weekday = fields[4] == "*"
+
+    def min_gap(self):
+        """Shortest time between two firings in seconds, ignoring the day fields."""
+        minutes = self.minutes
+        gaps = [b - a for a, b in zip(minutes, minutes[1:])]
+        if any((hour + 1) % 24 in self.hours for hour in self.hours):
+            gaps.append(minutes[0] + 60 - minutes[-1])
+        return min(gaps) * 60 if gaps else 3600
+
+    def _day_matches(self, dt):
+        weekday = (dt.weekday() + 1) % 7
+        if self.any_day or self.any_weekday:
+            return (self.any_day or dt.day in self.days) and (self.any_weekday or weekday in self.weekdays)
+        # like cron: with both restricted, either one matching is enough
+        return dt.day in self.days or weekday in self.weekdays
+
+    def next(self, after):
+        """The first matching minute strictly after naive datetime `after`, or None."""
+        dt = after.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = dt.year + 8  # leap-day-only schedules can take up to 8 years
+        while dt.year <= limit:
+            if dt.month not in self.months:
+                year, month = (dt.year + 1, 1) if dt.month == 12 else (dt.year, dt.month + 1)
+                dt = datetime(year, month, 1)
+            elif not self._day_matches(dt):
+                dt = datetime(dt.year, dt.month, dt.day) + timedelta(days=1)
+            elif dt.hour not in self.hours:
+                i = bisect_right(self.hours, dt.hour)
+                if i == len(self.hours):
+                    dt = datetime(dt.year, dt.month, dt.day) + timedelta(days=1)
+                else:
+                    dt = dt.replace(hour=self.hours[i], minute=0)
+            elif dt.minute not in self.minutes:
+                i = bisect_right(self.minutes, dt.minute)
+                if i == len(self.minutes):
+                    dt = dt.replace(minute=0) + timedelta(hours=1)
+                else:
+                    dt = dt.replace(minute=self.minutes[i])
+            else:
+                return dt
+        return None
+
+
+@lru_cache(maxsize=4096)
+def compile_cron(expression):
+    return Cron(expression)
+
+
+def _zone(name):
+    try:
+        return timezone(name or "UTC")
+    except UnknownTimeZoneError:
+        return timezone("UTC")
+
+
+def _to_timestamp(naive, tz):
+    # a wall time skipped by a DST change lands just after the gap
+    return tz.normalize(tz.localize(naive, is_dst=False)).timestamp()
+
+
+def next_due(repeat, previous, now=None):
+    """When a reminder with rule `repeat` that was due at `previous` fires next.
+
+    Occurrences missed while the bot was offline are skipped, not replayed.
+    Returns None if the rule never matches again.
+    """
+    now = time.time() if now is None else now
+    if "every" in repeat:
+        interval = repeat["every"]
+        return previous + max(1, math.floor((now - previous) / interval) + 1) * interval
+    tz = _zone(repeat.get("tz"))
+    after = datetime.fromtimestamp(max(previous, now), tz).replace(tzinfo=None)
+    nxt = compile_cron(repeat["cron"]).next(after)
+    return None if nxt is None else _to_timestamp(nxt, tz)
+
+
+def describe(repeat):
+    return repeat.get("text") or (f"every {format_duration(repeat['every'])}" if "every" in repeat
+                                  else f"cron {repeat['cron']}")
+
+
+def format_duration(seconds):
+    seconds = int(round(seconds))
+    parts = []
+    for unit, size in (("d", 86400), ("h", 3600), ("m", 60), ("s", 1)):
+        if seconds >= size:
+            parts.append(f"{seconds // size}{unit}")
+            seconds %= size
+    return "".join(parts) or "0s"
+
+
+# -- parsing -------------------------------------------------------------------
+
+
+class When:
+    """A parsed reminder time: the first due timestamp and an optional repeat rule."""
+
+    __slots__ = ("due", "repeat")
+
+    def __init__(self, due, repeat=None):
+        self.due = due
+        self.repeat = repeat
+
+
+def parse_duration(tokens, i):
+    """Read a duration starting at tokens[i]; returns (seconds, next index) or (None, i)."""
+    total, start = 0.0, i
+    while i < len(tokens):
+        token = tokens[i]
+        if token == "and" and total:
+            i += 1
+            continue
+        if token in ("a", "an") and i + 1 < len(tokens) and tokens[i + 1] in UNITS:
+            total += UNITS[tokens[i + 1]]
+            i += 2
+            continue
+        if NUMBER_RE.fullmatch(token) and i + 1 < len(tokens) and tokens[i + 1] in UNITS:
+            total += float(token) * UNITS[tokens[i + 1]]
+            i += 2
+            continue
+        pieces = DURATION_RE.findall(token)
+        if pieces and "".join(n + u for n, u in pieces) == token and all(u in UNITS for _, u in pieces):
+            total += sum(float(n) * UNITS[u] for n, u in pieces)
+            i += 1
+            continue
+        break
+    if i == start or (tokens[i - 1] == "and"):
+        return None, start
+    return total, i
+
+
+def parse_clock(tokens, i):
+    """Read a time of day at tokens[i]; returns ((hour, minute), next index) or (None, i)."""
+    if i >= len(tokens):
+        return None, i
+    token = tokens[i]
+    if token in ("noon", "midday"):
+        return (12, 0), i + 1
+    if token == "midnight":
+        return (0, 0), i + 1
+    match = CLOCK_RE.fullmatch(token)
+    if match is None:
+        return None, i
+    hour, minute, meridiem = int(match[1]), int(match[2] or 0), match[3]
+    end = i + 1
+    if meridiem is None and end < len(tokens) and tokens[end] in ("am", "pm"):
+        meridiem = tokens[end]
+        end += 1
+    if meridiem is None and match[2] is None:
+        return None, i  # a bare number is not a clock time
+    if meridiem:
+        if not 1 <= hour <= 12:
+            return None, i
+        hour = hour % 12 + (12 if meridiem == "pm" else 0)
+    if hour > 23 or minute > 59:
+        return None, i
+    return (hour, minute), end
+
+
+def parse_days(tokens, i):
+    """Read weekday names (``mon,wed and fri``) or a day group at tokens[i].
+
+    Returns (cron weekday field, next index) or (None, i).
+    """
+    if i < len(tokens) and tokens[i] in DAY_GROUPS:
+        return DAY_GROUPS[tokens[i]], i + 1
+    days, start = [], i
+    while i < len(tokens):
+        names = [name for name in tokens[i].split(",") if name]
+        if names and all(name.rstrip("s") in DAY_NAMES or name in DAY_NAMES for name in names):
+            days += [DAY_NAMES.get(name, DAY_NAMES.get(name.rstrip("s"))) for name in names]
+            i += 1
+        elif tokens[i] == "and" and days:
+            i += 1
+        else:
+            break
+    if not days or tokens[i - 1] == "and":
+        return None, start
+    return ",".join(str(day) for day in sorted(set(days))), i
+
+
+def _parse_every(tokens, i, text, tz_name, now):
+    # "every 2h", "every hour", "every day at 9", "every weekday at 17:00", "every mon,fri 7am"
+    if i < len(tokens) and tokens[i] in ("hour", "minute", "week"):
+        seconds, end = UNITS[tokens[i]], i + 1
+    else:
+        seconds, end = parse_duration(tokens, i)
+    if seconds is not None:
+        if seconds < MIN_INTERVAL:
+            raise WhenError(f"Recurring reminders can repeat at most every {format_duration(MIN_INTERVAL)}.")
+        return When(now + seconds, {"every": seconds, "text": text(end)}), end
+    weekdays, end = parse_days(tokens, i)
+    if weekdays is None:
+        raise WhenError("Try `every 2h`, `every day at 9am`, `every weekday at 17:00` or `every monday at 8:30`.")
+    if end < len(tokens) and tokens[end] == "at":
+        end += 1
+    clock, after = parse_clock(tokens, end)
+    if clock is None and end < len(tokens) and tokens[end].isdigit() and tokens[end - 1] == "at":
+        clock, after = (int(tokens[end]), 0), end + 1  # "at 9"
+        if clock[0] > 23:
+            raise WhenError("Hours go from 0 to 23.")
+    if clock is None:
+        raise WhenError("Say what time, e.g. `every day at 9am`.")
+    repeat = {"cron": f"{clock[1]} {clock[0]} * * {weekdays}", "tz": tz_name, "text": text(after)}
+    return When(next_due(repeat, now, now), repeat), after
+
+
+def _parse_at(tokens, i, tz_name, now):
+    # [on] [today|tomorrow|<weekday>|<YYYY-MM-DD>] [at] <time>, in either order
+    tz = _zone(tz_name)
+    local_now = datetime.fromtimestamp(now, tz).replace(tzinfo=None)
+    day, clock, start = None, None, i
+    for _ in range(2):
+        if i < len(tokens) and tokens[i] in ("on", "at"):
+            i += 1
+        if day is None and i < len(tokens):
+            token = tokens[i]
+            date = DATE_RE.fullmatch(token)
+            if token in ("today", "tonight"):
+                day, i = local_now.date(), i + 1
+            elif token == "tomorrow":
+                day, i = local_now.date() + timedelta(days=1), i + 1
+            elif token in DAY_NAMES:
+                ahead = (DAY_NAMES[token] - (local_now.weekday() + 1) % 7) % 7
+                day, i = local_now.date() + timedelta(days=ahead or 7), i + 1
+            elif date:
+                try:
+                    day, i = datetime(int(date[1]), int(date[2]), int(date[3])).date(), i + 1
+                except ValueError:
+                    raise WhenError(f"`{token}` is not a date.") from None
+        if clock is None:
+            clock, i = parse_clock(tokens, i)
+            if clock is None and i > start and tokens[i - 1] == "at" and i < len(tokens) and tokens[i].isdigit():
+                if int(tokens[i]) > 23:
+                    raise WhenError("Hours go from 0 to 23.")
+                clock, i = (int(tokens[i]), 0), i + 1
+    if day is None and clock is None:
+        return None, start
+    hour, minute = clock if clock is not None else (9, 0)
+    if day is None:
+        day = local_now.date()
+        if (hour, minute) <= (local_now.hour, local_now.minute):
+            day += timedelta(days=1)
+    due = _to_timestamp(datetime(day.year, day.month, day.day, hour, minute), tz)
+    if due <= now:
+        raise WhenError("That time has already passed.")
+    return When(due), i
+
+
+def parse_when(text, tz_name="UTC", now=None):
+    """Split `text` into (When, message).  Raises WhenError if no time is found."""
+    now = time.time() if now is None else now
+    words = text.split()
+    tokens = [word.lower() for word in words]
+    if not tokens:
+        raise WhenError("Say when, e.g. `in 2h30m`, `tomorrow 9am` or `every weekday at 17:00`.")
+
+    def phrase(end):
+        return " ".join(words[:end])
+
+    first = tokens[0]
+    if first == "daily":
+        words[:1] = tokens[:1] = ["every", "day"]
+        first = "every"
+    if first == "cron":
+        expression = " ".join(tokens[1:6])
+        if compile_cron(expression).min_gap() < MIN_INTERVAL:
+            raise WhenError(f"Recurring reminders can repeat at most every {format_duration(MIN_INTERVAL)}.")
+        repeat = {"cron": expression, "tz": tz_name, "text": phrase(6)}
+        due = next_due(repeat, now, now)
+        if due is None:
+            raise WhenError("That cron expression never matches.")
+        when, end = When(due, repeat), 6
+    elif first == "every":
+        when, end = _parse_every(tokens, 1, phrase, tz_name, now)
+    elif NUMBER_RE.fullmatch(first) and (len(tokens) == 1 or tokens[1] not in UNITS and tokens[1] not in ("am", "pm")):
+        # the old syntax: a number of minutes
+        when, end = When(now + float(first) * 60), 1
+    else:
+        i = 1 if first == "in" else 0
+        seconds, end = parse_duration(tokens, i)
+        if seconds is not None:
+            when = When(now + seconds)
+        else:
+            when, end = _parse_at(tokens, 0, tz_name, now)
+            if when is None:
+                raise WhenError(
+                    "I couldn't find a time. Try `in 2h30m`, `tomorrow 9am`, `friday at noon`, "
+                    "`every weekday at 17:00` or `cron 0 9 * * 1-5`."
+                )
+    if when.repeat is None and not 0 < when.due - now <= MAX_DELAY:
+        raise WhenError("Reminders can be set from a few seconds up to a year ahead.")
+    if end < len(words) and tokens[end] in SEPARATORS:
+        end += 1
+    return when, " ".join(words[end:])
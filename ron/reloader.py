@@ -0,0 +1,151 @@
+"""Reload command cogs in place.
+
+Every module in the `ron.cogs` package is a discord.py extension.  None of
+them hold state: the stores, schedulers, caches and queues are created once
+by ``ron_bot.py`` and kept on `bot` attributes.  Reloading a cog therefore
+only swaps its command callbacks, and the gateway connection, member cache
+and pending reminders all stay as they are.
+
+`Reloader.reload` compares each module's file mtime with the one recorded
+when it was loaded.  It reloads the extensions that changed, loads new ones
+and unloads deleted ones.  Helper modules that only the cogs import (listed
+in `helpers`) are re-imported first, and then every extension is reloaded so
+the new code is actually used.  If an extension fails to reload, discord.py
+keeps the previous version running.
+"""
+import asyncio
+import importlib
+import importlib.util
+import logging
+import os
+import pkgutil
+import sys
+import time
+
+from discord.ext import commands
+
+log = logging.getLogger("ron.reloader")
+
+
+def _mtime(name):
+    try:
+        spec = importlib.util.find_spec(name)
+        return os.stat(spec.origin).st_mtime_ns
+    except (ImportError, AttributeError, TypeError, OSError):
+        return None
+
+
+class ReloadResult:
+    """What one `Reloader.reload` call did."""
+
+    __slots__ = ("reloaded", "loaded", "unloaded", "failed", "duration")
+
+    def __init__(self):
+        self.reloaded = []
+        self.loaded = []
+        self.unloaded = []
+        self.failed = {}  # module name -> exception
+        self.duration = 0.0
+
+    @property
+    def changed(self):
+        return bool(self.reloaded or self.loaded or self.unloaded)
+
+    def __str__(self):
+        parts = [
+            f"{label} {', '.join(names)}"
+            for label, names in (("reloaded", self.reloaded), ("loaded", self.loaded), ("unloaded", self.unloaded))
+            if names
+        ]
+        parts += [f"FAILED {name}: {error}" for name, error in self.failed.items()]
+        return ("; ".join(parts) or "nothing changed") + f" ({self.duration * 1000:.0f} ms)"
+
+
+class Reloader:
+    """Loads the extensions in `package` and reloads them when they change.
+
+    `after_reload` is an optional coroutine function awaited after a reload
+    that changed anything (e.g. to sync the slash-command tree).
+    """
+
+    def __init__(self, bot, package="ron.cogs", helpers=(), after_reload=None):
+        self.bot = bot
+        self.package = package
+        self.helpers = list(helpers)
+        self.after_reload = after_reload
+        self._mtimes = {}  # module name -> mtime when it was (re)loaded
+        self._lock = asyncio.Lock()
+
+    def extensions(self):
+        """Extension module names currently on disk."""
+        path = importlib.import_module(self.package).__path__
+        return sorted(
+            f"{self.package}.{module.name}" for module in pkgutil.iter_modules(path) if not module.name.startswith("_")
+        )
+
+    def changed(self):
+        """Helpers and loaded extensions whose file changed since they were loaded."""
+        names = [*self.helpers, *self.bot.extensions]
+        return [name for name in names if _mtime(name) != self._mtimes.get(name)]
+
+    async def load(self):
+        """Import the helpers and load every extension (called once from setup_hook)."""
+        for name in self.helpers:
+            importlib.import_module(name)
+            self._mtimes[name] = _mtime(name)
+        for name in self.extensions():
+            await self.bot.load_extension(name)
+            self._mtimes[name] = _mtime(name)
+
+    async def reload(self, everything=False):
+        """Reload what changed on disk (or `everything`); returns a ReloadResult."""
+        async with self._lock:
+            started = time.perf_counter()
+            result = ReloadResult()
+            changed = set(self.changed())
+            helpers = [name for name in self.helpers if everything or name in changed]
+            for name in helpers:
+                try:
+                    importlib.reload(sys.modules[name])
+                except Exception as exc:
+                    log.exception("Reloading %s failed", name)
+                    result.failed[name] = exc
+                else:
+                    self._mtimes[name] = _mtime(name)
+                    result.reloaded.append(name)
+            if result.failed:
+                # the cogs would pick up a half-updated helper; leave them be
+                result.duration = time.perf_counter() - started
+                return result
+
+            on_disk = self.extensions()
+            for name in list(self.bot.extensions):
+                if name.startswith(self.package + ".") and name not in on_disk:
+                    await self._apply(self.bot.unload_extension, name, result.unloaded, result)
+            for name in on_disk:
+                if name not in self.bot.extensions:
+                    await self._apply(self.bot.load_extension, name, result.loaded, result)
+                elif everything or helpers or name in changed:
+                    await self._apply(self.bot.reload_extension, name, result.reloaded, result)
+
+            if result.changed and self.after_reload is not None:
+                try:
+                    await self.after_reload()
+                except Exception:
+                    log.exception("Post-reload hook failed")
+            result.duration = time.perf_counter() - started
+            log.info("Code reload: %s", result)
+            return result
+
+    async def _apply(self, action, name, done, result):
+        try:
+            await action(name)
+        except commands.ExtensionError as exc:
+            log.error("%s(%s) failed; the previous version stays active", action.__name__, name, exc_info=exc)
+            result.failed[name] = exc
+            return
+        if action == self.bot.unload_extension:
+            self._mtimes.pop(name, None)
+        else:
+            self._mtimes[name] = _mtime(name)
+        done.append(name)
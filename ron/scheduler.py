@@ -0,0 +1,369 @@
+"""Single-task reminder scheduler.
+
+Every pending reminder lives in one min-heap keyed by its due time and a
+single dispatcher task sleeps until the earliest one is due, instead of one
+sleeping coroutine per reminder.  Reminders are journaled to disk so they
+survive restarts; anything that came due while the bot was offline fires as
+soon as the dispatcher starts.
+
+Recurring reminders carry a `repeat` rule (see ron/recurrence.py).  After
+one fires it is moved to its next due time instead of being removed, by
+journaling it again under the same ID.  A per-user index of reminder IDs
+keeps listing a user's reminders proportional to how many they have, not to
+how many are stored.
+"""
+import asyncio
+import heapq
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+log = logging.getLogger("ron.scheduler")
+
+
+class Reminder:
+    """A single pending reminder.  Uses __slots__ to keep 100k+ of them cheap.
+
+    `kind` lets other timed jobs share the scheduler: plain reminders have
+    kind None, and anything else (e.g. ``"announcement"``) carries its extra
+    fields in the JSON-serialisable `payload`.  `repeat` is the recurrence
+    rule of a recurring reminder, None for a one-off.
+    """
+
+    __slots__ = ("id", "user_id", "due", "content", "guild_id", "channel_id", "kind", "payload", "repeat")
+
+    def __init__(self, id, user_id, due, content, guild_id=None, channel_id=None, kind=None, payload=None,
+                 repeat=None):
+        self.id = id
+        self.user_id = user_id
+        self.due = due
+        self.content = content
+        self.guild_id = guild_id
+        self.channel_id = channel_id
+        self.kind = kind
+        self.payload = payload
+        self.repeat = repeat
+
+    def to_dict(self):
+        # unset fields are left out to keep the journal lines short
+        return {slot: getattr(self, slot) for slot in self.__slots__ if getattr(self, slot) is not None}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**{slot: data.get(slot) for slot in cls.__slots__})
+
+
+class ReminderScheduler:
+    """Heap-backed scheduler with an append-only journal.
+
+    `deliver` is an ``async def deliver(reminder)`` callback invoked once per
+    reminder when it comes due, and `next_due(repeat, due, now)` returns when
+    a recurring reminder fires next (None to stop).  Inserting, moving and
+    cancelling are O(log n), O(log n) and O(1); cancelled or moved entries
+    are dropped lazily when they reach the top of the heap.
+    """
+
+    def __init__(self, path, deliver, max_concurrency=10, next_due=None, keep_fired=10000):
+        self.path = Path(path)
+        self._deliver = deliver
+        self._next_due = next_due
+        self._max_concurrency = max_concurrency
+        self._heap = []        # (due, id) tuples
+        self._reminders = {}   # id -> Reminder, the source of truth
+        self._by_user = {}     # user ID -> set of reminder IDs
+        self._fired = OrderedDict()  # id -> Reminder, recently delivered one-offs (for snoozing)
+        self._keep_fired = keep_fired
+        self._next_id = 1
+        self._journal = None
+        self._stale_lines = 0  # journal lines that compaction would drop
+        self._compaction = None  # task rewriting the journal in the background
+        self._appended = None    # lines journaled while it runs, for the new file
+        self._task = None
+        self._wakeup = None
+        self._slots = None
+        self._inflight = set()
+
+    def __len__(self):
+        return len(self._reminders)
+
+    def __iter__(self):
+        # a copy, so callers can cancel while iterating
+        return iter(list(self._reminders.values()))
+
+    def get(self, reminder_id):
+        return self._reminders.get(reminder_id)
+
+    def for_user(self, user_id, kind=None):
+        """`user_id`'s pending reminders of `kind`, soonest first."""
+        reminders = (self._reminders[i] for i in self._by_user.get(user_id, ()))
+        return sorted((r for r in reminders if r.kind == kind), key=lambda r: r.due)
+
+    def count_for(self, user_id):
+        return len(self._by_user.get(user_id, ()))
+
+    def recently_fired(self, reminder_id):
+        """A one-off delivered recently enough to be snoozed, or None."""
+        return self._fired.get(reminder_id)
+
+    def _index(self, reminder):
+        self._by_user.setdefault(reminder.user_id, set()).add(reminder.id)
+
+    def _unindex(self, reminder):
+        ids = self._by_user.get(reminder.user_id)
+        if ids is not None:
+            ids.discard(reminder.id)
+            if not ids:
+                del self._by_user[reminder.user_id]
+
+    # -- persistence -------------------------------------------------------
+
+    def load(self):
+        """Replay the journal from disk and compact it.
+
+        IDs are never reused, even those of reminders that have since fired
+        or been cancelled, so a stale ``cancel``/``snooze`` cannot reach a
+        newer reminder.  The next ID is kept in the journal for that.
+        """
+        next_id = 1
+        if self.path.exists():
+            with self.path.open("r", encoding="utf-8") as fh:
+                for lineno, line in enumerate(fh, 1):
+                    try:
+                        rec = json.loads(line)
+                    except ValueError:
+                        # A crash mid-append leaves a torn last line; every
+                        # complete record before it is still valid.
+                        log.warning("Skipping unreadable journal line %d in %s", lineno, self.path)
+                        continue
+                    if rec.get("op") == "add":
+                        reminder = Reminder.from_dict(rec)
+                        self._reminders[reminder.id] = reminder
+                        next_id = max(next_id, reminder.id + 1)
+                    elif rec.get("op") == "done":
+                        self._reminders.pop(rec.get("id"), None)
+                    elif rec.get("op") == "next_id":
+                        next_id = max(next_id, rec.get("id", 1))
+        self._heap = [(r.due, r.id) for r in self._reminders.values()]
+        heapq.heapify(self._heap)
+        for reminder in self._reminders.values():
+            self._index(reminder)
+        self._next_id = max(next_id, max(self._reminders, default=0) + 1)
+        self._compact()
+        log.info("Loaded %d pending reminder(s) from %s", len(self._reminders), self.path)
+
+    def _compact(self):
+        """Rewrite the journal with only the live reminders, atomically (blocking)."""
+        if self._journal is not None:
+            self._journal.close()
+        tmp = self._write_snapshot(self._next_id, list(self._reminders.values()))
+        os.replace(tmp, self.path)
+        self._journal = self.path.open("a", encoding="utf-8")
+        self._stale_lines = 0
+
+    def _write_snapshot(self, next_id, reminders):
+        tmp = self.path.with_suffix(self.path.suffix + ".tmp")
+        with tmp.open("w", encoding="utf-8") as fh:
+            # the high-water mark outlives the "add" lines compaction drops
+            fh.write(self._encode("next_id", {"id": next_id}))
+            for reminder in reminders:
+                fh.write(self._encode("add", reminder.to_dict()))
+            fh.flush()
+            os.fsync(fh.fileno())
+        return tmp
+
+    def _start_compaction(self):
+        """Compact in a thread, keeping the event loop free.
+
+        Appends keep going to the old journal (so a crash loses nothing) and
+        are also kept in memory; once the snapshot is on disk they are added
+        to it and the new file replaces the old one.  A reminder that changes
+        while the snapshot is written is journaled again after it, so the
+        replayed state is right whichever version the snapshot caught.
+        """
+        self._appended = []
+        self._stale_lines = 0
+        self._compaction = asyncio.create_task(self._compact_in_background(), name="ron: journal compaction")
+
+    async def _compact_in_background(self):
+        try:
+            tmp = await asyncio.to_thread(self._write_snapshot, self._next_id, list(self._reminders.values()))
+            with tmp.open("a", encoding="utf-8") as fh:
+                fh.writelines(self._appended)
+            os.replace(tmp, self.path)
+            if self._journal is not None:
+                self._journal.close()
+            self._journal = self.path.open("a", encoding="utf-8")
+        except Exception:
+            log.exception("Journal compaction failed; keeping the current journal")
+        finally:
+            self._appended = None
+            self._compaction = None
+
+    @staticmethod
+    def _encode(op, data):
+        return json.dumps({"op": op, **data}, separators=(",", ":")) + "\n"
+
+    def _append(self, op, data):
+        if self._journal is None:
+            self._compact()
+        line = self._encode(op, data)
+        self._journal.write(line)
+        self._journal.flush()
+        if self._appended is not None:
+            self._appended.append(line)
+        if op == "done":
+            # both the original "add" and this "done" are now dead weight
+            self._add_stale(2)
+
+    def _add_stale(self, lines):
+        self._stale_lines += lines
+        if self._stale_lines > max(1000, len(self._reminders)) and self._compaction is None:
+            try:
+                asyncio.get_running_loop()
+            except RuntimeError:
+                self._compact()  # not running yet (e.g. while loading)
+            else:
+                self._start_compaction()
+
+    # -- public API --------------------------------------------------------
+
+    def schedule(self, user_id, content, delay, guild_id=None, channel_id=None, kind=None, payload=None,
+                 repeat=None):
+        """Schedule `content` for `user_id` in `delay` seconds; returns the Reminder."""
+        reminder = Reminder(
+            self._next_id, user_id, time.time() + delay, content, guild_id, channel_id, kind, payload, repeat,
+        )
+        self._next_id += 1
+        self._reminders[reminder.id] = reminder
+        self._index(reminder)
+        self._append("add", reminder.to_dict())
+        self._push(reminder)
+        return reminder
+
+    def _push(self, reminder):
+        heapq.heappush(self._heap, (reminder.due, reminder.id))
+        # only the dispatcher's sleep deadline can change, and only if this
+        # reminder is now the earliest one
+        if self._wakeup is not None and self._heap[0][1] == reminder.id:
+            self._wakeup.set()
+
+    def reschedule(self, reminder_id, due):
+        """Move a pending reminder to timestamp `due`.  Returns the Reminder, or None if not pending."""
+        reminder = self._reminders.get(reminder_id)
+        if reminder is None:
+            return None
+        return self._move(reminder, due)
+
+    def _move(self, reminder, due, replaces_add=True):
+        reminder.due = due
+        self._append("add", reminder.to_dict())
+        if replaces_add:
+            self._add_stale(1)  # the reminder's previous "add" line
+        # the old heap entry no longer matches the reminder's due time and
+        # is skipped when it is popped
+        self._push(reminder)
+        self._drop_tombstones()
+        return reminder
+
+    def snooze(self, reminder_id, delay):
+        """Push a pending reminder back, or bring back a recently delivered one, `delay` seconds from now."""
+        fired = self._fired.pop(reminder_id, None)
+        if fired is not None and reminder_id not in self._reminders:
+            self._reminders[reminder_id] = fired
+            self._index(fired)
+            # its last "add" line was already counted stale by its "done"
+            return self._move(fired, time.time() + delay, replaces_add=False)
+        return self.reschedule(reminder_id, time.time() + delay)
+
+    def cancel(self, reminder_id):
+        """Cancel a pending reminder.  Returns False if it was not pending."""
+        reminder = self._reminders.pop(reminder_id, None)
+        if reminder is None:
+            return False
+        self._unindex(reminder)
+        self._append("done", {"id": reminder_id})
+        self._drop_tombstones()
+        return True
+
+    def _drop_tombstones(self):
+        # Stale heap entries are skipped when popped; rebuild only if the heap
+        # is mostly tombstones so memory stays proportional to live reminders.
+        if len(self._heap) > 2 * len(self._reminders) + 1024:
+            self._heap = [(r.due, r.id) for r in self._reminders.values()]
+            heapq.heapify(self._heap)
+
+    def start(self):
+        """Start the dispatcher task (no-op if it is already running)."""
+        if self._task is not None and not self._task.done():
+            return
+        self._wakeup = asyncio.Event()
+        self._slots = asyncio.Semaphore(self._max_concurrency)
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._compaction is not None:
+            await self._compaction
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+
+    # -- dispatcher --------------------------------------------------------
+
+    async def _run(self):
+        while True:
+            now = time.time()
+            while self._heap and self._heap[0][0] <= now:
+                due, reminder_id = heapq.heappop(self._heap)
+                reminder = self._reminders.get(reminder_id)
+                if reminder is None or reminder.due != due:
+                    continue  # cancelled or moved
+                await self._slots.acquire()
+                task = asyncio.create_task(self._fire(reminder))
+                self._inflight.add(task)
+                task.add_done_callback(self._inflight.discard)
+            self._wakeup.clear()
+            timeout = self._heap[0][0] - now if self._heap else None
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _fire(self, reminder):
+        due = reminder.due
+        try:
+            await self._deliver(reminder)
+        except Exception:
+            log.exception("Failed to deliver reminder %s", reminder.id)
+        finally:
+            self._slots.release()
+        # Only mark done (or move on) once delivery was attempted, so a crash
+        # mid-send re-fires the reminder on the next start rather than
+        # dropping it.
+        if self._reminders.get(reminder.id) is not reminder or reminder.due != due:
+            return  # cancelled or snoozed while it was being delivered
+        if reminder.repeat is not None and self._next_due is not None:
+            try:
+                next_due = self._next_due(reminder.repeat, due, time.time())
+            except Exception:
+                log.exception("Bad repeat rule on reminder %s", reminder.id)
+                next_due = None
+            if next_due is not None:
+                self.reschedule(reminder.id, next_due)
+                return
+        del self._reminders[reminder.id]
+        self._unindex(reminder)
+        self._append("done", {"id": reminder.id})
+        if reminder.kind is None and reminder.repeat is None:
+            self._fired[reminder.id] = reminder
+            if len(self._fired) > self._keep_fired:
+                self._fired.popitem(last=False)
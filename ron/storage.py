@@ -0,0 +1,241 @@
+"""Crash-safe key/value storage for Ron's persistent state.
+
+Data lives in a single SQLite database in WAL mode, grouped into namespaces
+(``"water"`` for hydration subscriptions, ...).  Values are JSON.  Writes
+never touch the disk on the event loop: `put`/`delete` only record the
+latest value for a key, and a background writer flushes everything that
+changed during the flush interval as one transaction on a dedicated thread.
+Toggling the same key ten times between flushes costs one row write.
+
+When several bot processes share one database (cluster mode), each store is
+given an ``origin`` and every write is also recorded in a change feed; the
+other processes poll the feed and hand changed keys to the callbacks
+registered with `follow`, so their in-memory state converges.
+"""
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+log = logging.getLogger("ron.storage")
+
+_DELETE = object()
+
+
+class Store:
+    """Namespaced JSON key/value store on SQLite with a coalescing writer."""
+
+    def __init__(self, path, flush_interval=2.0, origin=None, poll_interval=2.0, feed_retention=3600):
+        self.path = Path(path)
+        self.flush_interval = flush_interval
+        self.origin = origin
+        self.poll_interval = poll_interval
+        self.feed_retention = feed_retention
+        self._followers = {}  # ns -> callback(key, value or None)
+        self._feed_seq = 0
+        self._poll_task = None
+        self._pending = {}  # (ns, key) -> encoded value or _DELETE
+        self._lock = threading.Lock()  # guards the connection
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ron-store")
+        self._conn = None
+        self._dirty = None
+        self._task = None
+
+    def open(self):
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # WAL + NORMAL never corrupts the database on a crash; at worst the
+        # last un-checkpointed transaction is rolled back.
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        # other cluster processes may hold the write lock briefly
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS kv ("
+            " ns TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL,"
+            " PRIMARY KEY (ns, key)) WITHOUT ROWID"
+        )
+        if self.origin is not None:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS changes ("
+                " seq INTEGER PRIMARY KEY AUTOINCREMENT, ns TEXT NOT NULL, key TEXT NOT NULL,"
+                " origin TEXT NOT NULL, ts REAL NOT NULL)"
+            )
+            # only changes made after this process started are interesting;
+            # everything older is already reflected in what load() returns
+            self._feed_seq = self._conn.execute("SELECT COALESCE(MAX(seq), 0) FROM changes").fetchone()[0]
+        return self
+
+    # -- reads -------------------------------------------------------------
+
+    def load(self, ns):
+        """Return every key in `ns` as a dict.  Meant for startup, not hot paths."""
+        with self._lock:
+            rows = self._conn.execute("SELECT key, value FROM kv WHERE ns = ?", (ns,)).fetchall()
+        return {key: json.loads(value) for key, value in rows}
+
+    def count(self, ns):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM kv WHERE ns = ?", (ns,)).fetchone()[0]
+
+    # -- writes ------------------------------------------------------------
+
+    def put(self, ns, key, value):
+        self._pending[(ns, str(key))] = json.dumps(value, separators=(",", ":"))
+        self._mark_dirty()
+
+    def delete(self, ns, key):
+        self._pending[(ns, str(key))] = _DELETE
+        self._mark_dirty()
+
+    def _mark_dirty(self):
+        if self._dirty is not None:
+            self._dirty.set()
+
+    def _write(self, batch):
+        upserts = [(ns, key, value) for (ns, key), value in batch.items() if value is not _DELETE]
+        deletes = [(ns, key) for (ns, key), value in batch.items() if value is _DELETE]
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                if upserts:
+                    self._conn.executemany(
+                        "INSERT INTO kv (ns, key, value) VALUES (?, ?, ?)"
+                        " ON CONFLICT (ns, key) DO UPDATE SET value = excluded.value",
+                        upserts,
+                    )
+                if deletes:
+                    self._conn.executemany("DELETE FROM kv WHERE ns = ? AND key = ?", deletes)
+                if self.origin is not None:
+                    now = time.time()
+                    self._conn.executemany(
+                        "INSERT INTO changes (ns, key, origin, ts) VALUES (?, ?, ?, ?)",
+                        [(ns, key, self.origin, now) for ns, key in batch],
+                    )
+                    self._conn.execute("DELETE FROM changes WHERE ts < ?", (now - self.feed_retention,))
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    async def flush(self):
+        """Write everything pending in one transaction, off the event loop."""
+        if not self._pending:
+            return
+        batch, self._pending = self._pending, {}
+        loop = asyncio.get_running_loop()
+        try:
+            await loop.run_in_executor(self._executor, self._write, batch)
+        except Exception:
+            # put the batch back underneath anything newer so it is retried
+            log.exception("Failed to flush %d pending write(s); will retry", len(batch))
+            batch.update(self._pending)
+            self._pending = batch
+            raise
+
+    def start(self):
+        """Start the background writer (no-op if already running)."""
+        if self.origin is not None and self._followers and (self._poll_task is None or self._poll_task.done()):
+            self._poll_task = asyncio.create_task(self._poller())
+        if self._task is not None and not self._task.done():
+            return
+        self._dirty = asyncio.Event()
+        if self._pending:
+            self._dirty.set()
+        self._task = asyncio.create_task(self._writer())
+
+    async def _writer(self):
+        while True:
+            await self._dirty.wait()
+            # coalesce everything that changes during the interval
+            await asyncio.sleep(self.flush_interval)
+            self._dirty.clear()
+            try:
+                await self.flush()
+            except Exception:
+                self._dirty.set()
+
+    # -- change feed (cluster mode) ----------------------------------------
+
+    def follow(self, ns, callback):
+        """Call ``callback(key, value)`` when another process changes a key in
+        `ns`; `value` is None for deletions.  Needs an ``origin``."""
+        self._followers[ns] = callback
+
+    def _read_changes(self):
+        with self._lock:
+            return self._conn.execute(
+                "SELECT c.seq, c.ns, c.key, kv.value FROM changes c"
+                " LEFT JOIN kv ON kv.ns = c.ns AND kv.key = c.key"
+                " WHERE c.seq > ? AND c.origin != ? ORDER BY c.seq",
+                (self._feed_seq, self.origin),
+            ).fetchall()
+
+    async def poll_changes(self):
+        """Apply changes made by other processes since the last poll."""
+        loop = asyncio.get_running_loop()
+        rows = await loop.run_in_executor(self._executor, self._read_changes)
+        for seq, ns, key, value in rows:
+            self._feed_seq = seq
+            if (ns, key) in self._pending:
+                continue  # our own newer write wins
+            callback = self._followers.get(ns)
+            if callback is not None:
+                try:
+                    callback(key, None if value is None else json.loads(value))
+                except Exception:
+                    log.exception("Change handler for %r failed on key %s", ns, key)
+        return len(rows)
+
+    async def _poller(self):
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            try:
+                await self.poll_changes()
+            except Exception:
+                log.exception("Failed to poll the change feed")
+
+    def close(self):
+        """Stop the writer and synchronously write anything still pending."""
+        for task in (self._task, self._poll_task):
+            if task is not None and not task.done():
+                task.cancel()
+        self._task = self._poll_task = None
+        if self._conn is None:
+            return
+        if self._pending:
+            batch, self._pending = self._pending, {}
+            self._write(batch)
+        self._executor.shutdown(wait=True)
+        self._conn.close()
+        self._conn = None
+
+    # -- migration ---------------------------------------------------------
+
+    def migrate_json(self, ns, path):
+        """One-time import of a legacy JSON dict file into `ns`.
+
+        The file is renamed to ``<name>.migrated`` afterwards.  An unreadable
+        file is left in place and reported instead of being treated as empty.
+        """
+        path = Path(path)
+        if not path.exists():
+            return 0
+        try:
+            data = json.loads(path.read_text())
+        except FileNotFoundError:
+            return 0  # another cluster worker migrated it first
+        except ValueError:
+            log.error("Could not parse %s; leaving it in place and skipping migration", path)
+            return 0
+        if self.count(ns):
+            log.warning("Namespace %r already populated; not re-importing %s", ns, path)
+            return 0
+        self._write({(ns, str(key)): json.dumps(value, separators=(",", ":")) for key, value in data.items()})
+        os.replace(path, path.with_name(path.name + ".migrated"))
+        log.info("Migrated %d record(s) from %s into %s", len(data), path, self.path)
+        return len(data)
@@ -0,0 +1,188 @@
+"""Daily streaks and incrementally maintained leaderboards.
+
+A user's streak grows by one on each UTC day they are credited with
+activity (`StreakEngine.mark_active`) and is reset by the daily rollover if
+they miss a day.  Leaderboards are `RankedIndex` instances kept sorted as
+streaks change, so a page of the board is O(k) and "your rank" is
+O(log n) instead of sorting every user on each request.
+"""
+import bisect
+import logging
+from datetime import datetime, timedelta, timezone
+
+log = logging.getLogger("ron.streaks")
+
+STREAK_NS = "streaks"
+BULK_REINDEX = 1000
+
+
+def utc_today():
+    return datetime.now(timezone.utc).date()
+
+
+class RankedIndex:
+    """Users ordered by streak (highest first, ties broken by user ID)."""
+
+    def __init__(self):
+        self._keys = []    # sorted (-streak, user_id)
+        self._scores = {}  # user_id -> streak
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __contains__(self, user_id):
+        return user_id in self._scores
+
+    def load(self, scores):
+        """Replace the index with `scores` ({user_id: streak}) in one sort."""
+        self._scores = dict(scores)
+        self._keys = sorted((-streak, user_id) for user_id, streak in self._scores.items())
+
+    def update(self, user_id, streak):
+        old = self._scores.get(user_id)
+        if old == streak:
+            return
+        if old is not None:
+            del self._keys[bisect.bisect_left(self._keys, (-old, user_id))]
+        bisect.insort(self._keys, (-streak, user_id))
+        self._scores[user_id] = streak
+
+    def remove(self, user_id):
+        old = self._scores.pop(user_id, None)
+        if old is not None:
+            del self._keys[bisect.bisect_left(self._keys, (-old, user_id))]
+
+    def page(self, page=1, per_page=10):
+        """Entries on 1-based `page` as (rank, user_id, streak) tuples."""
+        start = max(page - 1, 0) * per_page
+        return [
+            (start + i + 1, user_id, -neg_streak)
+            for i, (neg_streak, user_id) in enumerate(self._keys[start:start + per_page])
+        ]
+
+    def pages(self, per_page=10):
+        return max(1, -(-len(self._keys) // per_page))
+
+    def rank(self, user_id):
+        """1-based rank of `user_id`, or None if they are not on the board."""
+        streak = self._scores.get(user_id)
+        if streak is None:
+            return None
+        return bisect.bisect_left(self._keys, (-streak, user_id)) + 1
+
+
+class StreakEngine:
+    """Tracks per-user streaks, persists them in the store and ranks them."""
+
+    def __init__(self, store):
+        self.store = store
+        self._users = {}  # user_id -> {"streak", "best", "last_day", "guilds"}
+        self.board = RankedIndex()
+        self._guild_boards = {}
+        for key, record in store.load(STREAK_NS).items():
+            self._users[int(key)] = record
+        self._rebuild()
+
+    def _rebuild(self):
+        """Re-sort every board from scratch: one sort instead of an insort per user."""
+        self.board.load({user_id: record["streak"] for user_id, record in self._users.items()})
+        members = {}
+        for user_id, record in self._users.items():
+            for guild_id in record.get("guilds", ()):
+                members.setdefault(guild_id, {})[user_id] = record["streak"]
+        for guild_id, board in self._guild_boards.items():
+            board.load(members.pop(guild_id, {}))
+        for guild_id, scores in members.items():
+            self.guild_board(guild_id).load(scores)
+
+    def _index(self, user_id, record):
+        self.board.update(user_id, record["streak"])
+        for guild_id in record.get("guilds", ()):
+            self.guild_board(guild_id).update(user_id, record["streak"])
+
+    def guild_board(self, guild_id):
+        board = self._guild_boards.get(guild_id)
+        if board is None:
+            board = self._guild_boards[guild_id] = RankedIndex()
+        return board
+
+    def get(self, user_id):
+        return self._users.get(user_id, {"streak": 0, "best": 0, "last_day": None, "guilds": []})
+
+    def _record(self, user_id):
+        record = self._users.get(user_id)
+        if record is None:
+            record = self._users[user_id] = {"streak": 0, "best": 0, "last_day": None, "guilds": []}
+        return record
+
+    def join_guild(self, user_id, guild_id):
+        """Show `user_id` on `guild_id`'s leaderboard from now on."""
+        if guild_id is None:
+            return
+        record = self._record(user_id)
+        if guild_id not in record["guilds"]:
+            record["guilds"].append(guild_id)
+            self.guild_board(guild_id).update(user_id, record["streak"])
+            self.store.put(STREAK_NS, user_id, record)
+
+    def mark_active(self, user_id, today=None):
+        """Credit `user_id` for today; extends the streak at most once a day."""
+        today = today or utc_today()
+        record = self._record(user_id)
+        if record["last_day"] == today.isoformat():
+            return record["streak"]
+        if record["last_day"] == (today - timedelta(days=1)).isoformat():
+            record["streak"] += 1
+        else:
+            record["streak"] = 1
+        record["best"] = max(record["best"], record["streak"])
+        record["last_day"] = today.isoformat()
+        self._index(user_id, record)
+        self.store.put(STREAK_NS, user_id, record)
+        return record["streak"]
+
+    def apply_remote(self, user_id, record):
+        """Adopt a record written by another cluster process (None = deleted)."""
+        old = self._users.pop(user_id, None)
+        if old is not None:
+            self.board.remove(user_id)
+            for guild_id in old.get("guilds", ()):
+                self.guild_board(guild_id).remove(user_id)
+        if record is not None:
+            self._users[user_id] = record
+            self._index(user_id, record)
+
+    def forget(self, user_id):
+        record = self._users.pop(user_id, None)
+        if record is None:
+            return
+        self.board.remove(user_id)
+        for guild_id in record.get("guilds", ()):
+            self.guild_board(guild_id).remove(user_id)
+        self.store.delete(STREAK_NS, user_id)
+
+    def rollover(self, today=None, owns=None):
+        """Reset every streak whose owner was not credited yesterday or today.
+
+        Runs once per day; all resets land in the store's next batch.  In
+        cluster mode `owns(user_id)` limits the pass to this process's users.
+        """
+        today = today or utc_today()
+        keep = {today.isoformat(), (today - timedelta(days=1)).isoformat()}
+        reset = []
+        for user_id, record in self._users.items():
+            if owns is not None and not owns(user_id):
+                continue
+            if record["streak"] and record["last_day"] not in keep:
+                record["streak"] = 0
+                self.store.put(STREAK_NS, user_id, record)
+                reset.append(user_id)
+        # individual moves are O(n) each; past a point re-sorting is cheaper
+        if len(reset) > BULK_REINDEX:
+            self._rebuild()
+        else:
+            for user_id in reset:
+                self._index(user_id, self._users[user_id])
+        reset = len(reset)
+        log.info("Streak rollover for %s: reset %d streak(s)", today, reset)
+        return reset
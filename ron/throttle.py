@@ -0,0 +1,252 @@
+"""Command throttling: per-user, per-channel and per-guild token buckets.
+
+Every prefix and slash command passes through `Throttle.check` before it
+runs.  A limit is ``count/seconds`` for one scope (``user``, ``channel`` or
+``guild``): up to `count` calls at once, refilling at `count` per `seconds`.
+Limits are looked up for the command's name, then for its parent group, then
+``*``, so ``roll`` and ``/roll`` share a bucket.  The defaults below can be
+overridden bot-wide with ``THROTTLE_LIMITS`` and per server with the
+``throttle`` setting, in the same syntax:
+``roll:user=3/10 remind:user=5/60 *:guild=off``.
+
+A bucket is one float: the time at which it will be full again (the
+"theoretical arrival time" of the GCRA formulation of a token bucket).  A
+call is allowed if adding one more token's worth of time keeps it within
+``seconds`` of now.  Refill is implicit in the clock, so it costs nothing.
+A bucket whose time is in the past is full and can be dropped without
+changing any result; `sweep` (every few minutes, and whenever a table grows
+past `max_buckets`) does that, then drops the least recently used buckets
+if a table is still too big.
+
+Rejected calls are answered with at most one "slow down" per user and
+command until the bucket has room again; the rest are dropped silently.
+"""
+import asyncio
+import logging
+import time
+
+from discord.ext import commands
+
+log = logging.getLogger("ron.throttle")
+
+SCOPES = ("user", "channel", "guild")
+
+# (count, seconds) per scope; None turns a scope off for that command
+DEFAULT_LIMITS = {
+    "*": {"user": (8, 10), "channel": (20, 10), "guild": (60, 10)},
+    "roll": {"user": (5, 10)},
+    "remind": {"user": (5, 60)},
+    "waterreminder": {"user": (3, 60)},
+    "watersettings": {"user": (5, 60)},
+    "announce": {"user": (3, 60)},
+    "purge": {"user": (3, 60)},
+    "packs": {"user": (3, 60)},
+    "profile": {"user": (1, 60)},
+}
+
+
+def parse_limits(text):
+    """``"roll:user=3/10 *:guild=off"`` -> ``{"roll": {"user": (3, 10)}, "*": {"guild": None}}``.
+
+    Items are separated by spaces or commas.  Raises ValueError.
+    """
+    limits = {}
+    for item in text.replace(",", " ").split():
+        target, _, value = item.partition("=")
+        command, _, scope = target.rpartition(":")
+        command = command.strip().lower().replace("_", " ")
+        if not command or scope not in SCOPES or not value:
+            raise ValueError(f"`{item}`: use `<command>:<user|channel|guild>=<count>/<seconds>` or `=off`.")
+        if value.lower() == "off":
+            limits.setdefault(command, {})[scope] = None
+            continue
+        count, _, seconds = value.partition("/")
+        try:
+            count, seconds = int(count), float(seconds)
+        except ValueError:
+            raise ValueError(f"`{item}`: use count/seconds, e.g. `5/10`.") from None
+        if not (1 <= count <= 1000 and 0 < seconds <= 86400):
+            raise ValueError(f"`{item}`: count must be 1-1000 and seconds at most 86400.")
+        limits.setdefault(command, {})[scope] = (count, seconds)
+    return limits
+
+
+def format_limits(limits):
+    """Inverse of `parse_limits`."""
+    items = []
+    for command, scopes in limits.items():
+        for scope, limit in scopes.items():
+            value = "off" if limit is None else f"{limit[0]}/{limit[1]:g}"
+            items.append(f"{command.replace(' ', '_')}:{scope}={value}")
+    return " ".join(items)
+
+
+def merge_limits(*layers):
+    """Later layers override earlier ones, scope by scope."""
+    merged = {}
+    for layer in layers:
+        for command, scopes in layer.items():
+            merged.setdefault(command, {}).update(scopes)
+    return merged
+
+
+class Throttled(commands.CheckFailure):
+    """A command call went over a limit."""
+
+    def __init__(self, command, scope, retry_after, warn):
+        super().__init__(f"{command} throttled per {scope}; retry in {retry_after:.1f}s")
+        self.command = command
+        self.scope = scope
+        self.retry_after = retry_after
+        self.warn = warn  # whether this rejection should be answered
+
+    def message(self):
+        where = {"user": "", "channel": " in this channel", "guild": " in this server"}[self.scope]
+        return f"⏳ Slow down! `{self.command}` is being used too often{where}; try again in {self.retry_after:.0f}s."
+
+
+class BucketTable:
+    """Token buckets keyed by ID, one float each."""
+
+    __slots__ = ("_full_at", "max_buckets")
+
+    def __init__(self, max_buckets):
+        self._full_at = {}  # key -> time the bucket is full again
+        self.max_buckets = max_buckets
+
+    def __len__(self):
+        return len(self._full_at)
+
+    def take(self, key, count, seconds, now):
+        """Take one token; returns 0.0, or the seconds until one is available."""
+        interval = seconds / count
+        full_at = max(self._full_at.pop(key, now), now) + interval
+        if full_at - now > seconds:
+            self._full_at[key] = full_at - interval
+            return full_at - now - seconds
+        self._full_at[key] = full_at  # re-inserted, so dict order is least recently used first
+        if len(self._full_at) > self.max_buckets:
+            self.sweep(now)
+        return 0.0
+
+    def sweep(self, now):
+        """Drop full buckets, then the least recently used if still over `max_buckets`."""
+        self._full_at = {key: full_at for key, full_at in self._full_at.items() if full_at > now}
+        excess = len(self._full_at) - self.max_buckets // 2
+        if excess > 0:
+            for key in list(self._full_at)[:excess]:
+                del self._full_at[key]
+
+
+class Throttle:
+    """Checks command calls against the limits in force for their guild.
+
+    `config` is the `GuildConfig` holding each guild's ``throttle`` setting;
+    `limits` the bot-wide limits (defaults plus ``THROTTLE_LIMITS``).
+    `exempt(user_id)` returns True for users who are never throttled.
+    """
+
+    def __init__(self, config, limits=DEFAULT_LIMITS, exempt=None, max_buckets=100_000):
+        self.config = config
+        self.limits = limits
+        self.exempt = exempt
+        self.max_buckets = max_buckets
+        self._tables = {}      # (command, scope) -> BucketTable
+        self._warned = {}      # (command, user ID) -> time until which rejections stay silent
+        self._resolved = {}    # (guild ID, command) -> {scope: (count, seconds)}
+        self._version = None
+        self.rejected = 0
+
+    def __len__(self):
+        return sum(len(table) for table in self._tables.values())
+
+    def set_limits(self, limits):
+        """Replace the bot-wide limits."""
+        self.limits = limits
+        self._resolved.clear()
+
+    def limits_for(self, guild_id, command):
+        """{scope: (count, seconds)} for `command` in `guild_id`, cached until the config changes."""
+        if self._version != self.config.version:
+            self._resolved.clear()
+            self._version = self.config.version
+        key = (guild_id, command)
+        found = self._resolved.get(key)
+        if found is None:
+            limits = self.limits
+            override = self.config.get(guild_id, "throttle") if guild_id is not None else None
+            if override:
+                try:
+                    limits = merge_limits(limits, parse_limits(override))
+                except ValueError:
+                    log.warning("Ignoring invalid throttle setting for guild %s", guild_id)
+            root = command.split(" ", 1)[0]
+            found = {}
+            for name in ("*", root, command):
+                found.update(limits.get(name, {}))
+            found = self._resolved[key] = {scope: limit for scope, limit in found.items() if limit}
+        return found
+
+    def check(self, command, user_id, channel_id=None, guild_id=None, now=None):
+        """Count one call of `command`; raises Throttled if a limit is exceeded.
+
+        Scopes are checked user, then channel, then guild.  A rejected call
+        takes no token from any scope, so spam from one user does not eat
+        the channel's or guild's allowance.
+        """
+        if self.exempt is not None and self.exempt(user_id):
+            return
+        now = time.monotonic() if now is None else now
+        limits = self.limits_for(guild_id, command)
+        ids = {"user": user_id, "channel": channel_id, "guild": guild_id}
+        for scope in SCOPES:
+            limit = limits.get(scope)
+            if limit is None or ids[scope] is None:
+                continue
+            table = self._tables.get((command, scope))
+            if table is None:
+                table = self._tables[(command, scope)] = BucketTable(self.max_buckets)
+            retry_after = table.take(ids[scope], limit[0], limit[1], now)
+            if retry_after:
+                self._refund(command, ids, limits, scope, now)
+                self.rejected += 1
+                raise Throttled(command, scope, retry_after, self._should_warn(command, user_id, retry_after, now))
+
+    def _refund(self, command, ids, limits, failed_scope, now):
+        # give back the tokens already taken from the scopes checked before
+        for scope in SCOPES:
+            if scope == failed_scope:
+                return
+            limit = limits.get(scope)
+            if limit is not None and ids[scope] is not None:
+                table = self._tables[(command, scope)]
+                full_at = table._full_at.get(ids[scope])
+                if full_at is not None:
+                    table._full_at[ids[scope]] = full_at - limit[1] / limit[0]
+
+    def _should_warn(self, command, user_id, retry_after, now):
+        key = (command, user_id)
+        if self._warned.get(key, 0) > now:
+            return False
+        if len(self._warned) >= self.max_buckets:
+            self._warned = {k: until for k, until in self._warned.items() if until > now}
+        self._warned[key] = now + retry_after
+        return True
+
+    def sweep(self, now=None):
+        """Drop idle buckets and expired warnings; returns how many buckets are left."""
+        now = time.monotonic() if now is None else now
+        for table in self._tables.values():
+            table.sweep(now)
+        self._tables = {key: table for key, table in self._tables.items() if len(table)}
+        self._warned = {key: until for key, until in self._warned.items() if until > now}
+        return len(self)
+
+    async def run(self, interval=300):
+        """Sweep every `interval` seconds (run as a background task)."""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                self.sweep()
+            except Exception:
+                log.exception("Throttle sweep failed")
@@ -0,0 +1,61 @@
+"""Skip redundant slash-command syncs.
+
+`CommandTree.sync` is a rate-limited global HTTP call, and `on_ready` fires
+again after every reconnect.  `TreeSyncer` hashes the serialized command
+tree per scope (global, or one dev guild) and only syncs a scope when its
+fingerprint differs from the one recorded after the last successful sync.
+"""
+import hashlib
+import json
+import logging
+
+log = logging.getLogger("ron.treesync")
+
+META_NS = "meta"
+
+
+def tree_fingerprint(tree, guild=None):
+    """Stable SHA-256 of the commands registered for `guild` (None = global)."""
+    payload = sorted(
+        (command.to_dict(tree) for command in tree.get_commands(guild=guild)),
+        key=lambda data: (data.get("type", 1), data["name"]),
+    )
+    blob = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(blob.encode()).hexdigest()
+
+
+class TreeSyncer:
+    """Syncs a command tree only when its definitions changed."""
+
+    def __init__(self, tree, store, dev_guild=None):
+        self.tree = tree
+        self.store = store
+        self.dev_guild = dev_guild
+        self._fingerprints = store.load(META_NS)
+
+    def _scopes(self):
+        scopes = [None]
+        if self.dev_guild is not None:
+            # mirror the global commands into the dev guild so changes show
+            # up there immediately instead of after global propagation
+            self.tree.copy_global_to(guild=self.dev_guild)
+            scopes.append(self.dev_guild)
+        return scopes
+
+    async def sync(self, force=False):
+        """Sync every changed scope; returns {scope label: commands synced or None if skipped}."""
+        results = {}
+        for guild in self._scopes():
+            label = "global" if guild is None else f"guild {guild.id}"
+            key = "tree_fingerprint" if guild is None else f"tree_fingerprint:{guild.id}"
+            fingerprint = tree_fingerprint(self.tree, guild)
+            if not force and self._fingerprints.get(key) == fingerprint:
+                log.info("Slash commands unchanged (%s); skipping sync", label)
+                results[label] = None
+                continue
+            synced = await self.tree.sync(guild=guild)
+            self._fingerprints[key] = fingerprint
+            self.store.put(META_NS, key, fingerprint)
+            log.info("Synced %d slash command(s) (%s)", len(synced), label)
+            results[label] = len(synced)
+        return results
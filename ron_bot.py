@@ -1,7 +1,7 @@
 import os
-import json
-import random
+import signal
 import asyncio
+import time
 from pathlib import Path
 
 # dotenv is optional for users running from the venv; if the import fails we
@@ -18,23 +18,80 @@ except ImportError as exc:
         "or use the provided scripts (`./scripts/run_ron.sh`)."
     ) from exc
 
+# Load .env before anything reads the environment (the data directory and
+# shard settings below included).  Variables already set, e.g. by the
+# cluster launcher, take precedence.
+load_dotenv(dotenv_path=Path(__file__).parent / ".env")
+
+# Startup phase timing starts before the heavy imports
+STARTUP_BEGAN = time.perf_counter()
+
 import discord
 from discord.ext import commands
 from discord import app_commands
-from datetime import datetime, timedelta
-from pytz import timezone, all_timezones
+from datetime import datetime
 import logging
 import psutil
 
+from ron import checks, logs
+from ron.analytics import CHECKINS_NS, GUILD_CHECKINS_NS, EngagementAggregator
+from ron.automod import Automod, AutomodActions
+from ron.cluster import Forwarder, Ownership
+from ron.config import GuildConfig
+from ron.content import ContentLibrary
+from ron.fanout import DMFanout
+from ron.hydration import SubscriberRegistry
+from ron.interactions import Deferrer
+from ron.members import MemberIndex, cache_footprint
+from ron.metrics import Registry, monitor_loop_lag, serve as serve_metrics
+from ron.outbound import OutboundQueue
+from ron.profiling import StallWatchdog, label_task
+from ron.purge import PurgeEngine
+from ron.recurrence import describe as describe_repeat, next_due
+from ron.reloader import Reloader
+from ron.scheduler import Reminder, ReminderScheduler
+from ron.storage import Store
+from ron.streaks import StreakEngine
+from ron.throttle import DEFAULT_LIMITS, Throttle, Throttled, merge_limits, parse_limits
+from ron.treesync import TreeSyncer
+
 # Define ROOT first
 ROOT = Path(__file__).parent
-CONFIG_PATH = ROOT / "configs.json"
-REMINDER_STORAGE_PATH = ROOT / "reminders.json"
+# Runtime data lives next to the bot unless RON_DATA_DIR points elsewhere
+# (the benchmark harness uses a scratch directory)
+DATA_DIR = Path(os.getenv("RON_DATA_DIR", ROOT))
+CONFIG_PATH = DATA_DIR / "configs.json"
+REMINDER_STORAGE_PATH = DATA_DIR / "reminders.json"  # legacy, migrated into STORE_PATH
+STORE_PATH = DATA_DIR / "ron.db"
+# Packed copy of the water subscriptions, written at shutdown so the next
+# start can skip decoding every record (see SubscriberRegistry)
+WATER_SNAPSHOT_PATH = DATA_DIR / "water.snapshot"
+# Custom and per-server content packs (see ron/content.py)
+PACKS_DIR = DATA_DIR / "packs"
+
+# Sharding / cluster mode.  SHARD_COUNT=auto runs one AutoShardedBot with
+# Discord's recommended shard count; `python -m ron.cluster` sets all three
+# variables for each worker process it launches.
+SHARD_COUNT = os.getenv("SHARD_COUNT", "").strip()
+SHARD_IDS = [int(i) for i in os.getenv("SHARD_IDS", "").split(",") if i.strip()] or None
+CLUSTER_ID = os.getenv("RON_CLUSTER_ID")
+ownership = Ownership(int(SHARD_COUNT) if SHARD_COUNT.isdigit() else None, SHARD_IDS)
+
+# Each cluster worker journals the reminders it scheduled to its own file.
+SCHEDULED_REMINDERS_PATH = DATA_DIR / (
+    f"scheduled_reminders.{CLUSTER_ID}.jsonl" if CLUSTER_ID else "scheduled_reminders.jsonl"
+)
+if CLUSTER_ID:
+    WATER_SNAPSHOT_PATH = DATA_DIR / f"water.{CLUSTER_ID}.snapshot"
 
-# Load .env BEFORE any validation
-load_dotenv(dotenv_path=ROOT / ".env")
 TOKEN = os.getenv("DISCORD_TOKEN")
 
+# JSON-lines logging through a queue and a writer thread (see ron/logs.py);
+# LOG_LEVEL, LOG_LEVELS, LOG_FORMAT and LOG_FILE tune it.
+logs.setup()
+log = logging.getLogger("ron.bot")
+command_log = logging.getLogger("ron.commands")
+
 # Now validate .env variables
 required_env_vars = ["DISCORD_TOKEN"]
 missing_vars = [var for var in required_env_vars if not os.getenv(var)]
@@ -45,96 +102,97 @@ if missing_vars:
 if not TOKEN:
     raise EnvironmentError("DISCORD_TOKEN is not set in the .env file.")
 
-# Initialize reminders from persistent storage
-def load_reminders():
-    if REMINDER_STORAGE_PATH.exists():
-        try:
-            return json.loads(REMINDER_STORAGE_PATH.read_text())
-        except Exception:
-            return {}
-    return {}
-
-def save_reminders(reminders: dict):
-    REMINDER_STORAGE_PATH.write_text(json.dumps(reminders, indent=2))
+def water_snapshot_is_current():
+    """True if the snapshot was written after the database last changed."""
+    try:
+        taken = WATER_SNAPSHOT_PATH.stat().st_mtime_ns
+    except OSError:
+        return False
+    for path in (STORE_PATH, STORE_PATH.with_name(STORE_PATH.name + "-wal")):
+        if path.exists() and path.stat().st_mtime_ns > taken:
+            return False
+    return True
+
+
+# Initialize reminders from persistent storage.  Water subscriptions live in
+# the "water" namespace of the SQLite store; the old reminders.json is
+# imported once on first start.
+# In cluster mode the store also keeps a change feed so every worker sees
+# subscriptions made through the others.
+# (checked before opening the store, which touches its files)
+_water_snapshot_current = water_snapshot_is_current()
+store = Store(STORE_PATH, origin=CLUSTER_ID).open()
+store.migrate_json("water", REMINDER_STORAGE_PATH)
+
+# Every subscriber, packed by user ID with their delivery slot, time zone
+# and quiet hours (ron/hydration.py).  Only users this process owns are
+# handed out for delivery, so each reminder is sent by exactly one worker.
+# Records from before slots existed get one assigned here.
+reminders = SubscriberRegistry(owns=None if ownership.everything else ownership.owns)
+if _water_snapshot_current and reminders.restore(WATER_SNAPSHOT_PATH, expected=store.count("water")):
+    log.info("Loaded %d water subscribers from %s", len(reminders), WATER_SNAPSHOT_PATH.name)
+else:
+    _records = store.load("water")
+    for _user_id in reminders.load(_records):
+        store.put("water", _user_id, _records[_user_id])
+    del _records
+
+
+def apply_remote_water_change(user_id, data):
+    """Mirror a subscription change made by another cluster worker."""
+    if data is None:
+        reminders.discard(int(user_id))
+    elif "slot" in data:
+        reminders.set(int(user_id), data)
+
+
+store.follow("water", apply_remote_water_change)
+
+# Time zones set with `reminders timezone`; water subscribers' own setting
+# is the fallback (see the reminders cog)
+user_timezones = store.load("user_tz")
+
+
+def apply_remote_timezone_change(user_id, tz):
+    if tz is None:
+        user_timezones.pop(user_id, None)
+    else:
+        user_timezones[user_id] = tz
 
-reminders = load_reminders()
 
-ALLOWED_DM_USER_ID = 821102915325526046
+store.follow("user_tz", apply_remote_timezone_change)
 
 # Define DEFAULT_PREFIX (already defined above, but ensure it exists)
 if 'DEFAULT_PREFIX' not in locals():
     DEFAULT_PREFIX = os.getenv("PREFIX", "!")
 
-# Initialize WATER_REMINDER_USERS as a set
-WATER_REMINDER_USERS = set()
-
-# Define WATER_REMINDER_PHRASES
-WATER_REMINDER_PHRASES = [
-    "💧 Time to drink some water! Stay hydrated.",
-    "🚰 Hydration check: have a glass of water now!",
-    "💦 Quick reminder: water helps your focus and mood.",
-    "🧊 Take a sip of water and stretch your shoulders.",
-    "🥤 Hydrate! Small sips often beat one large drink.",
-    "💧 Feeling thirsty? Drink up and breathe deeply.",
-    "🍋 Try water with a slice of lemon for a refreshing boost.",
-    "💧 Keep a water bottle nearby — sip frequently!",
-    "🔔 Hydration reminder: 1 glass now, another in an hour!",
-    "💚 Water helps your body and mind — take a drink.",
-    "💧 Quick goal: drink 250ml of water in the next 10 minutes.",
-    "⚡ Boost your energy: stand up and drink some water.",
-]
-
-# Define QUOTES
-QUOTES = [
-    "The only way to do great work is to love what you do. - Steve Jobs",
-    "Your time is limited, don't waste it living someone else's life. - Steve Jobs",
-    "The future belongs to those who believe in the beauty of their dreams. - Eleanor Roosevelt",
-    "It is during our darkest moments that we must focus to see the light. - Aristotle",
-    "The only impossible journey is the one you never begin. - Tony Robbins",
-    "Success is not final, failure is not fatal. - Winston Churchill",
-    "Believe you can and you're halfway there. - Theodore Roosevelt",
-    "Do what you can, with what you have, where you are. - Theodore Roosevelt",
-    "Excellence is not a skill, it's an attitude. - Ralph Marston",
-    "The best time to plant a tree was 20 years ago. The second best time is now. - Chinese Proverb",
-    "Don't watch the clock; do what it does. Keep going. - Sam Levenson",
-    "Your limitation—it's only your imagination. Push beyond limitations.",
-    "Great things never come from comfort zones. - Unknown",
-    "Dream it. Wish it. Do it. - Unknown",
-    "Success doesn't just find you. You have to go out and get it. - Unknown",
-    "The harder you work for something, the greater you'll feel when you achieve it. - Unknown",
-    "Dream bigger. Do bigger. - Unknown",
-    "Don't stop when you're tired. Stop when you're done. - Unknown",
-    "Wake up with determination. Go to bed with satisfaction. - Unknown",
-    "Do something today that your future self will thank you for. - Sean Patrick Flanery",
-    "Little things? There are no little things. - Unknown",
-    "It's not whether you get knocked down, it's whether you get up. - Vince Lombardi",
-]
-
-# Define AFFIRMATIONS
-AFFIRMATIONS = [
-    "You are capable of amazing things. 💪",
-    "Your potential is limitless — keep taking steps. ✨",
-    "You are stronger and kinder than you give yourself credit for. 🌟",
-    "Small progress is still progress. Celebrate it. 🎉",
-    "You deserve rest, joy, and success. 🎯",
-    "Your presence matters to others, even when you doubt it. 💖",
-    "Challenges grow you; you're doing the work. 🌱",
-    "Breathe, reset, continue — you have this. 🧘",
-    "You are resilient, resourceful, and learning daily. 🏆",
-    "Today is a fresh start — be curious and kind. ☀️",
-    "Your actions create ripples — keep going. 🤝",
-    "Dream, plan, act — one step at a time. 💭",
-    "Small acts of self-care compound into big change. 🌿",
-    "You belong and you are enough, exactly as you are. 💚",
-]
-
 intents = discord.Intents.default()
 intents.message_content = True
 intents.members = True
 
+# MEMBER_CACHE=lean skips chunking every guild at startup and keeps no
+# members in discord.py's cache; the few commands that need member data
+# fetch it on demand (see ron.members).  The default, "full", caches every
+# member of every guild.
+LEAN_MEMBERS = os.getenv("MEMBER_CACHE", "full").strip().lower() == "lean"
+member_cache_options = {}
+if LEAN_MEMBERS:
+    member_cache_options = dict(chunk_guilds_at_startup=False, member_cache_flags=discord.MemberCacheFlags.none())
+
+
+# Per-guild settings from configs.json; the prefix lookup below is the hot
+# path and costs one dict access per message.
+guild_config = GuildConfig(CONFIG_PATH, default_prefix=DEFAULT_PREFIX)
+guild_config.load()
+
+# Quotes, affirmations, tips, workouts and water reminder phrases; built-in
+# packs plus any in PACKS_DIR, rescanned in the background.
+content = ContentLibrary(PACKS_DIR)
+content.scan()
+
 
 async def determine_prefix(bot, message):
-    prefix = os.getenv("PREFIX", "!")
+    prefix = guild_config.prefix(message.guild.id) if message.guild else DEFAULT_PREFIX
     return commands.when_mentioned_or(prefix)(bot, message)
 
 
@@ -142,597 +200,555 @@ async def determine_prefix(bot, message):
 # Weather functionality removed in v2.0.0 — no fetch_weather implementation
 
 
-bot = commands.Bot(command_prefix=determine_prefix, intents=intents, description="Ron - The friendly wellness and moderation assistant")
-bot.water_reminder_task = None  # Will be set in on_ready()
+class StartupTimer:
+    """Records how long each startup phase took, for the on_ready summary."""
 
-# Disable the built-in help command so we can use our custom one
-bot.remove_command("help")
+    def __init__(self, began):
+        self.phases = []
+        self._last = began
 
+    def mark(self, phase):
+        now = time.perf_counter()
+        self.phases.append((phase, now - self._last))
+        self._last = now
 
-@bot.event
-async def on_ready():
-    if bot.user:
-        print(f"Ron is ready. Logged in as: {bot.user} (ID: {bot.user.id})")
-    else:
-        print("Ron is ready, but bot.user is not yet available.")
-    try:
-        await bot.tree.sync()
-        print("Synced slash commands (bot.tree)")
-    except Exception as e:
-        print(f"Failed to sync slash commands: {e}")
-    # Start the water reminder background task
-    if bot.water_reminder_task is not None and not bot.water_reminder_task.done():
-        bot.water_reminder_task.cancel()
-    bot.water_reminder_task = asyncio.create_task(water_reminder_loop(bot))
-
+    def summary(self):
+        total = sum(seconds for _, seconds in self.phases)
+        parts = ", ".join(f"{phase} {seconds:.2f}s" for phase, seconds in self.phases)
+        return f"{parts} (total {total:.2f}s)"
 
 
-async def water_reminder_loop(bot):
-    """Background task to send water reminders every hour."""
-    await bot.wait_until_ready()
-    while not bot.is_closed():
-        try:
-            await asyncio.sleep(3600)  # Every hour
-            for user_id in WATER_REMINDER_USERS.copy():
+class RonCommandTree(app_commands.CommandTree):
+    async def interaction_check(self, interaction):
+        # runs in the task that invokes the command, so stall reports and
+        # profiles can tell which command was running
+        if interaction.command is not None:
+            label_task(f"/{interaction.command.qualified_name}")
+            logs.bind(command=interaction.command.qualified_name, guild=interaction.guild_id, user=interaction.user.id)
+            if interaction.type is discord.InteractionType.application_command:
                 try:
-                    user = await bot.fetch_user(user_id)
-                    await user.send(random.choice(WATER_REMINDER_PHRASES))
-                except Exception:
-                    WATER_REMINDER_USERS.discard(user_id)
-        except asyncio.CancelledError:
-            break
-        except Exception:
-            pass
-
-
-def is_mod(ctx):
-    return ctx.author.guild_permissions.administrator or ctx.author.guild.permissions.manage_guild
+                    bot.throttle.check(interaction.command.qualified_name, interaction.user.id,
+                                       interaction.channel_id, interaction.guild_id)
+                except Throttled as e:
+                    throttled.inc(e.command, e.scope)
+                    # an interaction has to be answered either way; the reply
+                    # is ephemeral and costs nothing from the channel's limits
+                    await interaction.response.send_message(e.message(), ephemeral=True)
+                    return False
+                # from here on a slow handler is deferred for it (ron/interactions.py)
+                bot.deferrer.attach(interaction)
+        return True
+
+
+if SHARD_COUNT:
+    bot = commands.AutoShardedBot(
+        command_prefix=determine_prefix, intents=intents, tree_cls=RonCommandTree,
+        description="Ron - The friendly wellness and moderation assistant",
+        shard_count=ownership.shard_count, shard_ids=SHARD_IDS, **member_cache_options,
+    )
+else:
+    bot = commands.Bot(command_prefix=determine_prefix, intents=intents, tree_cls=RonCommandTree, description="Ron - The friendly wellness and moderation assistant", **member_cache_options)
+bot.water_reminder_task = None  # Will be set in on_ready()
+bot.streak_rollover_task = None  # Will be set in on_ready()
+bot.config_watch_task = None  # Will be set in on_ready()
+bot.content_watch_task = None  # Will be set in on_ready()
+bot.guild_config = guild_config
+bot.content = content
+# Shared state for the cogs (ron/cogs), which keep none of their own so
+# they can be reloaded without losing anything
+bot.store = store
+bot.ownership = ownership
+bot.water_subscriptions = reminders
+bot.user_timezones = user_timezones
 
+# Disable the built-in help command so we can use our custom one
+bot.remove_command("help")
 
-def is_mod_interaction(interaction: discord.Interaction):
-    if not interaction.guild:
-        return False
-    user = interaction.user
-    return user.guild.permissions.administrator or user.guild.permissions.manage_guild
+# Instrumentation.  Everything registered here is served in Prometheus text
+# format on METRICS_PORT (one port per cluster worker) and summarised by the
+# health command, so both always show the same numbers.
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9187")) + (int(CLUSTER_ID) if CLUSTER_ID else 0)
+bot.metrics = Registry()
+bot.metrics_server = None
+bot.loop_lag_task = None
+_process = bot.process = psutil.Process()
+command_latency = bot.metrics.histogram(
+    "ron_command_latency_seconds", "Time from invocation to command completion", ("command", "kind"))
+command_errors = bot.metrics.counter("ron_command_errors_total", "Commands that raised an error", ("command", "kind"))
+dm_sent = bot.metrics.counter("ron_dms_sent_total", "Outbound DMs by source and result", ("source", "result"))
+# Errors that are handled by carrying on are counted here and logged as a
+# rate-limited sample instead of being silently dropped
+bot.errors = logs.ErrorTally(bot.metrics.counter(
+    "ron_ignored_errors_total", "Exceptions caught and ignored, by place and type", ("where", "error")))
+loop_lag = bot.metrics.gauge("ron_event_loop_lag_seconds", "How late the event loop woke from a 0.5s sleep")
+bot.metrics.gauge("ron_gateway_latency_seconds", "Gateway heartbeat latency",
+                  lambda: bot.latency if bot.latency == bot.latency else 0)  # NaN before the first heartbeat
+bot.metrics.gauge("ron_asyncio_tasks", "Live asyncio tasks", lambda: len(asyncio.all_tasks()))
+bot.metrics.gauge("ron_scheduled_reminders", "Pending one-off reminders in the scheduler",
+                  lambda: len(bot.reminder_scheduler))
+bot.metrics.gauge("ron_water_subscribers", "Hydration reminder subscriptions", lambda: len(reminders))
+bot.metrics.gauge("ron_water_registry_bytes", "Memory held by the water subscriber registry", reminders.memory_bytes)
+bot.metrics.gauge("ron_guilds", "Guilds this process is connected to", lambda: len(bot.guilds))
+bot.metrics.gauge("ron_cached_members", "Members in discord.py's cache plus the on-demand LRU",
+                  lambda: sum(len(guild._members) for guild in bot.guilds) + len(bot.member_index.cache))
+bot.metrics.gauge("ron_uptime_seconds", "Seconds since the bot started",
+                  lambda: round((datetime.now() - bot.launch_time).total_seconds()))
+bot.metrics.gauge("ron_process_resident_memory_bytes", "Bot process RSS", lambda: _process.memory_info().rss)
+bot.metrics.gauge("ron_process_cpu_percent", "Bot process CPU use since the last scrape",
+                  lambda: _process.cpu_percent(None))
+bot.metrics.gauge("ron_process_open_fds", "Open file descriptors",
+                  lambda: _process.num_fds() if hasattr(_process, "num_fds") else _process.num_handles())
+loop_stalls = bot.metrics.histogram(
+    "ron_event_loop_stall_seconds", "Event-loop stalls over the watchdog threshold",
+    buckets=(0.5, 1.0, 2.5, 5.0, 10.0, 30.0))
+
+# A thread that notices when the event loop stops turning and records what
+# was blocking it; see `stalls`.  STALL_THRESHOLD_MS tunes the sensitivity.
+bot.stall_watchdog = StallWatchdog(
+    threshold=int(os.getenv("STALL_THRESHOLD_MS", "250")) / 1000,
+    on_stall=lambda stall: loop_stalls.observe(stall.duration),
+)
+bot.profile_lock = asyncio.Lock()
+
+
+# Token buckets per user, channel and guild for every command (see
+# ron/throttle.py); THROTTLE_LIMITS adjusts the defaults bot-wide and the
+# `throttle` setting per server.
+bot.throttle = Throttle(
+    guild_config, merge_limits(DEFAULT_LIMITS, parse_limits(os.getenv("THROTTLE_LIMITS", ""))),
+    exempt=lambda user_id: user_id == checks.ALLOWED_DM_USER_ID,
+)
+bot.throttle_task = None
+throttled = bot.metrics.counter("ron_throttled_total", "Command calls rejected by the throttle", ("command", "scope"))
+bot.metrics.gauge("ron_throttle_buckets", "Live throttle buckets", lambda: len(bot.throttle))
+
+# Slash commands that have not answered within AUTO_DEFER_MS of the
+# interaction's creation are deferred for them, well before Discord's 3s
+# deadline; every first answer is timed.
+interaction_ack = bot.metrics.histogram(
+    "ron_interaction_ack_seconds", "Time from interaction creation to the first response, by how it was answered",
+    ("command", "how"), buckets=(0.1, 0.25, 0.5, 1.0, 1.5, 2.0, 2.5, 3.0, 5.0))
+bot.deferrer = Deferrer(
+    budget=int(os.getenv("AUTO_DEFER_MS", "2000")) / 1000,
+    on_ack=lambda interaction, how, seconds: interaction_ack.observe(
+        seconds, interaction.command.qualified_name if interaction.command else "unknown", how),
+    on_error=bot.errors,
+)
+
+
+@bot.check_once
+async def throttle_commands(ctx):
+    # check_once: a group and its subcommand count as one call
+    bot.throttle.check(ctx.command.qualified_name, ctx.author.id, ctx.channel.id, ctx.guild.id if ctx.guild else None)
+    return True
+
+
+@bot.before_invoke
+async def start_command_timer(ctx):
+    ctx.command_started = time.perf_counter()
+    label_task(f"{DEFAULT_PREFIX}{ctx.command.qualified_name}")
+    logs.bind(command=ctx.command.qualified_name, guild=ctx.guild.id if ctx.guild else None, user=ctx.author.id)
 
 
-@bot.command()
-async def ping(ctx):
-    """Responds with pong and latency."""
-    latency = round(bot.latency * 1000)
-    await ctx.send(f"Pong! {latency}ms")
+@bot.event
+async def on_command_completion(ctx):
+    started = getattr(ctx, "command_started", None)
+    if started is not None:
+        elapsed = time.perf_counter() - started
+        command_latency.observe(elapsed, ctx.command.qualified_name, "prefix")
+        command_log.info("Command completed", extra={"kind": "prefix", "latency_ms": round(elapsed * 1000, 2)})
 
 
-@bot.tree.command(name="ping")
-async def slash_ping(interaction: discord.Interaction):
-    """Slash version of ping."""
-    latency = round(bot.latency * 1000)
-    await interaction.response.send_message(f"Pong! {latency}ms")
+@bot.event
+async def on_command_error(ctx, error):
+    if isinstance(error, commands.CommandNotFound):
+        return
+    if isinstance(error, Throttled):
+        throttled.inc(error.command, error.scope)
+        if error.warn:
+            await ctx.send(error.message(), delete_after=min(max(error.retry_after, 5), 60))
+        return
+    name = ctx.command.qualified_name if ctx.command else "unknown"
+    command_errors.inc(name, "prefix")
+    # the before_invoke hook that binds these has not run if a check failed
+    context = {"command": name, "guild": ctx.guild.id if ctx.guild else None, "user": ctx.author.id}
+    if isinstance(error, (commands.UserInputError, commands.CheckFailure)):
+        command_log.info("Command %s rejected: %s", name, error, extra=context)
+    else:
+        command_log.error("Command %s failed", name, exc_info=error, extra=context)
 
 
-@bot.command()
-async def roll(ctx, dice: str = "1d6"):
-    """Roll dice using NdM format, e.g. 2d6 or d20."""
-    try:
-        if "d" not in dice:
-            raise ValueError
-        parts = dice.split("d")
-        n = int(parts[0]) if parts[0] != "" else 1
-        m = int(parts[1])
-        if n < 1 or m < 1 or n > 100:
-            raise ValueError
-    except Exception:
-        await ctx.send("Usage: !roll NdM (e.g. 2d6, d20). Max 100 dice.")
-        return
-    rolls = [random.randint(1, m) for _ in range(n)]
-    total = sum(rolls)
-    await ctx.send(f"🎲 Rolled {dice}: {rolls} (total: {total})")
+@bot.event
+async def on_app_command_completion(interaction, command):
+    await bot.deferrer.finish(interaction)
+    elapsed = (discord.utils.utcnow() - interaction.created_at).total_seconds()
+    command_latency.observe(elapsed, command.qualified_name, "slash")
+    command_log.info("Command completed", extra={"kind": "slash", "latency_ms": round(elapsed * 1000, 2)})
 
 
-@bot.tree.command(name="roll")
-@app_commands.describe(dice="Dice to roll in NdM format, e.g. 2d6")
-async def slash_roll(interaction: discord.Interaction, dice: str = "1d6"):
-    try:
-        if "d" not in dice:
-            raise ValueError
-        parts = dice.split("d")
-        n = int(parts[0]) if parts[0] != "" else 1
-        m = int(parts[1])
-        if n < 1 or m < 1 or n > 100:
-            raise ValueError
-    except Exception:
-        await interaction.response.send_message("Usage: /roll NdM (e.g. /roll 2d6). Max 100 dice.", ephemeral=True)
-        return
-    rolls = [random.randint(1, m) for _ in range(n)]
-    total = sum(rolls)
-    await interaction.response.send_message(f"🎲 Rolled {dice}: {rolls} (total: {total})")
+@bot.tree.error
+async def on_app_command_error(interaction, error):
+    name = interaction.command.qualified_name if interaction.command else "unknown"
+    command_errors.inc(name, "slash")
+    command_log.error("Slash command %s failed", name, exc_info=error, extra={
+        "command": name, "guild": interaction.guild_id, "user": interaction.user.id,
+    })
+    await bot.deferrer.finish(interaction, failed=True)
 
 
-@bot.command()
-async def quote(ctx):
-    """Send a random motivational quote."""
-    await ctx.send(random.choice(QUOTES))
+bot.startup_timer = StartupTimer(STARTUP_BEGAN)
+bot.startup_reported = False
+bot.connected_at = None
+# Optional guild for instant slash-command updates while developing
+DEV_GUILD_ID = os.getenv("DEV_GUILD_ID")
 
 
-@bot.tree.command(name="quote")
-async def slash_quote(interaction: discord.Interaction):
-    await interaction.response.send_message(random.choice(QUOTES))
+# Syncs the slash tree only for scopes whose fingerprint changed
+bot.tree_syncer = TreeSyncer(bot.tree, store, dev_guild=discord.Object(int(DEV_GUILD_ID)) if DEV_GUILD_ID else None)
 
 
-@bot.command()
-async def remind(ctx, minutes: float, *, message: str):
-    """Set a reminder for yourself: !remind 10 Take a break"""
-    if minutes <= 0:
-        await ctx.send("Please provide a positive number of minutes.")
-        return
-    await ctx.send(f"Okay {ctx.author.mention}, I'll remind you in {minutes} minute(s).")
+async def sync_after_reload():
+    # a reloaded cog may have changed a slash command's options
+    if ownership.primary:
+        results = await bot.tree_syncer.sync()
+        log.info("Slash command sync after reload: %s", results)
 
-    async def _reminder(delay, user, content):
-        await asyncio.sleep(delay)
-        try:
-            await user.send(f"⏰ Reminder: {content}")
-        except Exception:
-            channel = None
-            try:
-                channel = discord.utils.get(user.guilds[0].text_channels, name="general")
-            except Exception:
-                pass
-            if channel:
-                await channel.send(f"{user.mention} ⏰ Reminder: {content}")
-
-    asyncio.create_task(_reminder(minutes * 60, ctx.author, message))
-
-
-@bot.tree.command(name="remind")
-@app_commands.describe(minutes="Minutes until reminder", message="Reminder message")
-async def slash_remind(interaction: discord.Interaction, minutes: float, message: str):
-    if minutes <= 0:
-        await interaction.response.send_message("Please provide a positive number of minutes.", ephemeral=True)
-        return
-    await interaction.response.send_message(f"Okay {interaction.user.mention}, I'll remind you in {minutes} minute(s).", ephemeral=True)
 
-    async def _reminder(delay, user, content):
-        await asyncio.sleep(delay)
-        try:
-            await user.send(f"⏰ Reminder: {content}")
-        except Exception:
-            try:
-                channel = discord.utils.get(user.guilds[0].text_channels, name="general")
-            except Exception:
-                channel = None
-            if channel:
-                await channel.send(f"{user.mention} ⏰ Reminder: {content}")
-
-    asyncio.create_task(_reminder(minutes * 60, interaction.user, message))
-
-
-@bot.command(name="dm")
-async def dm(ctx, member: discord.Member, *, message: str):
-    """Send a DM to another member (restricted to invoker user ID 821102915325526046)."""
-    # Restrict to invoker user ID
-    if getattr(ctx.author, 'id', None) != ALLOWED_DM_USER_ID:
-        await ctx.send("You are not allowed to use this command.")
-        return
-    # delete the invoking command message so only the invoker sees the result
-    try:
-        await ctx.message.delete()
-    except Exception:
-        pass
+@bot.event
+async def on_connect():
+    # READY and the GUILD_CREATEs (plus member chunking in full mode) come
+    # after this, so on_ready can time them separately
+    if not bot.startup_reported and bot.connected_at is None:
+        bot.connected_at = time.perf_counter()
+        bot.startup_timer.mark("connect")
 
-    # Check for an attachment on the invoking message
-    attachment = None
-    try:
-        if ctx.message.attachments:
-            attachment = ctx.message.attachments[0]
-    except Exception:
-        attachment = None
 
-    try:
-        if attachment:
-            file = await attachment.to_file()
-            await member.send(content=message or None, file=file)
-        else:
-            # look for image URL in message
-            import re
-            m = re.search(r"(https?://\S+\.(?:png|jpg|jpeg|gif|webp))", message or "", re.IGNORECASE)
-            if m:
-                url = m.group(1)
-                embed = discord.Embed()
-                embed.set_image(url=url)
-                await member.send(content=(message or None), embed=embed)
-            else:
-                await member.send(message or None)
+@bot.event
+async def on_ready():
+    first_ready = not bot.startup_reported
+    if first_ready:
+        bot.startup_timer.mark("guilds + chunking" if bot.connected_at is not None else "connect")
+    if bot.user:
+        log.info("Ron is ready. Logged in as: %s (ID: %s)", bot.user, bot.user.id)
+    else:
+        log.warning("Ron is ready, but bot.user is not yet available.")
+    if first_ready:
+        members, size = cache_footprint(bot.guilds)
+        log.info(
+            "Member cache (%s): %d members in %d guilds, ~%.1f MB",
+            "lean" if LEAN_MEMBERS else "full", members, len(bot.guilds), size / 1048576,
+            extra={"cached_members": members, "member_cache_bytes": size},
+        )
+    # Start the storage writer and the one-off reminder dispatcher (both are
+    # no-ops after a reconnect)
+    store.start()
+    bot.reminder_scheduler.start()
+    if first_ready:
+        bot.forwarder.resume()
+    bot.stall_watchdog.start()
+    # Start the water reminder background task
+    if bot.water_reminder_task is not None and not bot.water_reminder_task.done():
+        bot.water_reminder_task.cancel()
+    bot.water_reminder_task = asyncio.create_task(water_reminder_loop(bot), name="ron: water reminder loop")
+    if bot.streak_rollover_task is not None and not bot.streak_rollover_task.done():
+        bot.streak_rollover_task.cancel()
+    bot.streak_rollover_task = asyncio.create_task(streak_rollover_loop(bot), name="ron: streak rollover")
+    # Pick up hand edits to configs.json without a restart
+    if bot.config_watch_task is None or bot.config_watch_task.done():
+        bot.config_watch_task = asyncio.create_task(guild_config.watch())
+    # ...and packs added to or removed from the packs directory
+    if bot.content_watch_task is None or bot.content_watch_task.done():
+        bot.content_watch_task = asyncio.create_task(bot.content.watch(), name="ron: content packs")
+    if bot.automod_task is None or bot.automod_task.done():
+        bot.automod_task = asyncio.create_task(bot.automod_actions.run(), name="ron: automod actions")
+    if bot.throttle_task is None or bot.throttle_task.done():
+        bot.throttle_task = asyncio.create_task(bot.throttle.run(), name="ron: throttle sweep")
+    if bot.analytics_task is None or bot.analytics_task.done():
+        bot.analytics_task = asyncio.create_task(bot.analytics.run(), name="ron: check-in flush")
+    if bot.loop_lag_task is None or bot.loop_lag_task.done():
+        bot.loop_lag_task = asyncio.create_task(monitor_loop_lag(loop_lag))
+    if bot.metrics_server is None:
         try:
-            await ctx.author.send(f"Sent DM to {member.display_name}.")
-        except Exception:
-            pass
-    except Exception as e:
+            bot.metrics_server = await serve_metrics(bot.metrics, port=METRICS_PORT)
+        except OSError as e:
+            log.warning("Metrics endpoint disabled; could not bind port %s: %s", METRICS_PORT, e)
+    if first_ready:
+        bot.startup_timer.mark("background tasks")
+    # Only one cluster worker syncs, and only when the command tree changed
+    # since the last sync (on_ready also fires after every reconnect).
+    if ownership.primary:
         try:
-            await ctx.author.send(f"Failed to send DM to {member.display_name}: {e}")
+            results = await bot.tree_syncer.sync()
+            summary = ", ".join(f"{scope}: {'unchanged' if n is None else n}" for scope, n in results.items())
+            log.info("Slash command sync: %s", summary)
         except Exception:
-            # last resort public error
-            await ctx.send(f"Failed to send DM: {e}")
-
-
-@bot.tree.command(name="dm")
-@app_commands.describe(target="Member identifier (ID, mention, username#discrim, or name)", message="Message content")
-async def slash_dm(interaction: discord.Interaction, target: str, message: str, image: discord.Attachment = None):
-    # Ensure allowed user
-    if getattr(interaction.user, 'id', None) != ALLOWED_DM_USER_ID:
-        await interaction.response.send_message("You are not allowed to use this command.", ephemeral=True)
+            log.exception("Failed to sync slash commands")
+    if first_ready:
+        bot.startup_timer.mark("slash sync")
+        bot.startup_reported = True
+        log.info("Startup timing: %s", bot.startup_timer.summary(), extra={
+            f"startup_{phase.replace(' + ', '_').replace(' ', '_')}_s": round(seconds, 3)
+            for phase, seconds in bot.startup_timer.phases
+        })
+
+
+
+async def deliver_reminder(reminder):
+    """Deliver a due reminder by DM, falling back to the guild's #general."""
+    content = f"⏰ Reminder: {reminder.content}"
+    if reminder.due < time.time() - 60:
+        content += " (delayed: Ron was offline when this came due)"
+    if reminder.repeat is not None:
+        content += f"\n-# Repeats {describe_repeat(reminder.repeat)}. Stop it with `{DEFAULT_PREFIX}reminders cancel {reminder.id}`."
+    else:
+        content += f"\n-# Snooze with `{DEFAULT_PREFIX}reminders snooze {reminder.id} 10m`."
+    try:
+        user = bot.get_user(reminder.user_id) or await bot.fetch_user(reminder.user_id)
+        await user.send(content)
+        dm_sent.inc("reminder", "delivered")
         return
-    if not message:
-        await interaction.response.send_message("Missing message content.", ephemeral=True)
+    except Exception as e:
+        dm_sent.inc("reminder", "failed")
+        bot.errors("reminder.dm", e)
+    if not reminder.guild_id:
         return
-    guild = interaction.guild
-    if guild is None:
-        await interaction.response.send_message("This command must be used in a server.", ephemeral=True)
+    guild = bot.get_guild(reminder.guild_id)
+    channel_id = guild_config.get(reminder.guild_id, "reminder_channel")
+    channel = None
+    if guild:
+        if channel_id:
+            channel = guild.get_channel(channel_id)
+        else:
+            channel = discord.utils.get(guild.text_channels, name="general")
+    elif channel_id:
+        # the guild is on another cluster worker's shards
+        channel = bot.get_partial_messageable(channel_id)
+    if channel:
+        await channel.send(f"<@{reminder.user_id}> {content}")
+
+
+async def deliver_scheduled(job):
+    """Scheduler callback: plain reminders, or a cog's handler for other kinds."""
+    if job.kind is None:
+        await deliver_reminder(job)
         return
-    resolved = None
-    tid = None
-    # mention format
-    if target.startswith("<@") and target.endswith(">"):
-        digits = ''.join(c for c in target if c.isdigit())
-        if digits:
-            tid = digits
-    elif target.isdigit():
-        tid = target
-    if tid:
-        try:
-            resolved = guild.get_member(int(tid))
-        except Exception:
-            resolved = None
-    # username#discrim
-    if resolved is None and "#" in target:
-        name, discrim = target.rsplit("#", 1)
-        for m in guild.members:
-            if m.name == name and m.discriminator == discrim:
-                resolved = m
-                break
-    # fallback: match display name or username
-    if resolved is None:
-        for m in guild.members:
-            if m.display_name == target or m.name == target:
-                resolved = m
-                break
-    if resolved is None:
-        await interaction.response.send_message(f"Could not resolve target member: {target}. Use a mention, ID, or username#discrim.", ephemeral=True)
+    handler = bot.scheduled_handlers.get(job.kind)
+    if handler is None:
+        # its cog is mid-reload (or failed to load); try again shortly
+        bot.reminder_scheduler.schedule(
+            job.user_id, job.content, 60, guild_id=job.guild_id, channel_id=job.channel_id,
+            kind=job.kind, payload=job.payload,
+        )
+        log.warning("No handler for scheduled %s #%s; retrying in 60s", job.kind, job.id)
         return
-    try:
-        if image:
-            file = await image.to_file()
-            await resolved.send(content=message or None, file=file)
-        else:
-            import re
-            m = re.search(r"(https?://\S+\.(?:png|jpg|jpeg|gif|webp))", message or "", re.IGNORECASE)
-            if m:
-                url = m.group(1)
-                embed = discord.Embed()
-                embed.set_image(url=url)
-                await resolved.send(content=(message or None), embed=embed)
-            else:
-                await resolved.send(message or None)
-        await interaction.response.send_message(f"Sent DM to {resolved.display_name}.", ephemeral=True)
-    except Exception as e:
-        await interaction.response.send_message(f"Failed to send DM: {e}", ephemeral=True)
+    await handler(job)
 
 
-# The weather commands (prefix and slash) were removed in v2.0.0.
+# Cogs register handlers for their own scheduled job kinds (kind -> coroutine)
+bot.scheduled_handlers = {}
 
+bot.reminder_scheduler = ReminderScheduler(SCHEDULED_REMINDERS_PATH, deliver_scheduled, next_due=next_due)
+bot.reminder_scheduler.load()
 
-async def handle_waterreminder(user_id, interaction=None, ctx=None):
-    """Shared handler for water reminder commands."""
-    user_id = str(user_id)
-    if user_id in reminders:
-        del reminders[user_id]
-        save_reminders(reminders)
-        message = "💧 You've unsubscribed from water reminders."
-        logging.info(f"User {user_id} unsubscribed from water reminders.")
-    else:
-        reminders[user_id] = {"subscribed": True}
-        save_reminders(reminders)
-        message = "💧 You've subscribed to hourly water reminders! Stay hydrated! 💪"
-        logging.info(f"User {user_id} subscribed to water reminders.")
+# Cluster mode: a user's reminders are held by the worker that owns the user.
+# Reminder commands that reach another worker are forwarded to it (see the
+# reminders cog), and reminders this worker no longer owns (the shard plan
+# changed) are handed over at startup.
+bot.forwarder = Forwarder(store, ownership)
 
-    if interaction:
-        await interaction.response.send_message(message)
-    elif ctx:
-        await ctx.send(message)
 
+async def adopt_reminder(request):
+    reminder = Reminder.from_dict(request["reminder"])
+    adopted = bot.reminder_scheduler.schedule(
+        reminder.user_id, reminder.content, max(reminder.due - time.time(), 0), guild_id=reminder.guild_id,
+        channel_id=reminder.channel_id, repeat=reminder.repeat,
+    )
+    log.info("Adopted reminder #%s of user %s as #%s", reminder.id, reminder.user_id, adopted.id)
 
-@bot.command()
-async def waterreminder(ctx):
-    """Subscribe to hourly water reminders. Usage: !waterreminder"""
-    await handle_waterreminder(ctx.author.id, ctx=ctx)
 
+bot.forwarder.handlers["adopt_reminder"] = adopt_reminder
+if not ownership.everything:
+    for _reminder in bot.reminder_scheduler:
+        if _reminder.kind is None and not ownership.owns(_reminder.user_id):
+            bot.forwarder.forward("adopt_reminder", _reminder.user_id, {"reminder": _reminder.to_dict()})
+            bot.reminder_scheduler.cancel(_reminder.id)
 
-@bot.tree.command(name="waterreminder")
-async def slash_waterreminder(interaction: discord.Interaction):
-    """Subscribe to hourly water reminders."""
-    await handle_waterreminder(interaction.user.id, interaction=interaction)
 
+def drop_water_subscriber(user_id):
+    """Unsubscribe a user whose DMs can never be delivered (closed or deleted)."""
+    if reminders.discard(int(user_id)):
+        store.delete("water", user_id)
+        log.info("User %s unsubscribed from water reminders: DMs undeliverable.", user_id)
 
-@bot.command()
-async def sync(ctx):
-    """Sync slash commands with Discord. Owner only."""
-    if ctx.author.id != ALLOWED_DM_USER_ID:
-        await ctx.send("❌ You don't have permission to use this command.")
-        return
-    try:
-        synced = await bot.tree.sync()
-        await ctx.send(f"✅ Synced {len(synced)} slash commands with Discord!")
-    except Exception as e:
-        await ctx.send(f"❌ Failed to sync commands: {e}")
 
+# Streaks: a subscriber is credited for each UTC day they check in with the
+# "I drank" button under a water reminder (see the water cog).
+bot.streaks = StreakEngine(store)
+store.follow("streaks", lambda user_id, record: bot.streaks.apply_remote(int(user_id), record))
 
-@bot.command()
-async def purge(ctx, count: int = 10):
-    """Moderator command: bulk-delete `count` messages from the current channel."""
-    if not is_mod(ctx):
-        await ctx.send("❌ You don't have permission to use this command.")
-        return
-    if count < 1 or count > 100:
-        await ctx.send("Please specify a count between 1 and 100.")
-        return
-    try:
-        deleted = await ctx.channel.purge(limit=count+1)
-        await ctx.send(f"🧹 Purged {len(deleted)-1} messages.", delete_after=5)
-    except Exception as e:
-        await ctx.send(f"Failed to purge messages: {e}")
+# Check-in counters per user and per guild, kept in memory and written to
+# the store in batches (ron/analytics.py)
+bot.analytics = EngagementAggregator(store, flush_interval=float(os.getenv("ANALYTICS_FLUSH_SECONDS", "30")))
+bot.analytics_task = None
+for _ns in (CHECKINS_NS, GUILD_CHECKINS_NS):
+    store.follow(_ns, lambda key, record, ns=_ns: bot.analytics.apply_remote(ns, key, record))
+bot.metrics.counter(
+    "ron_water_checkins_total", "Clicks on the buttons under water reminders", ("action",))
+# The buttons sent with every water DM; set by the water cog, which handles
+# the clicks through a persistent view
+bot.water_dm_view = None
 
 
-@bot.tree.command(name="purge")
-@app_commands.describe(count="Number of messages to delete (1-100)")
-async def slash_purge(interaction: discord.Interaction, count: int = 10):
-    if not is_mod_interaction(interaction):
-        await interaction.response.send_message("❌ You don't have permission to use this command.", ephemeral=True)
-        return
-    if count < 1 or count > 100:
-        await interaction.response.send_message("Please specify a count between 1 and 100.", ephemeral=True)
-        return
-    try:
-        deleted = await interaction.channel.purge(limit=count+1)
-        await interaction.response.send_message(f"🧹 Purged {len(deleted)-1} messages.", ephemeral=True)
-    except Exception as e:
-        await interaction.response.send_message(f"Failed to purge messages: {e}", ephemeral=True)
+async def streak_rollover_loop(bot):
+    """Background task: reset missed streaks once a day, just after UTC midnight."""
+    await bot.wait_until_ready()
+    while not bot.is_closed():
+        try:
+            # also catches up on a rollover missed while the bot was offline
+            bot.streaks.rollover(owns=ownership.owns)
+            await asyncio.sleep(86400 - time.time() % 86400 + 1)
+        except asyncio.CancelledError:
+            break
+        except Exception:
+            log.exception("Streak rollover failed")
+            await asyncio.sleep(60)
 
 
-@bot.command()
-async def announce(ctx, channel: discord.TextChannel, *, message: str):
-    """Moderator command: send a highlighted announcement to a channel."""
-    if not is_mod(ctx):
-        await ctx.send("❌ You don't have permission to use this command.")
-        return
-    try:
-        embed = discord.Embed(title="📢 Announcement", description=message, color=discord.Color.gold())
-        embed.set_footer(text=f"Posted by {ctx.author.display_name}")
-        await channel.send(embed=embed)
-        await ctx.send(f"✅ Announcement sent to {channel.mention}.")
-    except Exception as e:
-        await ctx.send(f"Failed to send announcement: {e}")
+bot.water_fanout = DMFanout(bot, store=store, on_undeliverable=drop_water_subscriber)
+bot.water_fanout_stats = None  # FanoutStats of the most recent pass
 
 
-@bot.tree.command(name="announce")
-@app_commands.describe(channel="Target channel", message="Announcement message")
-async def slash_announce(interaction: discord.Interaction, channel: discord.TextChannel, message: str):
-    if not is_mod_interaction(interaction):
-        await interaction.response.send_message("❌ You don't have permission to use this command.", ephemeral=True)
-        return
-    try:
-        embed = discord.Embed(title="📢 Announcement", description=message, color=discord.Color.gold())
-        embed.set_footer(text=f"Posted by {interaction.user.display_name}")
-        await channel.send(embed=embed)
-        await interaction.response.send_message(f"✅ Announcement sent to {channel.mention}.", ephemeral=True)
-    except Exception as e:
-        await interaction.response.send_message(f"Failed to send announcement: {e}", ephemeral=True)
+async def send_water_slot(bot, minute):
+    """Send the water reminders due in one minute slot."""
+    stats = await bot.water_fanout.run(
+        reminders.due(minute),
+        lambda user_id: bot.content.draw("water", key=user_id),
+        # also skips anyone who unsubscribes while the batch is in flight
+        should_skip=reminders.quiet_filter(),
+        view=bot.water_dm_view,
+    )
+    bot.water_fanout_stats = stats
+    for result in ("delivered", "failed", "skipped", "retried"):
+        dm_sent.inc("water", result, amount=getattr(stats, result))
+    if stats.delivered or stats.failed:
+        log.info("Water reminders for :%02d: %s", minute, stats)
 
 
-@bot.command()
-async def about(ctx):
-    """Show information about Ron Bot."""
-    embed = discord.Embed(
-        title="🤖 Ron Bot",
-        description="The friendly wellness and moderation companion!",
-        color=discord.Color.blue()
-    )
-    embed.add_field(
-        name="Features",
-        value="💧 Hydration Reminders • 💪 Wellness • 🎯 Motivation • 🧹 Moderation",
-        inline=False
-    )
-    embed.add_field(
-        name="Commands",
-        value="`!quote` • `!roll NdM` • `!ping` • `!remind` • `!waterreminder` • `!purge` • `!announce` • `!stats` • `!leaderboard` • `!health`",
-        inline=False
-    )
-    embed.add_field(
-        name="QOL Features",
-        value="`!help` • `!motivate` • `!workout` • `!breathing` • `!tip` • `!about`",
-        inline=False
-    )
-    embed.set_footer(text="Stay hydrated, stay healthy! 💚")
-    await ctx.send(embed=embed)
+async def water_reminder_loop(bot):
+    """Background task: every subscriber gets an hourly reminder in their own
+    minute slot, so each minute sends a small batch instead of one hourly burst."""
+    await bot.wait_until_ready()
+    passes = set()
+    next_tick = (int(time.time() // 60) + 1) * 60
+    while not bot.is_closed():
+        try:
+            await asyncio.sleep(max(0, next_tick - time.time()))
+            minute = (next_tick // 60) % 60
+            next_tick += 60
+            # run the batch in the background so a slow pass never delays
+            # the next minute's tick
+            task = asyncio.create_task(send_water_slot(bot, minute), name=f"ron: water slot {minute}")
+            passes.add(task)
+            task.add_done_callback(passes.discard)
+        except asyncio.CancelledError:
+            for task in passes:
+                task.cancel()
+            break
+        except Exception:
+            log.exception("Water reminder tick failed")
 
 
-@bot.tree.command(name="about")
-async def slash_about(interaction: discord.Interaction):
-    """Show information about Ron Bot."""
-    embed = discord.Embed(
-        title="🤖 Ron Bot",
-        description="The friendly wellness and moderation companion!",
-        color=discord.Color.blue()
-    )
-    embed.add_field(
-        name="Features",
-        value="💧 Hydration Reminders • 💪 Wellness • 🎯 Motivation • 🧹 Moderation",
-        inline=False
-    )
-    embed.add_field(
-        name="Commands",
-        value="`/quote` • `/roll` • `/ping` • `/remind` • `/waterreminder` • `/purge` • `/announce` • `/stats` • `/leaderboard` • `/health`",
-        inline=False
-    )
-    embed.add_field(
-        name="QOL Features",
-        value="`/help` • `/motivate` • `/workout` • `/breathing` • `/tip` • `/about`",
-        inline=False
-    )
-    embed.set_footer(text="Stay hydrated, stay healthy! 💚")
-    await interaction.response.send_message(embed=embed)
+# Name lookup index for member resolution (slash_dm, purge user:), built per
+# guild on first use and kept current by the member events below.  In lean
+# mode it also fetches members by ID through a bounded LRU.
+bot.member_index = MemberIndex(lean=LEAN_MEMBERS, cache_size=int(os.getenv("MEMBER_LRU_SIZE", "1024")))
 
 
-@bot.tree.command(name="help")
-async def slash_help(interaction: discord.Interaction):
-    """Show all available Ron Bot commands."""
-    embed = discord.Embed(
-        title="📚 Ron Bot Commands",
-        color=discord.Color.green()
-    )
-    
-    embed.add_field(
-        name="🧹 **Moderation**",
-        value="`/purge <count>` - Bulk delete messages (mods only)\n`/announce <channel> <message>` - Post an announcement",
-        inline=False
-    )
-    
-    embed.add_field(
-        name="🎯 **Fun & Motivation**",
-        value="`/ping` - Check bot latency\n"
-              "`/quote` - Random motivational quote\n"
-              "`/motivate` - Quick motivation boost\n"
-              "`/roll NdM` - Roll dice (e.g., 2d6, d20)",
-        inline=False
-    )
-    
-    embed.add_field(
-        name="💚 **Wellness**",
-        value="`/waterreminder` - Subscribe to hourly water reminders\n"
-              "`/workout` - Get a quick workout suggestion\n"
-              "`/breathing` - Guided breathing exercises\n"
-              "`/tip` - Daily wellness tip",
-        inline=False
-    )
-    
-    embed.add_field(
-        name="⏰ **Reminders**",
-        value="`/remind <minutes> <message>` - Set a personal reminder",
-        inline=False
-    )
-    
-    embed.add_field(
-        name="ℹ️ **Info**",
-        value="`/about` - About Ron Bot\n"
-              "`/help` - This message",
-        inline=False
-    )
-    embed.add_field(
-        name="📊 **Stats & Health**",
-        value="`/stats` - View your reminder stats\n"
-              "`/leaderboard` - See top streaks\n"
-              "`/health` - Bot status (owner only)",
-        inline=False
-    )
-    
-    embed.set_footer(text="Both prefix (!) and slash (/) commands work!")
-    await interaction.response.send_message(embed=embed)
-
-
-@bot.command()
-async def motivate(ctx):
-    """Get a quick motivational boost."""
-    motivations = [
-        f"💪 {random.choice(AFFIRMATIONS)}",
-    ]
-    await ctx.send(random.choice(motivations))
-
-
-@bot.tree.command(name="motivate")
-async def slash_motivate(interaction: discord.Interaction):
-    """Get a quick motivational boost."""
-    await interaction.response.send_message(f"💪 {random.choice(AFFIRMATIONS)}")
-
-
-@bot.command()
-async def workout(ctx, difficulty: str = None):
-    """Get a workout suggestion. Usage: !workout [difficulty]"""
-    workouts = {
-        "easy": ["10 push-ups", "15 squats", "20 jumping jacks"],
-        "medium": ["20 push-ups", "30 squats", "1-minute plank"],
-        "hard": ["30 push-ups", "50 squats", "2-minute plank"]
-    }
-
-    if difficulty and difficulty.lower() in workouts:
-        suggestion = random.choice(workouts[difficulty.lower()])
-        await ctx.send(f"💪 {difficulty.capitalize()} workout: {suggestion}")
-    else:
-        all_workouts = [item for sublist in workouts.values() for item in sublist]
-        suggestion = random.choice(all_workouts)
-        await ctx.send(f"💪 Random workout: {suggestion}")
-
-@bot.command()
-async def tip(ctx, theme: str = None):
-    """Get a wellness tip. Usage: !tip [theme]"""
-    tips = {
-        "hydration": ["Drink a glass of water every hour.", "Carry a reusable water bottle."],
-        "mindfulness": ["Take 5 deep breaths.", "Spend 5 minutes meditating."],
-        "fitness": ["Stretch for 5 minutes.", "Take a short walk."]
-    }
-
-    if theme and theme.lower() in tips:
-        suggestion = random.choice(tips[theme.lower()])
-        await ctx.send(f"🌟 {theme.capitalize()} tip: {suggestion}")
-    else:
-        all_tips = [item for sublist in tips.values() for item in sublist]
-        suggestion = random.choice(all_tips)
-        await ctx.send(f"🌟 Random tip: {suggestion}")
+@bot.event
+async def on_member_join(member):
+    bot.member_index.on_join(member)
 
 
-@bot.command()
-async def stats(ctx):
-    """Show user engagement stats. Usage: !stats"""
-    user_id = str(ctx.author.id)
-    user_data = reminders.get(user_id, {})
+@bot.event
+async def on_member_update(before, after):
+    if (before.name, before.global_name, before.nick) != (after.name, after.global_name, after.nick):
+        bot.member_index.on_update(after)
 
-    streak = user_data.get("streak", 0)
-    subscribed = "Yes" if user_data.get("subscribed") else "No"
 
-    await ctx.send(
-        f"📊 **Your Stats:**\n"
-        f"- Subscribed to reminders: {subscribed}\n"
-        f"- Current streak: {streak} days"
-    )
+@bot.event
+async def on_raw_member_remove(payload):
+    # the raw event also fires for members that were never cached (lean mode)
+    bot.member_index.on_remove(payload.guild_id, payload.user.id)
 
-@bot.command()
-async def leaderboard(ctx):
-    """Show top users by streak. Usage: !leaderboard"""
-    sorted_users = sorted(
-        reminders.items(), key=lambda x: x[1].get("streak", 0), reverse=True
-    )
-    top_users = sorted_users[:10]
 
-    leaderboard = "\n".join(
-        [f"{i+1}. <@{user_id}> - {data.get('streak', 0)} days" for i, (user_id, data) in enumerate(top_users)]
-    )
+@bot.event
+async def on_guild_remove(guild):
+    bot.member_index.drop_guild(guild.id)
+
+
+# Purge jobs and the outbound message queue outlive any reload of the
+# moderation cog that drives them.
+bot.purges = PurgeEngine()
+outbound_sent = bot.metrics.counter("ron_outbound_messages_total", "Queued channel messages by result", ("result",))
+bot.outbound = OutboundQueue(
+    bot, on_result=lambda channel_id, error: outbound_sent.inc("delivered" if error is None else "failed"),
+)
+bot.metrics.gauge("ron_outbound_backlog", "Channel messages waiting in the outbound queue", lambda: len(bot.outbound))
 
-    await ctx.send(f"🏆 **Leaderboard:**\n{leaderboard}")
+# Automod checks every guild message before commands are parsed (servers
+# turn it on with `config automod on`).  Its actions are batched and sent
+# once a second by bot.automod_task.
+bot.automod = Automod(guild_config)
+bot.automod_actions = AutomodActions(bot.outbound)
+bot.automod_task = None
+automod_hits = bot.metrics.counter("ron_automod_violations_total", "Messages automod acted on, by rule", ("rule",))
+bot.metrics.gauge("ron_automod_tracked", "Users and channels with automod state", lambda: len(bot.automod))
 
 
-@bot.command()
-@commands.is_owner()
-async def health(ctx):
-    """Check the bot's health and status. Usage: !health"""
-    uptime = datetime.now() - bot.launch_time
-    active_reminders = len(reminders)
+@bot.event
+async def on_message(message):
+    if message.guild is not None and not message.author.bot:
+        violation = bot.automod.check(
+            message.guild.id, message.channel.id, message.author.id, message.content,
+            len(message.raw_mentions) + len(message.raw_role_mentions),
+        )
+        if violation is not None and not (
+            isinstance(message.author, discord.Member) and checks.is_mod_member(message.author, guild_config)
+        ):
+            automod_hits.inc(violation.rule)
+            bot.automod_actions.add(message, violation)
+            return
+    await bot.process_commands(message)
+
+# Commands live in the ron/cogs extensions and can be reloaded in place with
+# `!reload` or SIGHUP (which also rescans the content packs); everything
+# above stays put.  ron.checks and ron.dice are only used by the cogs, so
+# they are reloaded along with them.
+bot.reloader = Reloader(bot, "ron.cogs", helpers=("ron.checks", "ron.dice"), after_reload=sync_after_reload)
+bot.reload_task = None
 
-    embed = discord.Embed(title="Bot Health Check", color=0x00ff00)
-    embed.add_field(name="Uptime", value=str(uptime).split('.')[0], inline=False)
-    embed.add_field(name="Active Reminders", value=str(active_reminders), inline=False)
-    embed.add_field(name="Memory Usage", value=f"{psutil.virtual_memory().percent}%", inline=False)
 
-    await ctx.send(embed=embed)
+async def reload_code_and_content():
+    await bot.reloader.reload()
+    await bot.content.rescan()
+
+
+def reload_on_signal():
+    if bot.reload_task is None or bot.reload_task.done():
+        bot.reload_task = asyncio.create_task(reload_code_and_content(), name="ron: code reload")
+
+
+async def setup_hook():
+    await bot.reloader.load()
+    if hasattr(signal, "SIGHUP"):
+        asyncio.get_running_loop().add_signal_handler(signal.SIGHUP, reload_on_signal)
+
+
+bot.setup_hook = setup_hook
 
 # Track bot launch time
 bot.launch_time = datetime.now()
+bot.startup_timer.mark("load state")
 
 
 # entrypoint when executed as a script; keeps behaviour consistent with
@@ -741,7 +757,16 @@ bot.launch_time = datetime.now()
 if __name__ == "__main__":
     # run() will block until the bot exits; any exception will be logged
     try:
-        bot.run(TOKEN)
-    except Exception as e:
-        logging.error(f"Failed to start Ron Bot: {e}")
+        # log_handler=None: logging is already set up, don't add discord.py's handler
+        bot.run(TOKEN, log_handler=None)
+    except Exception:
+        log.exception("Failed to start Ron Bot")
         raise
+    finally:
+        # write out anything the background writer has not flushed yet
+        bot.analytics.flush()
+        store.close()
+        try:
+            reminders.snapshot(WATER_SNAPSHOT_PATH)
+        except OSError:
+            log.exception("Could not write the water subscriber snapshot")
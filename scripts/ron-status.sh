@@ -31,15 +31,43 @@ if command -v systemctl >/dev/null 2>&1; then
   fi
 fi
 
-# Check running processes
-PIDS=$(pgrep -f "ron_bot.py" || true)
-if [ -z "$PIDS" ]; then
-  echo "Ron Bot process: Not running"
+# Ask the running bot itself: it serves Prometheus-format metrics on a local
+# port (METRICS_PORT, default 9187; cluster workers use consecutive ports).
+METRICS_PORT="${METRICS_PORT:-}"
+if [ -z "$METRICS_PORT" ] && [ -f "$PROJECT_ROOT/.env" ]; then
+  METRICS_PORT="$(sed -n 's/^METRICS_PORT=//p' "$PROJECT_ROOT/.env" | tail -n 1)"
+fi
+METRICS_PORT="${METRICS_PORT:-9187}"
+
+fetch_metrics() {
+  if command -v curl >/dev/null 2>&1; then
+    curl -fsS --max-time 3 "http://127.0.0.1:$1/metrics" 2>/dev/null
+  else
+    python3 -c 'import sys, urllib.request; sys.stdout.write(urllib.request.urlopen(sys.argv[1], timeout=3).read().decode())' \
+      "http://127.0.0.1:$1/metrics" 2>/dev/null
+  fi
+}
+
+if METRICS="$(fetch_metrics "$METRICS_PORT")"; then
+  echo "Ron Bot process: Running (metrics on port $METRICS_PORT)"
+  echo "$METRICS" | awk '
+    /^ron_uptime_seconds /                { printf "  Uptime:             %ds\n", $2 }
+    /^ron_guilds /                        { printf "  Guilds:             %d\n", $2 }
+    /^ron_gateway_latency_seconds /       { printf "  Gateway latency:    %.0f ms\n", $2 * 1000 }
+    /^ron_event_loop_lag_seconds /        { printf "  Event loop lag:     %.1f ms\n", $2 * 1000 }
+    /^ron_process_resident_memory_bytes / { printf "  Memory (RSS):       %.1f MB\n", $2 / 1048576 }
+    /^ron_process_cpu_percent /           { printf "  CPU:                %.1f%%\n", $2 }
+    /^ron_process_open_fds /              { printf "  Open files:         %d\n", $2 }
+    /^ron_asyncio_tasks /                 { printf "  Asyncio tasks:      %d\n", $2 }
+    /^ron_scheduled_reminders /           { printf "  Pending reminders:  %d\n", $2 }
+    /^ron_water_subscribers /             { printf "  Water subscribers:  %d\n", $2 }
+    /^ron_command_errors_total/           { errors += $2 }
+    END                                   { printf "  Command errors:     %d\n", errors }'
+  if [ "$VERBOSE" -eq 1 ]; then
+    echo "$METRICS" | grep -v '^#'
+  fi
 else
-  echo "Ron Bot process: Running (PIDs): $PIDS"
-  for pid in $PIDS; do
-    ps -o pid,cmd,etime -p "$pid" 2>/dev/null || true
-  done
+  echo "Ron Bot process: Not responding on port $METRICS_PORT"
 fi
 
 # Check PID file from run_ron.sh
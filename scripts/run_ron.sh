@@ -2,17 +2,23 @@
 set -euo pipefail
 
 # One-click runner for Ron Bot
-# Usage: ./run_ron.sh [-f|--force] [-v|--verbose]
+# Usage: ./run_ron.sh [-f|--force] [-v|--verbose] [--cluster N [--shards M]]
 # Creates a virtualenv (./.venv), installs requirements, loads .env, and runs the bot.
+# --cluster N: run N worker processes under the cluster supervisor (ron.cluster)
+# --shards M: total shard count for cluster mode (default: Discord's recommendation)
 
 # Parse args
 FORCE=0
 VERBOSE=0
+CLUSTER=0
+SHARDS=auto
 while [ $# -gt 0 ]; do
   case "$1" in
     -f|--force) FORCE=1; shift ;;
     -v|--verbose) VERBOSE=1; shift ;;
-    -h|--help) echo "Usage: $0 [-f|--force] [-v|--verbose]"; exit 0 ;;
+    --cluster) CLUSTER=${2:-0}; shift 2 || { echo "--cluster needs a worker count" >&2; exit 1; } ;;
+    --shards) SHARDS=${2:-auto}; shift 2 || { echo "--shards needs a count" >&2; exit 1; } ;;
+    -h|--help) echo "Usage: $0 [-f|--force] [-v|--verbose] [--cluster N [--shards M]]"; exit 0 ;;
     *) echo "Unknown argument: $1"; exit 1 ;;
   esac
 done
@@ -132,7 +138,14 @@ if [ ! -x "$PYTHON_EXEC" ]; then
   PYTHON_EXEC="python3"
 fi
 
-nohup "$PYTHON_EXEC" "$PROJECT_ROOT/ron_bot.py" >>"$PROJECT_ROOT/ron.log" 2>&1 &
+if [ "$CLUSTER" -gt 0 ]; then
+  # The supervisor owns the PID file; it restarts crashed workers and stops
+  # them all when it receives SIGTERM.
+  cd "$PROJECT_ROOT"
+  nohup "$PYTHON_EXEC" -m ron.cluster --workers "$CLUSTER" --shards "$SHARDS" >>"$PROJECT_ROOT/ron.log" 2>&1 &
+else
+  nohup "$PYTHON_EXEC" "$PROJECT_ROOT/ron_bot.py" >>"$PROJECT_ROOT/ron.log" 2>&1 &
+fi
 echo $! >"$PIDFILE"
 PID_VAL="$(cat "$PIDFILE" 2>/dev/null || true)"
 echo "Started Ron (PID ${PID_VAL}). Logs: $PROJECT_ROOT/ron.log"
@@ -30,7 +30,7 @@ if [ -f "$PIDFILE" ]; then
 fi
 
 # Also search for running processes
-PIDS_FROM_PS=$(pgrep -f "ron_bot.py" || true)
+PIDS_FROM_PS=$(pgrep -f "ron_bot.py|ron.cluster" || true)
 if [ -n "$PIDS_FROM_PS" ]; then
   PIDS="$PIDS_FROM_PS"
 fi
@@ -69,7 +69,7 @@ elapsed=0
 while [ $elapsed -lt $timeout ]; do
   sleep 1
   elapsed=$((elapsed+1))
-  STILL=$(pgrep -f "ron_bot.py" || true)
+  STILL=$(pgrep -f "ron_bot.py|ron.cluster" || true)
   if [ -z "$STILL" ]; then
     if [ -f "$PIDFILE" ]; then
       rm -f "$PIDFILE"
@@ -80,7 +80,7 @@ while [ $elapsed -lt $timeout ]; do
 done
 
 # Force kill if still running
-STILL=$(pgrep -f "ron_bot.py" || true)
+STILL=$(pgrep -f "ron_bot.py|ron.cluster" || true)
 if [ -n "$STILL" ]; then
   echo "Processes still running after $timeout seconds: $STILL"
   if [ "$FORCE" -eq 0 ]; then
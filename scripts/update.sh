@@ -2,19 +2,22 @@
 set -euo pipefail
 
 # Update Ron Bot from GitHub repository
-# Usage: ./update.sh [-f|--force] [--no-restart]
+# Usage: ./update.sh [-f|--force] [--no-restart] [--restart]
 # -f, --force: non-interactive (assume yes)
 # --no-restart: don't restart the service after update
+# --restart: restart even if only cogs changed (normally they are reloaded in place)
 
 FORCE=0
 RESTART=1
+FULL_RESTART=0
 REPO_URL="https://github.com/NovaFrame52/Ron-Bot.git"
 
 while [ $# -gt 0 ]; do
   case "$1" in
     -f|--force) FORCE=1; shift ;;
     --no-restart) RESTART=0; shift ;;
-    -h|--help) echo "Usage: $0 [-f|--force] [--no-restart]"; exit 0 ;;
+    --restart) FULL_RESTART=1; shift ;;
+    -h|--help) echo "Usage: $0 [-f|--force] [--no-restart] [--restart]"; exit 0 ;;
     *) echo "Unknown argument: $1"; exit 1 ;;
   esac
 done
@@ -86,12 +89,23 @@ fi
 LOCAL=$(git -C "$PROJECT_ROOT" rev-parse HEAD)
 REMOTE=$(git -C "$PROJECT_ROOT" rev-parse "$UPSTREAM_BRANCH")
 
+# Set to 1 when the update only touches code that can be reloaded in place
+# (the cogs and the helpers they import) or files that aren't code at all.
+RELOAD_ONLY=0
+
 if [ "$LOCAL" = "$REMOTE" ]; then
   echo "✓ Already up to date"
 else
   echo "Updates available. Pulling from $UPSTREAM_BRANCH..."
   git -C "$PROJECT_ROOT" pull origin "$CURRENT_BRANCH"
   echo "✓ Repository updated"
+  RELOAD_ONLY=1
+  while IFS= read -r changed; do
+    case "$changed" in
+      ron/cogs/*|ron/checks.py|ron/dice.py) ;;
+      requirements.txt|*.py|*.sh|*.service|.env.example) RELOAD_ONLY=0 ;;
+    esac
+  done < <(git -C "$PROJECT_ROOT" diff --name-only "$LOCAL" HEAD)
 fi
 
 # ==== UPDATE DEPENDENCIES ====
@@ -113,8 +127,24 @@ else
   echo "Warning: requirements.txt not found"
 fi
 
-# ==== RESTART SERVICE ====
-if [ "$RESTART" -eq 1 ]; then
+# ==== RELOAD OR RESTART SERVICE ====
+# Reloading keeps the gateway connection and member cache; a restart drops
+# both and makes every shard IDENTIFY again.
+RELOADED=0
+if [ "$RESTART" -eq 1 ] && [ "$RELOAD_ONLY" -eq 1 ] && [ "$FULL_RESTART" -eq 0 ]; then
+  PIDFILE="$PROJECT_ROOT/ron.pid"
+  if command -v systemctl >/dev/null 2>&1 && systemctl --user is-active ron.service >/dev/null 2>&1; then
+    echo "Only cogs changed; reloading ron.service in place..."
+    systemctl --user kill --signal=HUP --kill-who=main ron.service && RELOADED=1
+  elif [ -f "$PIDFILE" ] && kill -0 "$(cat "$PIDFILE")" >/dev/null 2>&1; then
+    echo "Only cogs changed; reloading Ron Bot (PID $(cat "$PIDFILE")) in place..."
+    kill -HUP "$(cat "$PIDFILE")" && RELOADED=1
+  fi
+fi
+
+if [ "$RELOADED" -eq 1 ]; then
+  echo "✓ Reload requested (check the log for 'Code reload'; use --restart to force a restart)"
+elif [ "$RESTART" -eq 1 ]; then
   if command -v systemctl >/dev/null 2>&1; then
     if systemctl --user is-enabled ron.service >/dev/null 2>&1; then
       echo "Restarting ron.service..."